@@ -1,70 +1,335 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
 from sqlalchemy.ext.asyncio import AsyncSession
+from pydantic_core import to_json
 from uuid import UUID
 import json
+import os
 
-from ..db.session import get_db
+from ..db.session import get_read_db, get_write_db, get_primary_db, read_sessionmaker
 from ..schemas.types import *
-from ..core.validator import validate_json_schema
+from ..core.validator import get_validator
+from ..core.executor import executor
+from ..core import metrics
+from ..core.hashing import content_hash
+from ..core.streaming import validate_stream, form_data_error
+from ..core.fieldcheck import check_fields
+from ..core.pagination import encode_cursor, decode_cursor, page_limit
+from ..core.rawjson import dump_rows, row_document, json_response
+from ..core.httpcache import entity_tag, cache_headers, not_modified, not_modified_response
+from ..core.export import EXPORT_FORMATS, flatten_columns, ndjson_chunks, csv_chunks
+from ..core.query import compile_predicate, require_index, resolve_field, NUMERIC_TYPES
 from ..crud import submission as crud
-from ..crud import gemini
+from ..crud import registry
+from ..crud import ai_cache
+from ..crud import ingest
+from ..crud import field_indexes
+from ..crud import rollups
+from ..crud import idempotency
 
 router = APIRouter()
 
-@router.post("/submit-form", summary="Submit Form", description="Validate and submit form data based on a JSON Schema. If no schema_id is provided, a new schema will be created and associated with the submission.")
-async def submit_form(payload: SubmissionIn, db: AsyncSession = Depends(get_db)):
+BULK_MAX_ITEMS = int(os.getenv("BULK_MAX_ITEMS", "10000"))
+INVALID_JSON = object()  # placeholder for an unparseable NDJSON line
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+@router.post("/submit-form", response_model=SubmitFormOut, summary="Submit Form", description="Validate and submit form data based on a JSON Schema. If no schema_id is provided, a new schema will be created and associated with the submission. A retry carrying the same Idempotency-Key header returns the original submission_id (with Idempotent-Replayed: true) instead of storing the form again.")
+async def submit_form(payload: SubmissionIn, request: Request, response: Response, db: AsyncSession = Depends(get_write_db)):
+    claim = None
+    if "idempotency-key" in request.headers:
+        claim = idempotency.claim(request.headers["idempotency-key"], await request.body())
+        # Known retries are answered before any validation or write
+        submission_id = await idempotency.lookup(db, claim)
+        if submission_id is not None:
+            response.headers["Idempotent-Replayed"] = "true"
+            return {"submission_id": submission_id}
+
+    check_form_data(payload.form_data)
+    size = body_size(request)
     if(payload.schema_id is not None):
-        schema_obj = await crud.get_schema_by_id(db, payload.schema_id)
+        schema_obj = await registry.get_schema(db, payload.schema_id)
         if not schema_obj:
             raise HTTPException(status_code=404, detail="Schema not found")
         
-        validate_json_schema(schema_obj.schema_json, payload.form_data)
-        submission = await crud.create_submission(db, payload.schema_id, payload.form_data)
-        return {"submission_id": submission.id}
-    
-    validate_json_schema(payload.schema_json, payload.form_data)
-    schema_obj = await crud.create_schema(db, payload.schema_json.get('title', 'Untitled Form'), payload.schema_json)
-    submission = await crud.create_submission(db, schema_obj.id, payload.form_data)
-    return {"submission_id": submission.id}
-
-@router.get("/list-schemas", response_model=list[SchemaOut], summary="List Schemas", description="Fetch a paginated list of previously submitted schemas.")
-async def list_schemas(skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    return await crud.list_schemas(db, skip, limit)
-
-@router.get("/schemas-count", response_model=CountOut, summary="Get Schema Count", description="Returns the total number of schemas stored.")
-async def get_schemas_count(db: AsyncSession = Depends(get_db)):
-    schemas = await crud.get_schema_count(db)
+        await executor.validate(schema_obj.schema_json, payload.form_data, payload.schema_id, size)
+        submission_id = await store_submission(db, schema_obj, payload.form_data, claim)
+    else:
+        digest = content_hash(payload.schema_json)
+        await executor.validate(payload.schema_json, payload.form_data, digest, size)
+        schema_obj = await registry.get_or_create_schema(db, payload.schema_json.get('title', 'Untitled Form'), payload.schema_json, digest)
+        submission_id = await store_submission(db, schema_obj, payload.form_data, claim)
+    if claim is not None and claim.replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    return {"submission_id": submission_id}
+
+def check_form_data(form_data: dict):
+    # Rejects what /submit-form/stream refuses while parsing, before the recursive validator runs
+    error = form_data_error(form_data)
+    if error is not None:
+        raise HTTPException(status_code=400, detail=error)
+
+def body_size(request: Request) -> int | None:
+    try:
+        return int(request.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+
+async def store_submission(db: AsyncSession, schema_obj: registry.CachedSchema, form_data: dict, claim: idempotency.Claim | None = None) -> UUID:
+    if claim is not None:
+        # The key and the row are written in one transaction, so keyed submissions skip the ingest queue
+        return await idempotency.create_submission(db, claim, schema_obj.id, form_data, schema_obj.schema_json)
+    if ingest.enabled():
+        return await ingest.queue.submit(schema_obj.id, form_data, schema_obj.schema_json)
+    submission = await crud.create_submission(db, schema_obj.id, form_data, schema_obj.schema_json)
+    return submission.id
+
+@router.post("/submit-form/stream", response_model=SubmitFormOut, summary="Submit Form (Streaming)", description="Submit a large form_data object for a stored schema. The raw JSON body is validated while it is read, so invalid or oversized submissions are rejected without buffering the whole body.")
+async def submit_form_stream(schema_id: UUID, request: Request, db: AsyncSession = Depends(get_write_db)):
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    form_data = await validate_stream(get_validator(schema_obj.schema_json, schema_id), request.stream())
+    return {"submission_id": await store_submission(db, schema_obj, form_data)}
+
+@router.post("/validate", response_model=FieldValidationOut, summary="Validate Fields", description="Check some fields of a form (or all of it, when `fields` is empty) against a stored or ad-hoc schema, for live feedback while the form is filled in. `form_data` is the whole current form, so if/then/else branches resolve as on submit. Returns every error for the requested fields; nothing is stored.")
+async def validate_fields(payload: FieldValidationIn, db: AsyncSession = Depends(get_read_db)):
+    if payload.schema_id is not None:
+        # Served from the schema registry's cache; only a cold schema_id reads the database
+        schema_obj = await registry.get_schema(db, payload.schema_id)
+        if not schema_obj:
+            raise HTTPException(status_code=404, detail="Schema not found")
+        compiled = get_validator(schema_obj.schema_json, payload.schema_id)
+    elif payload.schema_json is not None:
+        compiled = get_validator(payload.schema_json)
+    else:
+        raise HTTPException(status_code=400, detail="Either schema_id or schema_json is required")
+
+    check_form_data(payload.form_data)
+    errors = check_fields(compiled, payload.form_data, payload.fields)
+    return {"valid": not errors, "errors": errors}
+
+@router.post("/submit-forms/bulk", response_model=BulkSubmissionOut, summary="Bulk Submit Forms", description="Validate and submit many form_data objects for one schema. Accepts a JSON array or an NDJSON body (Content-Type: application/x-ndjson). Valid items are inserted in a single transaction; per-item ids or errors are returned.")
+async def submit_forms_bulk(schema_id: UUID, request: Request, db: AsyncSession = Depends(get_write_db)):
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    body = await request.body()
+    items = parse_bulk_body(body, request.headers.get("content-type", ""))
+    if len(items) > BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {BULK_MAX_ITEMS} items per request")
+
+    results = [None] * len(items)
+    candidates, candidate_indexes = [], []
+    for i, item in enumerate(items):
+        if item is INVALID_JSON:
+            results[i] = {"index": i, "error": "Invalid JSON"}
+        elif not isinstance(item, dict):
+            results[i] = {"index": i, "error": "Item must be a JSON object"}
+        elif (error := form_data_error(item)) is not None:
+            results[i] = {"index": i, "error": error}
+        else:
+            candidates.append(item)
+            candidate_indexes.append(i)
+
+    errors = await executor.validate_many(schema_obj.schema_json, candidates, schema_id, len(body))
+    valid_rows, valid_indexes = [], []
+    for i, item, error in zip(candidate_indexes, candidates, errors):
+        if error is not None:
+            results[i] = {"index": i, "error": error}
+            continue
+        valid_rows.append(item)
+        valid_indexes.append(i)
+
+    ids = await crud.create_submissions(db, schema_id, valid_rows, schema_obj.schema_json)
+    for i, submission_id in zip(valid_indexes, ids):
+        results[i] = {"index": i, "submission_id": submission_id}
+
+    return {"inserted": len(ids), "failed": len(items) - len(ids), "results": results}
+
+def parse_bulk_body(body: bytes, content_type: str) -> list:
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        items = []
+        for line in body.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line, parse_constant=reject_constant))
+            except ValueError:
+                items.append(INVALID_JSON)
+        return items
+
+    try:
+        items = json.loads(body, parse_constant=reject_constant)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    return items
+
+def reject_constant(name: str):
+    # json accepts NaN/Infinity, but they are not JSON and JSONB refuses them
+    raise ValueError(f"{name} is not valid JSON")
+
+@router.get("/list-schemas", response_model=list[SchemaOut], summary="List Schemas", description="Fetch a paginated list of previously submitted schemas. Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one in constant time; `skip` is ignored when a cursor is given.")
+async def list_schemas(skip: int = 0, limit: int = 10, cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    after = decode_cursor(cursor) if cursor else None
+    skip, limit = max(skip, 0), page_limit(limit)
+    schemas = await crud.list_schemas_json(db, skip, limit, after)
+    headers = {}
+    if schemas and len(schemas) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(schemas[-1].created_at, schemas[-1].id)
+    return json_response(dump_rows(schemas, ("schema_json",)), headers)
+
+@router.get("/schemas-count", response_model=CountOut, summary="Get Schema Count", description="Returns the total number of schemas stored. With approximate=true the planner's row estimate is returned instead.")
+async def get_schemas_count(approximate: bool = False, db: AsyncSession = Depends(get_read_db)):
+    schemas = await crud.get_schema_count(db, approximate)
     return {"totalRecords": schemas}
 
 @router.get("/submissions-count", response_model=CountOut, summary="Get Submission Count", description="Returns the number of submissions associated with a specific schema ID.")
-async def get_schemas_count(schema_id: UUID, db: AsyncSession = Depends(get_db)):
+async def get_schemas_count(schema_id: UUID, db: AsyncSession = Depends(get_read_db)):
     submissions = await crud.get_submission_count(db, schema_id=schema_id)
     return {"totalRecords": submissions}
 
-@router.get("/submissions/{schema_id}", response_model=list[SubmissionOut], summary="List Submissions", description="Fetch all submissions linked to a particular schema.")
-async def get_all_submissions(schema_id: UUID, skip: int = 0, limit: int = 10, db: AsyncSession = Depends(get_db)):
-    return await crud.list_submissions(db, schema_id, skip, limit)
+@router.get("/submissions/{schema_id}", response_model=list[SubmissionOut], summary="List Submissions", description="Fetch all submissions linked to a particular schema. Pass the X-Next-Cursor header of a page as `cursor` to fetch the next one in constant time; `skip` is ignored when a cursor is given.")
+async def get_all_submissions(schema_id: UUID, skip: int = 0, limit: int = 10, cursor: str | None = None, db: AsyncSession = Depends(get_read_db)):
+    after = decode_cursor(cursor) if cursor else None
+    skip, limit = max(skip, 0), page_limit(limit)
+    submissions = await crud.list_submissions_json(db, schema_id, skip, limit, after)
+    headers = {}
+    if submissions and len(submissions) == limit:
+        headers["X-Next-Cursor"] = encode_cursor(submissions[-1].submitted_at, submissions[-1].id)
+    return json_response(dump_rows(submissions, ("form_data",)), headers)
+
+@router.get("/submissions/{schema_id}/export", summary="Export Submissions", description="Stream every submission of a schema as NDJSON or as CSV with one column per (flattened) schema property.")
+async def export_submissions(schema_id: UUID, request: Request, format: str = "ndjson", db: AsyncSession = Depends(get_read_db)):
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {list(EXPORT_FORMATS)}")
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    async def rows():
+        # The stream outlives the request's session, so it opens its own
+        async with read_sessionmaker(request)() as session:
+            async for batch in crud.stream_submissions(session, schema_id, EXPORT_BATCH_SIZE):
+                yield batch
+
+    if format == "csv":
+        body, media_type = csv_chunks(rows(), flatten_columns(schema_obj.schema_json)), "text/csv"
+    else:
+        body, media_type = ndjson_chunks(rows(), schema_id), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="submissions-{schema_id}.{format}"'},
+    )
+
+@router.post("/submissions/{schema_id}/query", response_model=list[SubmissionOut], summary="Query Submissions", description="Filter a schema's submissions by field values (eq, in, gt, gte, lt, lte; dotted paths for nested fields). Fields are checked against the schema, and every query needs an eq/in predicate or an indexed field. Paginated with the X-Next-Cursor header.")
+async def query_submissions(schema_id: UUID, payload: SubmissionQueryIn, response: Response, db: AsyncSession = Depends(get_read_db)):
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    predicates = [compile_predicate(schema_obj.schema_json, p.field, p.op, p.value) for p in payload.where]
+    range_fields = {p.field for p in predicates if p.op not in ("eq", "in")}
+    names = {field_indexes.index_name(schema_id, field): field for field in range_fields}
+    indexed = {names[name] for name in await field_indexes.existing_indexes(db, list(names))}
+    require_index(predicates, indexed)
+
+    after = decode_cursor(payload.cursor) if payload.cursor else None
+    limit = page_limit(payload.limit)
+    submissions = await crud.query_submissions(db, schema_id, predicates, limit, after)
+    if submissions and len(submissions) == limit:
+        response.headers["X-Next-Cursor"] = encode_cursor(submissions[-1].submitted_at, submissions[-1].id)
+    return submissions
+
+@router.get("/schemas/{schema_id}", response_model=SchemaOut, summary="Get Schema", description="Fetch one stored schema by ID. Responses are immutable and carry an ETag; a matching If-None-Match gets 304.")
+async def get_schema(schema_id: UUID, request: Request, db: AsyncSession = Depends(get_read_db)):
+    etag = entity_tag(schema_id)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+
+    schema = await registry.get_schema(db, schema_id)
+    if not schema:
+        raise HTTPException(status_code=404, detail="Schema not found")
+    content = to_json({"id": schema.id, "name": schema.name, "schema_json": schema.schema_json, "created_at": schema.created_at})
+    return json_response(content, cache_headers(etag))
+
+@router.post("/schemas/{schema_id}/indexes", response_model=FieldIndexOut, summary="Index Field", description="Create (if missing) an expression index on one number or integer field of a schema, for range queries on hot fields. A schema may have at most MAX_FIELD_INDEXES of them (409 past that).")
+async def create_field_index(schema_id: UUID, payload: FieldIndexIn, db: AsyncSession = Depends(get_primary_db)):
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    field_type = resolve_field(schema_obj.schema_json, payload.field).get("type")
+    if field_type not in NUMERIC_TYPES:
+        # Only range predicates use field indexes; eq/in are served by the form_data GIN index
+        raise HTTPException(status_code=400, detail=f"Field '{payload.field}' of type {field_type} cannot be indexed; only number and integer fields can")
+    indexed = await field_indexes.indexed_fields(db, schema_id, flatten_columns(schema_obj.schema_json))
+    if payload.field not in indexed and len(indexed) >= field_indexes.MAX_FIELD_INDEXES:
+        raise HTTPException(status_code=409, detail=f"A schema can have at most {field_indexes.MAX_FIELD_INDEXES} field indexes")
+    await db.rollback()  # CONCURRENTLY waits on open transactions, this request's read included
+    name = await field_indexes.create_field_index(schema_id, tuple(payload.field.split(".")), field_type)
+    return {"field": payload.field, "index_name": name}
+
+@router.get("/schemas/{schema_id}/indexes", response_model=list[FieldIndexOut], summary="List Field Indexes", description="List the per-field expression indexes that exist for a schema.")
+async def list_field_indexes(schema_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
+
+    indexed = await field_indexes.indexed_fields(db, schema_id, flatten_columns(schema_obj.schema_json))
+    return [{"field": field, "index_name": name} for field, name in indexed.items()]
+
+@router.get("/schemas/{schema_id}/stats", response_model=SchemaStatsOut, summary="Get Schema Field Stats", description="Per-field aggregates of a schema's submissions: value distributions for enum fields, true/false ratios for booleans, min/max/avg and a histogram for numbers, and fill counts for other strings.")
+async def get_schema_stats(schema_id: UUID, db: AsyncSession = Depends(get_read_db)):
+    schema_obj = await registry.get_schema(db, schema_id)
+    if not schema_obj:
+        raise HTTPException(status_code=404, detail="Schema not found")
 
-@router.get("/submission-details/{submission_id}", response_model=SubmissionDetailOut, summary="Get Submission Detail", description="Fetch detailed form submission and its associated schema by submission ID.")
-async def get_submission_detail(submission_id: UUID, db: AsyncSession = Depends(get_db)):
-    result = await crud.get_submission_detail(db, submission_id)
-    if not result:
-        raise HTTPException(status_code=404, detail="Submission not found")
-    
-    sub, schema = result
     return {
-        "id": sub.id,
-        "schema_id": sub.schema_id,
-        "form_data": sub.form_data,
-        "submitted_at": sub.submitted_at,
-        "schema_json": schema.schema_json,
-        "name": schema.name
+        "schema_id": schema_id,
+        "submissions": await crud.get_submission_count(db, schema_id),
+        "fields": await rollups.get_stats(db, schema_id, schema_obj.schema_json),
     }
 
+@router.get("/validation/stats", summary="Validation Executor Stats", description="Inline vs process-pool validation counts, current and peak pool queue depth, and average offload latency.")
+async def get_validation_stats():
+    return executor.stats()
+
+@router.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+async def get_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@router.get("/submission-details/{submission_id}", response_model=SubmissionDetailOut, summary="Get Submission Detail", description="Fetch detailed form submission and its associated schema by submission ID. Responses are immutable and carry an ETag; a matching If-None-Match gets 304 without touching the database.")
+async def get_submission_detail(submission_id: UUID, request: Request, db: AsyncSession = Depends(get_read_db)):
+    etag = entity_tag(submission_id)
+    if not_modified(request, etag):
+        return not_modified_response(etag)
+
+    sub = await crud.get_submission_json(db, submission_id)
+    if not sub:
+        raise HTTPException(status_code=404, detail="Submission not found")
+
+    schema = await registry.get_schema(db, sub.schema_id)
+    detail = row_document(sub, ("form_data",))
+    detail["schema_json"] = schema.schema_json
+    detail["name"] = schema.name
+    return json_response(to_json(detail), cache_headers(etag))
+
 @router.post("/ai-response", summary="Generate Schema with AI", description="Generate a valid JSON Schema using AI based on the user's prompt. Returns structured JSON if successful.")
-async def get_ai_response(payload: AIResponseIn, db: AsyncSession = Depends(get_db)):
+async def get_ai_response(payload: AIResponseIn, db: AsyncSession = Depends(get_primary_db)):
     user_msg = payload.prompt
-    response = gemini.call_gemini(user_msg)
+    cache_key = ai_cache.prompt_key(user_msg)
+    cached = await ai_cache.lookup(db, cache_key)
+    if cached is not None:
+        return {"response": cached}
+    await db.rollback()  # hand the connection back to the pool while the upstream call runs
+
+    from ..crud import gemini  # imported on first use; it is the slowest import and most workers never need it
+    response = await gemini.call_gemini(user_msg)
     try:
         response = json.loads(response)
     except:
@@ -82,4 +347,6 @@ async def get_ai_response(payload: AIResponseIn, db: AsyncSession = Depends(get_
     if (type(response) is str and ("{", "[") not in response) or "error" in response :
         print("Gaurd Rail Hit") # This is not exact - simple fix
         raise HTTPException(status_code=400, detail="AI Does not know how to respond to this prompt, Try something Else")
+
+    await ai_cache.store(db, cache_key, user_msg, response)
     return {"response": response}
@@ -0,0 +1,63 @@
+import hashlib
+import math
+
+
+class BloomFilter:
+    """
+    Fixed-size set membership for strings with no false negatives and about
+    `error_rate` false positives once `capacity` items have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def positions(self, item: str) -> list[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, item: str):
+        for position in self.positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(item))
+
+
+class RotatingBloomFilter:
+    """
+    Two generations of BloomFilter. When the current one is full it becomes
+    the previous one and the oldest is dropped, so memory and the error rate
+    stay bounded while the most recent 1-2 x capacity items are remembered.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.current = BloomFilter(capacity, error_rate)
+        self.previous: BloomFilter | None = None
+        self.rotations = 0
+
+    def add(self, item: str):
+        if self.current.count >= self.capacity:
+            self.previous, self.current = self.current, BloomFilter(self.capacity, self.error_rate)
+            self.rotations += 1
+        self.current.add(item)
+
+    def __contains__(self, item: str) -> bool:
+        return item in self.current or (self.previous is not None and item in self.previous)
+
+    def stats(self) -> dict:
+        generations = [f for f in (self.current, self.previous) if f is not None]
+        return {
+            "items": sum(f.count for f in generations),
+            "bytes": sum(len(f.bits) for f in generations),
+            "rotations": self.rotations,
+        }
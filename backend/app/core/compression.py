@@ -0,0 +1,124 @@
+import os
+import zlib
+from starlette.datastructures import Headers, MutableHeaders
+from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:  # optional; without it only gzip is offered
+    brotli = None
+
+load_dotenv()
+
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "6"))
+BROTLI_QUALITY = int(os.getenv("BROTLI_QUALITY", "4"))
+
+# Already compressed, or must reach the client unbuffered
+SKIP_CONTENT_TYPES = ("image/", "video/", "audio/", "application/gzip", "application/zip", "text/event-stream")
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Pick br or gzip from an Accept-Encoding header by q-value, preferring br on ties."""
+    offered = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        offered[coding.strip().lower()] = quality
+
+    best, best_quality = None, 0.0
+    for coding in ("br", "gzip") if brotli is not None else ("gzip",):
+        quality = offered.get(coding, offered.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class Encoder:
+    def __init__(self, coding: str):
+        if coding == "br":
+            self.compressor = brotli.Compressor(quality=BROTLI_QUALITY)
+            self.process, self.flush, self.finish_stream = self.compressor.process, self.compressor.flush, self.compressor.finish
+        else:
+            self.compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)  # 31: gzip container
+            self.process = self.compressor.compress
+            self.flush = lambda: self.compressor.flush(zlib.Z_SYNC_FLUSH)
+            self.finish_stream = self.compressor.flush
+
+    def chunk(self, data: bytes) -> bytes:
+        # Flushed per chunk so streamed responses reach the client as they are produced
+        return self.process(data) + self.flush()
+
+    def finish(self, data: bytes) -> bytes:
+        return self.process(data) + self.finish_stream()
+
+
+def compressible(start: dict, headers: Headers) -> bool:
+    if start["status"] < 200 or start["status"] in (204, 304):
+        return False
+    if "content-encoding" in headers or "no-transform" in headers.get("cache-control", ""):
+        return False
+    return not headers.get("content-type", "").startswith(SKIP_CONTENT_TYPES)
+
+
+class CompressionMiddleware:
+    """
+    Negotiated gzip/brotli for response bodies of at least
+    COMPRESSION_MIN_BYTES; streamed bodies are compressed chunk by chunk.
+    ETags of compressed responses get an encoding suffix so each variant
+    has its own strong tag.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        coding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+        start = None
+        encoder = None
+
+        async def send_wrapper(message):
+            nonlocal start, encoder
+            if message["type"] == "http.response.start":
+                start = message  # held back until the first body chunk shows the size
+                return
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start is not None:
+                headers = MutableHeaders(scope=start)
+                if compressible(start, headers):
+                    headers.add_vary_header("Accept-Encoding")
+                    if coding is not None and (more_body or len(body) >= COMPRESSION_MIN_BYTES):
+                        encoder = Encoder(coding)
+                        headers["Content-Encoding"] = coding
+                        etag = headers.get("etag")
+                        if etag and etag.endswith('"'):
+                            headers["ETag"] = f'{etag[:-1]}-{coding}"'
+                        if more_body:
+                            del headers["content-length"]
+                        else:
+                            body = encoder.finish(body)
+                            headers["Content-Length"] = str(len(body))
+                            encoder = None
+                await send(start)
+                start = None
+                if encoder is None:
+                    return await send({**message, "body": body})
+            elif encoder is None:
+                return await send(message)
+
+            body = encoder.chunk(body) if more_body else encoder.finish(body)
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,203 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from .cache import LRUCache, MISSING
+from .validator import get_validator, VALIDATOR_CACHE_SIZE
+from .metrics import validation_seconds
+
+load_dotenv()
+
+# 0 keeps every validation inline on the event loop (default)
+VALIDATION_POOL_SIZE = int(os.getenv("VALIDATION_POOL_SIZE", "0"))
+# Estimated cost (body bytes weighted by schema traits) above which a
+# validation goes to the pool; about 3ms of validator time by default.
+VALIDATION_OFFLOAD_THRESHOLD = int(os.getenv("VALIDATION_OFFLOAD_THRESHOLD", str(64 * 1024)))
+VALIDATION_POOL_WARM = int(os.getenv("VALIDATION_POOL_WARM", "100"))
+
+PATTERN_WEIGHT = 0.5       # per field with a regex pattern
+OBJECT_ARRAY_WEIGHT = 1.0  # arrays of objects validate every item recursively
+MAX_WEIGHT = 8.0
+
+
+def schema_weight(schema: Dict[str, Any]) -> float:
+    """How much more a byte of this schema's payloads costs than a plain one."""
+    patterns, object_arrays = 0, False
+    stack = [schema]
+    while stack:
+        node = stack.pop()
+        if not isinstance(node, dict):
+            continue
+        if "pattern" in node:
+            patterns += 1
+        items = node.get("items")
+        if node.get("type") == "array" and isinstance(items, dict) and items.get("type") in ("object", "array"):
+            object_arrays = True
+        properties = node.get("properties")
+        if isinstance(properties, dict):
+            stack.extend(properties.values())
+        stack.extend(node.get(k) for k in ("items", "then", "else"))
+    weight = 1 + PATTERN_WEIGHT * patterns + (OBJECT_ARRAY_WEIGHT if object_arrays else 0)
+    return min(weight, MAX_WEIGHT)
+
+
+def estimated_size(data: Any, limit: float) -> int:
+    """
+    Rough JSON size of an already parsed payload, for requests sent without
+    a Content-Length (chunked). Counting stops once past `limit`, so a huge
+    payload costs no more to estimate than one at the threshold.
+    """
+    size, stack = 0, [data]
+    while stack and size < limit:
+        node = stack.pop()
+        if isinstance(node, dict):
+            size += 2
+            stack.extend(node.keys())
+            stack.extend(node.values())
+        elif isinstance(node, list):
+            size += 2
+            stack.extend(node)
+        elif isinstance(node, str):
+            size += len(node) + 3  # quotes and separator
+        else:
+            size += 8
+    return size
+
+
+# Worker side: each process keeps its own compiled validator cache
+
+def _warm(schemas: List[tuple]):
+    for key, schema in schemas:
+        get_validator(schema, key)
+
+
+def _ready():
+    return True
+
+
+def _validate(key: Any, schema: Dict[str, Any], data: Dict[str, Any]) -> str | None:
+    try:
+        get_validator(schema, key).validate(data)
+    except HTTPException as e:
+        return e.detail
+    return None
+
+
+def _validate_many(key: Any, schema: Dict[str, Any], items: List[Any]) -> List[str | None]:
+    validator = get_validator(schema, key)
+    errors = []
+    for item in items:
+        try:
+            validator.validate(item)
+            errors.append(None)
+        except HTTPException as e:
+            errors.append(e.detail)
+    return errors
+
+
+class ValidationExecutor:
+    """
+    Runs cheap validations inline and sends expensive ones (by estimated
+    cost) to a process pool, so large payloads don't stall the event loop.
+    Workers return the error message instead of raising, keeping results
+    picklable; callers get the same 400 as an inline validation.
+    """
+
+    def __init__(self, size: int, threshold: int):
+        self.size = size
+        self.threshold = threshold
+        self.pool: ProcessPoolExecutor | None = None
+        self.weights = LRUCache(maxsize=VALIDATOR_CACHE_SIZE)
+        self.inline = 0
+        self.offloaded = 0
+        self.pending = 0
+        self.max_pending = 0
+        self.offload_seconds = 0.0
+
+    def start(self, warm: List[tuple] = ()):
+        if self.pool is None and self.size > 0:
+            self.pool = ProcessPoolExecutor(
+                max_workers=self.size,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_warm,
+                initargs=(list(warm),),
+            )
+            # The pool spawns workers lazily; start (and warm) them all now
+            for _ in range(self.size):
+                self.pool.submit(_ready)
+
+    def stop(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True, cancel_futures=True)
+            self.pool = None
+
+    def weight(self, schema: Dict[str, Any], key: Any) -> float:
+        weight = self.weights.get(key)
+        if weight is MISSING:
+            weight = schema_weight(schema)
+            self.weights.set(key, weight)
+        return weight
+
+    def should_offload(self, schema: Dict[str, Any], key: Any, size: int | None, data: Any) -> bool:
+        """`size` is the body's Content-Length; without one it is estimated from `data`."""
+        if self.pool is None:
+            return False
+        weight = self.weight(schema, key)
+        if size is None:
+            size = estimated_size(data, self.threshold / weight)
+        return size * weight >= self.threshold
+
+    async def validate(self, schema: Dict[str, Any], data: Dict[str, Any], key: Any, size: int | None):
+        if not self.should_offload(schema, key, size, data):
+            self.inline += 1
+            started = time.perf_counter()
+            try:
+                get_validator(schema, key).validate(data)
+            finally:
+                validation_seconds.observe(time.perf_counter() - started, "inline")
+            return
+        error = await self._offload(_validate, key, schema, data)
+        if error is not None:
+            raise HTTPException(status_code=400, detail=error)
+
+    async def validate_many(self, schema: Dict[str, Any], items: List[Any], key: Any, size: int | None) -> List[str | None]:
+        """Per-item error messages (None when valid) for a batch of dict items."""
+        if not self.should_offload(schema, key, size, items):
+            self.inline += 1
+            started = time.perf_counter()
+            errors = _validate_many(key, schema, items)
+            validation_seconds.observe(time.perf_counter() - started, "inline")
+            return errors
+        return await self._offload(_validate_many, key, schema, items)
+
+    async def _offload(self, fn, *args):
+        self.offloaded += 1
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        started = time.perf_counter()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.pool, fn, *args)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.pending -= 1
+            self.offload_seconds += elapsed
+            validation_seconds.observe(elapsed, "pool")
+
+    def stats(self) -> dict:
+        return {
+            "pool_size": self.size if self.pool is not None else 0,
+            "threshold": self.threshold,
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "pending": self.pending,
+            "max_pending": self.max_pending,
+            "avg_offload_ms": round(self.offload_seconds / self.offloaded * 1000, 3) if self.offloaded else None,
+        }
+
+
+executor = ValidationExecutor(VALIDATION_POOL_SIZE, VALIDATION_OFFLOAD_THRESHOLD)
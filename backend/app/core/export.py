@@ -0,0 +1,75 @@
+import csv
+import io
+import json
+from typing import Any, AsyncIterator, Dict, List
+
+EXPORT_FORMATS = ("ndjson", "csv")
+
+
+def flatten_columns(schema: Dict[str, Any], prefix: str = "") -> List[str]:
+    """
+    CSV column names for a schema's properties. Nested objects become
+    dotted paths; arrays stay a single JSON-encoded column. Properties
+    that only exist in the then/else branches are included as well.
+    """
+    properties = dict(schema.get("properties", {}))
+    if not prefix:
+        for branch in ("then", "else"):
+            if isinstance(schema.get(branch), dict):
+                for key, prop in schema[branch].get("properties", {}).items():
+                    properties.setdefault(key, prop)
+
+    columns = []
+    for key, prop in properties.items():
+        path = f"{prefix}{key}"
+        if isinstance(prop, dict) and prop.get("type") == "object" and prop.get("properties"):
+            columns.extend(flatten_columns(prop, f"{path}."))
+        else:
+            columns.append(path)
+    return columns
+
+
+def cell(value: Any) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return str(value)
+
+
+def lookup(form_data: Dict[str, Any], path: str) -> Any:
+    value = form_data
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+async def ndjson_chunks(rows: AsyncIterator, schema_id: Any) -> AsyncIterator[str]:
+    async for batch in rows:
+        yield "".join(
+            json.dumps({
+                "id": str(row.id),
+                "schema_id": str(schema_id),
+                "form_data": row.form_data,
+                "submitted_at": row.submitted_at.isoformat(),
+            }, ensure_ascii=False) + "\n"
+            for row in batch
+        )
+
+
+async def csv_chunks(rows: AsyncIterator, columns: List[str]) -> AsyncIterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(["id", "submitted_at", *columns])
+    async for batch in rows:
+        for row in batch:
+            writer.writerow([row.id, row.submitted_at.isoformat(), *(cell(lookup(row.form_data, c)) for c in columns)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,152 @@
+import re
+from typing import Any, Dict, List
+from fastapi import HTTPException
+
+from .cache import MISSING
+from .validator import CompiledField, CompiledObject, CompiledSchema
+from .streaming import ITEM_TYPES
+
+CONTAINER_TYPES = ("array", "object")
+PATH_STEP = re.compile(r"(?:^|\.)([^.\[\]]+)|\[(\d+)\]")
+
+
+def parse_path(path: str) -> List[str | int]:
+    """'address.city', 'skills[2]', 'jobs[0].title' -> ['jobs', 0, 'title']"""
+    steps, position = [], 0
+    while position < len(path):
+        match = PATH_STEP.match(path, position)
+        if match is None:
+            raise HTTPException(status_code=400, detail=f"Invalid field path: {path}")
+        steps.append(match.group(1) if match.group(1) is not None else int(match.group(2)))
+        position = match.end()
+    if not steps:
+        raise HTTPException(status_code=400, detail=f"Invalid field path: {path}")
+    return steps
+
+
+def check_fields(compiled: CompiledSchema, data: Dict[str, Any], paths: List[str] | None = None) -> List[dict]:
+    """
+    Every error for the given field paths, or for the whole form when no
+    paths are given. Messages are the validator's own; each error carries
+    the path it belongs to. The if/then/else branch is picked from `data`,
+    so fields of an inactive branch report nothing unless they are filled in.
+    """
+    branch = compiled.branch_for(data)
+    errors = []
+    if not paths:
+        check_object(branch, data, "", errors)
+        return errors
+    for path in dict.fromkeys(paths):
+        check_path(compiled, branch, data, path, parse_path(path), errors)
+    return errors
+
+
+def check_path(compiled: CompiledSchema, obj: CompiledObject, data: Dict[str, Any], path: str, steps: list, errors: list):
+    field = None
+    value = data
+    name = prefix = ""
+    last = len(steps) - 1
+    for depth, step in enumerate(steps):
+        if isinstance(step, str):
+            if obj is None:
+                raise HTTPException(status_code=400, detail=f"Unknown field path: {path}")
+            name, prefix = step, join(prefix, step)
+            field = obj.fields.get(step)
+            if field is None:
+                if step in value:
+                    errors.append(error(prefix, f"Unexpected field: {step}"))
+                elif depth > 0 or not any(step in branch.fields for branch in branches(compiled)):
+                    raise HTTPException(status_code=400, detail=f"Unknown field path: {path}")
+                return
+            if step not in value:
+                if step in obj.required:
+                    errors.append(error(prefix, f"Missing required field: {step}"))
+                return
+            value = value[step]
+            if depth == last:
+                check_field(field, name, value, prefix, errors)
+                return
+            if field.type not in CONTAINER_TYPES:
+                raise HTTPException(status_code=400, detail=f"Unknown field path: {path}")
+            if not field.type_check(value):
+                # The container itself is wrong; that is the error for anything below it
+                attempt(field, name, value, prefix, errors)
+                return
+        else:
+            if field is None or field.type != "array" or field.items is None:
+                raise HTTPException(status_code=400, detail=f"Unknown field path: {path}")
+            prefix = f"{prefix}[{step}]"
+            if step >= len(value):
+                return
+            items, value = field.items, value[step]
+            if depth == last:
+                check_item(items, name, step, value, prefix, errors)
+                return
+            if items.type not in CONTAINER_TYPES:
+                raise HTTPException(status_code=400, detail=f"Unknown field path: {path}")
+            if not items.type_check(value):
+                errors.append(error(prefix, f"Item {step} in '{name}' must be of type {items.type}"))
+                return
+            field = items
+        obj = field.object
+
+
+def check_object(obj: CompiledObject, data: Dict[str, Any], prefix: str, errors: list):
+    for name in obj.required:
+        if name not in data:
+            errors.append(error(join(prefix, name), f"Missing required field: {name}"))
+    for name, value in data.items():
+        field = obj.fields.get(name)
+        if field is None:
+            errors.append(error(join(prefix, name), f"Unexpected field: {name}"))
+        else:
+            check_field(field, name, value, join(prefix, name), errors)
+
+
+def check_field(field: CompiledField, name: str, value: Any, path: str, errors: list):
+    """Like CompiledField.validate, but descending into objects and arrays to report every failing member."""
+    if field.enum is not MISSING or field.type_check is None or not field.type_check(value):
+        attempt(field, name, value, path, errors)
+    elif field.type == "object":
+        check_object(field.object, value, path, errors)
+    elif field.type == "array":
+        try:
+            field.validate_size(name, value)
+        except HTTPException as e:
+            errors.append(error(path, e.detail))
+        if field.items is not None:
+            for i, item in enumerate(value):
+                check_item(field.items, name, i, item, f"{path}[{i}]", errors)
+    else:
+        attempt(field, name, value, path, errors)
+
+
+def check_item(items: CompiledField, name: str, i: int, item: Any, path: str, errors: list):
+    # Mirrors CompiledField.validate_items: primitive items are only type-checked
+    if items.type not in ITEM_TYPES:
+        return
+    if not items.type_check(item):
+        errors.append(error(path, f"Item {i} in '{name}' must be of type {items.type}"))
+    elif items.type == "object":
+        check_object(items.object, item, path, errors)
+    elif items.type == "array":
+        check_field(items, name, item, path, errors)
+
+
+def attempt(field: CompiledField, name: str, value: Any, path: str, errors: list):
+    try:
+        field.validate(name, value)
+    except HTTPException as e:
+        errors.append(error(path, e.detail))
+
+
+def branches(compiled: CompiledSchema):
+    return [branch for branch in (compiled.base, compiled.then_branch, compiled.else_branch) if branch is not None]
+
+
+def join(prefix: str, name: str) -> str:
+    return f"{prefix}.{name}" if prefix else name
+
+
+def error(path: str, message: str) -> dict:
+    return {"field": path, "message": message}
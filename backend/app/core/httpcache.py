@@ -0,0 +1,39 @@
+from fastapi import Request, Response
+
+# Schemas and submissions never change after insert, so their detail
+# responses may be cached for as long as clients and CDNs care to. The
+# one-off dedupe-schemas migration is the exception (see its docstring).
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Suffixes CompressionMiddleware appends to the ETag of an encoded body
+ENCODING_SUFFIXES = ("-gzip", "-br")
+
+
+def entity_tag(value) -> str:
+    return f'"{value}"'
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": IMMUTABLE}
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    """If-None-Match check (weak comparison), accepting the tags of compressed variants."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for tag in header.split(","):
+        tag = tag.strip().removeprefix("W/")
+        if tag == "*":
+            return True
+        for suffix in ENCODING_SUFFIXES:
+            if tag.endswith(suffix + '"'):
+                tag = tag[:-len(suffix) - 1] + '"'
+                break
+        if tag == etag:
+            return True
+    return False
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers=cache_headers(etag))
@@ -0,0 +1,198 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, Tuple
+
+# Seconds; tuned for sub-millisecond validations up to multi-second AI calls
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Histogram:
+    """
+    Prometheus-style cumulative histogram. Observations only bump a list
+    slot per label set, so recording stays cheap enough for every request
+    and query; buckets are made cumulative when rendered.
+    """
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        self.series: Dict[tuple, list] = {}  # label values -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, value: float, *label_values):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [0] * (len(self.buckets) + 2)
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, series in sorted(self.series.items()):
+            labels = format_labels(self.labels, label_values)
+            bucket_labels = labels + "," if labels else ""
+            cumulative = 0
+            for bound, count in zip(self.buckets, series):
+                cumulative += count
+                yield f'{self.name}_bucket{{{bucket_labels}le="{bound}"}} {cumulative}'
+            cumulative += series[len(self.buckets)]
+            yield f'{self.name}_bucket{{{bucket_labels}le="+Inf"}} {cumulative}'
+            yield f"{self.name}_sum{braces(labels)} {series[-1]}"
+            yield f"{self.name}_count{braces(labels)} {cumulative}"
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.series: Dict[tuple, float] = {}
+
+    def inc(self, *label_values, amount: float = 1):
+        self.series[label_values] = self.series.get(label_values, 0) + amount
+
+    def render(self) -> Iterable[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in sorted(self.series.items()):
+            yield f"{self.name}{braces(format_labels(self.labels, label_values))} {value}"
+
+
+class Gauges:
+    """Gauges read from a callback at scrape time, e.g. a module's stats() dict."""
+
+    def __init__(self, prefix: str, help: str, collect: Callable[[], dict]):
+        self.prefix = prefix
+        self.help = help
+        self.collect = collect
+
+    def render(self) -> Iterable[str]:
+        for key, value in self.collect().items():
+            if isinstance(value, bool) or not isinstance(value, (int, float)):
+                continue
+            name = f"{self.prefix}_{key}"
+            yield f"# HELP {name} {self.help}: {key}"
+            yield f"# TYPE {name} gauge"
+            yield f"{name} {value}"
+
+
+def format_labels(names: Tuple[str, ...], values: tuple) -> str:
+    return ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+
+
+def braces(labels: str) -> str:
+    return f"{{{labels}}}" if labels else ""
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+_metrics: list = []
+
+
+def register(metric):
+    _metrics.append(metric)
+    return metric
+
+
+def render() -> str:
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+http_request_seconds = register(Histogram(
+    "http_request_duration_seconds", "Request latency by route template, method and status",
+    ("route", "method", "status"),
+))
+db_query_seconds = register(Histogram(
+    "db_query_duration_seconds", "Time spent executing SQL statements, by statement type", ("operation",),
+))
+db_pool_wait_seconds = register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time spent waiting for a pooled database connection",
+))
+db_pool_timeouts = register(Counter("db_pool_checkout_timeouts_total", "Pool checkouts that timed out"))
+validation_seconds = register(Histogram(
+    "validation_duration_seconds", "Form validation time, inline or in the process pool", ("mode",),
+))
+ai_call_seconds = register(Histogram(
+    "ai_call_duration_seconds", "Outbound AI request latency by outcome", ("outcome",),
+))
+
+
+class MetricsMiddleware:
+    """
+    Plain ASGI middleware (no BaseHTTPMiddleware task overhead). Requests
+    are labelled with the matched route template, so path parameters
+    don't create a series per id.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+        started = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            route = scope.get("route")
+            http_request_seconds.observe(
+                time.perf_counter() - started,
+                route.path if route is not None else "unmatched", scope["method"], status,
+            )
+
+
+SQL_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def instrument_engine(engine):
+    """Time every statement run through `engine` (an AsyncEngine or Engine)."""
+    from sqlalchemy import event
+
+    sync_engine = getattr(engine, "sync_engine", engine)
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info["query_started"].pop()
+        db_query_seconds.observe(time.perf_counter() - started, operation(statement))
+
+    @event.listens_for(sync_engine, "handle_error")
+    def error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def operation(statement: str) -> str:
+    verb = statement.lstrip()[:6].upper()
+    return verb if verb in SQL_OPERATIONS else "WITH" if verb.startswith("WITH") else "OTHER"
+
+
+def pool_stats(pool) -> dict:
+    # QueuePool keeps its overflow limit private; -1 means unlimited
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    return {
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "overflow": pool.overflow(),
+        "saturation": round(pool.checkedout() / capacity, 4) if capacity else 0,
+    }
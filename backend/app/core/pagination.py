@@ -0,0 +1,30 @@
+import base64
+import os
+from datetime import datetime
+from uuid import UUID
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+load_dotenv()
+
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "100"))
+
+
+def page_limit(limit: int) -> int:
+    """Requested page size clamped to 1..MAX_PAGE_SIZE."""
+    return min(max(limit, 1), MAX_PAGE_SIZE)
+
+
+def encode_cursor(timestamp: datetime, row_id: UUID) -> str:
+    """Opaque keyset cursor pointing just past (timestamp, id)."""
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), UUID(row_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
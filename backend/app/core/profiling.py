@@ -0,0 +1,196 @@
+import asyncio
+import hmac
+import os
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from typing import Dict
+from urllib.parse import parse_qs
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Profiles are only taken with a matching token (X-Profile header or
+# ?profile= query) or by random sampling; both are off unless configured.
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_PATHS = tuple(p for p in os.getenv("PROFILE_PATHS", "").split(",") if p)  # sampled path prefixes; empty = all
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+PROFILE_MAX_BYTES = int(os.getenv("PROFILE_MAX_BYTES", str(50 * 1024 * 1024)))
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "1"))
+PROFILE_MAX_ACTIVE = int(os.getenv("PROFILE_MAX_ACTIVE", "4"))
+
+AWAITING = "[awaiting]"
+
+
+class Profile:
+    """Collapsed stacks ("a;b;c" -> microseconds) for one request."""
+
+    def __init__(self, frame, task: asyncio.Task | None):
+        self.id = uuid.uuid4().hex[:12]
+        self.frame = frame  # the middleware frame; on-CPU stacks of this request pass through it
+        self.task = task
+        self.stacks: Counter = Counter()
+
+
+class Sampler:
+    """
+    Samples the event loop thread from a background thread while at least
+    one request is being profiled. A sample is charged to a request when
+    its middleware frame is on the running stack (on-CPU); otherwise the
+    request is suspended, and the coroutine chain it is awaiting on is
+    recorded under [awaiting]. Samples are weighted by elapsed time.
+    """
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.active: Dict[int, Profile] = {}
+        self.loop_thread: int | None = None
+        self.thread: threading.Thread | None = None
+        self.lock = threading.Lock()
+
+    def start(self, profile: Profile):
+        with self.lock:
+            self.active[id(profile.frame)] = profile
+            self.loop_thread = threading.get_ident()
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self.thread.start()
+
+    def stop(self, profile: Profile):
+        with self.lock:
+            self.active.pop(id(profile.frame), None)
+
+    def busy(self) -> bool:
+        return len(self.active) >= PROFILE_MAX_ACTIVE
+
+    def _run(self):
+        last = time.perf_counter()
+        while True:
+            time.sleep(self.interval)
+            now = time.perf_counter()
+            weight = int((now - last) * 1e6)
+            last = now
+            with self.lock:
+                if not self.active:
+                    self.thread = None
+                    return
+                profiles = list(self.active.values())
+            frame = sys._current_frames().get(self.loop_thread)
+            running = running_stack(frame, {id(p.frame) for p in profiles})
+            for profile in profiles:
+                stack = running.get(id(profile.frame))
+                if stack is None:
+                    stack = awaiting_stack(profile)
+                if stack:
+                    profile.stacks[stack] += weight
+
+
+def frame_label(code) -> str:
+    return f"{code.co_qualname} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def running_stack(frame, roots: set) -> Dict[int, str]:
+    """Collapsed stack above each profiled middleware frame found on the running stack."""
+    labels = []
+    while frame is not None:
+        if id(frame) in roots:
+            return {id(frame): ";".join(reversed(labels))}
+        labels.append(frame_label(frame.f_code))
+        frame = frame.f_back
+    return {}
+
+
+def awaiting_stack(profile: Profile) -> str | None:
+    """Collapsed stack of the coroutines a suspended request is awaiting, from its middleware frame down."""
+    task = profile.task
+    if task is None or task.done():
+        return None
+    labels = None
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        if frame is None:
+            break
+        if labels is not None:
+            labels.append(frame_label(frame.f_code))
+        elif frame is profile.frame:
+            labels = []
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return ";".join(labels + [AWAITING]) if labels else None
+
+
+sampler = Sampler(PROFILE_INTERVAL_MS / 1000)
+
+
+def requested(scope) -> bool:
+    if PROFILE_TOKEN:
+        supplied = dict(scope["headers"]).get(b"x-profile", b"").decode("latin-1")
+        if not supplied and b"profile=" in scope.get("query_string", b""):
+            supplied = parse_qs(scope["query_string"].decode("latin-1")).get("profile", [""])[0]
+        if supplied and hmac.compare_digest(supplied, PROFILE_TOKEN):
+            return True
+    if PROFILE_SAMPLE_RATE > 0 and random.random() < PROFILE_SAMPLE_RATE:
+        return not PROFILE_PATHS or scope["path"].startswith(PROFILE_PATHS)
+    return False
+
+
+def write_profile(profile: Profile, name: str):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, name), "w") as f:
+        for stack, micros in profile.stacks.most_common():
+            f.write(f"{stack} {micros}\n")
+    prune(PROFILE_DIR, PROFILE_MAX_BYTES)
+
+
+def prune(directory: str, max_bytes: int):
+    """Delete the oldest profiles until the directory fits in max_bytes."""
+    entries = []
+    for entry in os.scandir(directory):
+        if entry.is_file() and entry.name.endswith(".collapsed"):
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        os.remove(path)
+        total -= size
+
+
+class ProfilingMiddleware:
+    """
+    Profiles opted-in requests through the whole stack below it (routes,
+    validator, CRUD) and writes one collapsed-stack file per request,
+    readable by flamegraph.pl or speedscope. The file name is returned in
+    the X-Profile-Id response header.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or sampler.busy() or not requested(scope):
+            return await self.app(scope, receive, send)
+
+        profile = Profile(sys._getframe(), asyncio.current_task())
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method']}-{profile.id}"
+
+        async def send_wrapper(message):
+            nonlocal name
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                name += "-" + re.sub(r"[^A-Za-z0-9]+", "_", route.path if route else scope["path"]).strip("_")
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", f"{name}.collapsed".encode())]
+            await send(message)
+
+        sampler.start(profile)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            sampler.stop(profile)
+            await asyncio.to_thread(write_profile, profile, f"{name}.collapsed")
@@ -0,0 +1,93 @@
+from dataclasses import dataclass
+from typing import Any, Dict, List
+from fastapi import HTTPException
+
+from .validator import type_checker
+
+EQUALITY_OPS = ("eq", "in")
+RANGE_OPS = {"gt": ">", "gte": ">=", "lt": "<", "lte": "<="}
+SCALAR_TYPES = ("string", "number", "integer", "boolean")
+NUMERIC_TYPES = ("number", "integer")
+
+
+@dataclass(frozen=True)
+class Predicate:
+    path: tuple
+    op: str
+    value: Any
+    type: str
+
+    @property
+    def field(self) -> str:
+        return ".".join(self.path)
+
+
+def top_level_properties(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """Base properties plus the ones only reachable through then/else."""
+    properties = dict(schema.get("properties", {}))
+    for branch in ("then", "else"):
+        if isinstance(schema.get(branch), dict):
+            for key, prop in schema[branch].get("properties", {}).items():
+                properties.setdefault(key, prop)
+    return properties
+
+
+def resolve_field(schema: Dict[str, Any], field: str) -> Dict[str, Any]:
+    """Follow a dotted path through nested object properties."""
+    properties = top_level_properties(schema)
+    parts = field.split(".")
+    for i, part in enumerate(parts):
+        prop = properties.get(part)
+        if not isinstance(prop, dict):
+            raise HTTPException(status_code=400, detail=f"Unknown field: {field}")
+        if i == len(parts) - 1:
+            return prop
+        if prop.get("type") != "object":
+            raise HTTPException(status_code=400, detail=f"Field '{'.'.join(parts[:i + 1])}' is not an object")
+        properties = prop.get("properties", {})
+
+
+def compile_predicate(schema: Dict[str, Any], field: str, op: str, value: Any) -> Predicate:
+    prop = resolve_field(schema, field)
+    field_type = prop.get("type")
+    if field_type not in SCALAR_TYPES:
+        raise HTTPException(status_code=400, detail=f"Field '{field}' of type {field_type} cannot be queried")
+    if op in RANGE_OPS and field_type not in NUMERIC_TYPES:
+        raise HTTPException(status_code=400, detail=f"Operator '{op}' needs a number or integer field, '{field}' is {field_type}")
+
+    values = value if op == "in" else [value]
+    if op == "in" and (not isinstance(value, list) or not value):
+        raise HTTPException(status_code=400, detail=f"Operator 'in' on '{field}' needs a non-empty list")
+    # Ranges compare numerically, so an integer field accepts a float bound
+    check = type_checker("number" if op in RANGE_OPS else field_type)
+    for v in values:
+        if not check(v):
+            raise HTTPException(status_code=400, detail=f"Value {v!r} for '{field}' should be of type {field_type}")
+        if op in EQUALITY_OPS and "enum" in prop and v not in prop["enum"]:
+            raise HTTPException(status_code=400, detail=f"Value {v!r} for '{field}' must be one of {prop['enum']}")
+
+    return Predicate(tuple(field.split(".")), op, value, field_type)
+
+
+def containment_document(predicate: Predicate, value: Any) -> Dict[str, Any]:
+    """{"a": {"b": value}} for path a.b, the operand of form_data @> ..."""
+    document = value
+    for part in reversed(predicate.path):
+        document = {part: document}
+    return document
+
+
+def require_index(predicates: List[Predicate], indexed_fields: set):
+    """
+    Containment predicates are served by the GIN index, range predicates
+    only by a per-field expression index. Refuse queries with neither so
+    they cannot silently scan every submission of the schema.
+    """
+    for predicate in predicates:
+        if predicate.op in EQUALITY_OPS or predicate.field in indexed_fields:
+            return
+    fields = ", ".join(sorted({p.field for p in predicates}))
+    raise HTTPException(
+        status_code=400,
+        detail=f"Query needs an eq/in predicate or an indexed field; create an index for one of: {fields}",
+    )
@@ -0,0 +1,24 @@
+from typing import Iterable
+from fastapi import Response
+from pydantic_core import from_json, to_json
+
+
+def dump_rows(rows: Iterable, json_columns: tuple[str, ...]) -> bytes:
+    """
+    Serialize Core rows whose JSONB columns were selected as text. Each
+    document is parsed by pydantic-core and written back out in the same
+    pass as the rest of the page, producing the bytes the response models
+    would, without ORM objects or model validation.
+    """
+    return to_json([row_document(row, json_columns) for row in rows])
+
+
+def row_document(row, json_columns: tuple[str, ...]) -> dict:
+    document = dict(row._mapping)
+    for column in json_columns:
+        document[column] = from_json(document[column])
+    return document
+
+
+def json_response(content: bytes, headers: dict | None = None) -> Response:
+    return Response(content=content, media_type="application/json", headers=headers)
@@ -0,0 +1,142 @@
+import json
+import math
+from typing import Any, Dict, List, Tuple
+
+from .query import top_level_properties
+
+HISTOGRAM_BUCKETS = 10
+SUMMARY = "*"  # bucket holding count/total/min/max of a field
+
+# (field, bucket) -> [count, total, min, max]
+Aggregate = Dict[Tuple[str, str], List[Any]]
+
+
+def rollup_plan(schema: Dict[str, Any]) -> List[Tuple[tuple, str, Dict[str, Any]]]:
+    """
+    Scalar fields worth aggregating, as (path, kind, prop). Kinds:
+    "enum" and "boolean" count values, "number" keeps sums, bounds and a
+    histogram, and "string" only counts how often the field is filled.
+    """
+    plan = []
+
+    def walk(properties: Dict[str, Any], prefix: tuple):
+        for key, prop in properties.items():
+            if not isinstance(prop, dict):
+                continue
+            path = prefix + (key,)
+            field_type = prop.get("type")
+            if field_type == "object":
+                walk(prop.get("properties", {}), path)
+            elif "enum" in prop:
+                plan.append((path, "enum", prop))
+            elif field_type == "boolean":
+                plan.append((path, "boolean", prop))
+            elif field_type in ("number", "integer"):
+                plan.append((path, "number", prop))
+            elif field_type == "string":
+                plan.append((path, "string", prop))
+
+    walk(top_level_properties(schema), ())
+    return plan
+
+
+def histogram_bucket(value: float, prop: Dict[str, Any]) -> Tuple[float, float]:
+    """
+    Equal-width buckets between the schema's minimum and maximum when both
+    are set, otherwise order-of-magnitude buckets ([1, 10), [10, 100), ...).
+    """
+    low, high = prop.get("minimum"), prop.get("maximum")
+    if isinstance(low, (int, float)) and isinstance(high, (int, float)) and high > low:
+        width = (high - low) / HISTOGRAM_BUCKETS
+        index = min(max(int((value - low) // width), 0), HISTOGRAM_BUCKETS - 1)
+        # Rounded so bucket keys don't carry float noise like 2.2000000000000002
+        return round(low + index * width, 9), round(low + (index + 1) * width, 9)
+    if abs(value) < 1:
+        return -1, 1
+    magnitude = 10 ** math.floor(math.log10(abs(value)))
+    return (magnitude, magnitude * 10) if value > 0 else (-magnitude * 10, -magnitude)
+
+
+def lookup_path(data: Dict[str, Any], path: tuple) -> Any:
+    for part in path:
+        if not isinstance(data, dict) or part not in data:
+            return None
+        data = data[part]
+    return data
+
+
+def add(aggregate: Aggregate, field: str, bucket: str, value: float | None = None):
+    entry = aggregate.get((field, bucket))
+    if entry is None:
+        aggregate[(field, bucket)] = [1, value, value, value]
+        return
+    entry[0] += 1
+    if value is not None:
+        entry[1] += value
+        entry[2] = min(entry[2], value)
+        entry[3] = max(entry[3], value)
+
+
+def aggregate_rows(plan, rows: List[Dict[str, Any]], aggregate: Aggregate | None = None) -> Aggregate:
+    aggregate = {} if aggregate is None else aggregate
+    for form_data in rows:
+        for path, kind, prop in plan:
+            value = lookup_path(form_data, path)
+            if value is None:
+                continue
+            field = ".".join(path)
+            if kind == "number":
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                add(aggregate, field, SUMMARY, value)
+                low, high = histogram_bucket(value, prop)
+                add(aggregate, field, f"h:{low!r}:{high!r}")
+            elif kind in ("enum", "boolean"):
+                add(aggregate, field, SUMMARY)
+                add(aggregate, field, "v:" + json.dumps(value, sort_keys=True))
+            else:
+                add(aggregate, field, SUMMARY)
+    return aggregate
+
+
+def shape_stats(plan, rows) -> Dict[str, Any]:
+    """Turn stored rollup rows (field, bucket, count, total, min, max) into the API shape."""
+    by_field: Dict[str, list] = {}
+    for row in rows:
+        by_field.setdefault(row.field, []).append(row)
+
+    fields = {}
+    for path, kind, prop in plan:
+        field = ".".join(path)
+        summary = {"type": prop.get("type"), "count": 0}
+        buckets = by_field.get(field, [])
+        for row in buckets:
+            if row.bucket == SUMMARY:
+                summary["count"] = row.count
+                if kind == "number":
+                    summary.update({
+                        "min": row.min_value,
+                        "max": row.max_value,
+                        "avg": row.total / row.count if row.count else None,
+                    })
+
+        if kind == "number":
+            histogram = []
+            for row in buckets:
+                if row.bucket.startswith("h:"):
+                    _, low, high = row.bucket.split(":")
+                    histogram.append({"from": float(low), "to": float(high), "count": row.count})
+            summary["histogram"] = sorted(histogram, key=lambda h: h["from"])
+        elif kind in ("enum", "boolean"):
+            values = {json.dumps(v, sort_keys=True): 0 for v in (prop.get("enum") or [])}
+            for row in buckets:
+                if row.bucket.startswith("v:"):
+                    values[row.bucket[2:]] = row.count
+            if kind == "boolean":
+                summary["true"] = values.get("true", 0)
+                summary["false"] = values.get("false", 0)
+                summary["true_ratio"] = summary["true"] / summary["count"] if summary["count"] else None
+            else:
+                summary["values"] = [{"value": json.loads(v), "count": c} for v, c in values.items()]
+        fields[field] = summary
+    return fields
@@ -0,0 +1,33 @@
+import os
+import time
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# migrate: create/upgrade tables on every start (development, single instance)
+# check: verify the schema is current with two catalog queries and run no DDL;
+#        migrations then run once per release (python -m app.db.migrations upgrade)
+STARTUP_MODE = os.getenv("STARTUP_MODE", "migrate")
+DB_POOL_PREWARM = int(os.getenv("DB_POOL_PREWARM", "0"))  # connections opened per engine before serving
+STARTUP_WARM_SCHEMAS = int(os.getenv("STARTUP_WARM_SCHEMAS", "0"))  # validators compiled for recently used schemas
+
+# phase -> seconds, for the startup log line and the startup_* gauges
+timings: dict[str, float] = {}
+
+
+@contextmanager
+def phase(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - started
+
+
+def summary() -> str:
+    return ", ".join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in timings.items())
+
+
+def stats() -> dict:
+    return {f"{name}_seconds": round(seconds, 4) for name, seconds in timings.items()}
@@ -0,0 +1,221 @@
+import math
+import os
+from typing import Any, AsyncIterator, Dict
+import ijson
+from fastapi import HTTPException
+from dotenv import load_dotenv
+
+from .validator import CompiledField, CompiledSchema, PRIMITIVE_TYPES
+
+load_dotenv()
+
+STREAM_MAX_BYTES = int(os.getenv("STREAM_MAX_BYTES", str(64 * 1024 * 1024)))
+STREAM_MAX_DEPTH = int(os.getenv("STREAM_MAX_DEPTH", "32"))
+STREAM_READ_SIZE = 64 * 1024
+ITEM_TYPES = PRIMITIVE_TYPES + ("array", "object")
+
+
+class BodyReader:
+    """File-like adapter ijson can read from, enforcing the size limit as chunks arrive."""
+
+    def __init__(self, chunks: AsyncIterator[bytes], max_bytes: int = STREAM_MAX_BYTES):
+        self.chunks = chunks.__aiter__()
+        self.max_bytes = max_bytes
+        self.received = 0
+        self.buffer = b""
+
+    async def fill(self) -> bool:
+        """Pull the next chunk into the buffer; False at the end of the body."""
+        try:
+            chunk = await self.chunks.__anext__()
+        except StopAsyncIteration:
+            return False
+        self.received += len(chunk)
+        if self.received > self.max_bytes:
+            raise HTTPException(status_code=413, detail=f"Body exceeds {self.max_bytes} bytes")
+        self.buffer += chunk
+        return True
+
+    async def peek(self) -> bytes:
+        """The first non-whitespace byte, left unread; b"" for a blank body."""
+        while not (stripped := self.buffer.lstrip()):
+            self.buffer = b""
+            if not await self.fill():
+                return b""
+        self.buffer = stripped
+        return stripped[:1]
+
+    async def read(self, size: int = -1) -> bytes:
+        while not self.buffer:
+            if not await self.fill():
+                return b""
+        if size < 0 or size >= len(self.buffer):
+            data, self.buffer = self.buffer, b""
+        else:
+            data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+
+class Frame:
+    """An open object or array: the value being built and the rules that apply to it."""
+    __slots__ = ("value", "key", "field", "fields", "name", "prefix")
+
+    def __init__(self, value, field, fields, name, prefix):
+        self.value = value
+        self.key = None       # pending key inside an object
+        self.field = field    # the field this container is the value of
+        self.fields = fields  # known properties of an object, None when unchecked
+        self.name = name
+        self.prefix = prefix  # "Error in array ..." context the full validator adds
+
+
+class StreamValidator:
+    """
+    Builds form_data from ijson events while checking each token against the
+    compiled schema, so a body is rejected on the first unknown field, type
+    mismatch or maxItems/maxLength violation without reading the rest.
+    Early errors carry the same messages as the full validator.
+
+    Only checks that hold for every if/then/else branch run early; the full
+    validator still runs on the finished document for required fields,
+    minItems and branch-specific rules.
+    """
+
+    def __init__(self, compiled: CompiledSchema, max_depth: int = STREAM_MAX_DEPTH):
+        self.compiled = compiled
+        self.max_depth = max_depth
+        self.stack: list[Frame] = []
+        self.result = None
+        self.top_fields = self._top_fields(compiled)
+
+    @staticmethod
+    def _top_fields(compiled: CompiledSchema) -> Dict[str, CompiledField | None]:
+        # A field gets early checks only if every branch compiles it the same way
+        branches = [b for b in (compiled.base, compiled.then_branch, compiled.else_branch) if b is not None]
+        fields = {}
+        for branch in branches:
+            for key, field in branch.fields.items():
+                fields[key] = field if all(b.fields.get(key) is field for b in branches) else None
+        return fields
+
+    async def parse(self, reader: BodyReader) -> Dict[str, Any]:
+        if await reader.peek() not in (b"{", b""):
+            # An array or scalar body is refused on its first byte, not once it is all read
+            raise HTTPException(status_code=400, detail="Form data must be a JSON object")
+        try:
+            async for event, value in ijson.basic_parse_async(reader, use_float=True, buf_size=STREAM_READ_SIZE):
+                self.feed(event, value)
+        except ijson.JSONError:
+            raise HTTPException(status_code=400, detail="Invalid JSON")
+        if not isinstance(self.result, dict):
+            raise HTTPException(status_code=400, detail="Form data must be a JSON object")
+        self.compiled.validate(self.result)
+        return self.result
+
+    def feed(self, event: str, value: Any):
+        if event == "map_key":
+            frame = self.stack[-1]
+            if frame.fields is not None and value not in frame.fields:
+                self.fail(frame, f"Unexpected field: {value}")
+            frame.key = value
+        elif event == "start_map":
+            self.open({})
+        elif event == "start_array":
+            self.open([])
+        elif event in ("end_map", "end_array"):
+            self.attach(self.stack.pop().value)
+        else:
+            if self.stack:
+                self.check_scalar(self.stack[-1], value)
+            self.attach(value)
+
+    @staticmethod
+    def rules(frame: Frame) -> CompiledField | None:
+        """Rules for the next value inside `frame`."""
+        if isinstance(frame.value, dict):
+            return frame.fields.get(frame.key) if frame.fields is not None else None
+        items = frame.field.items if frame.field is not None else None
+        # The validator only checks items of these types
+        return items if items is not None and items.type in ITEM_TYPES else None
+
+    def open(self, container):
+        if len(self.stack) >= self.max_depth:
+            raise HTTPException(status_code=400, detail=f"Form data nested deeper than {self.max_depth} levels")
+        if not self.stack:
+            self.stack.append(Frame(container, None, self.top_fields, None, ""))
+            return
+
+        parent = self.stack[-1]
+        field = self.rules(parent)
+        name, prefix = parent.key, parent.prefix
+        if isinstance(parent.value, list):
+            name = parent.name
+            index = len(parent.value)
+            if field is not None and not field.type_check(container):
+                self.fail(parent, self.item_type_error(name, index, field))
+            prefix += f"Error in array '{name}' at index {index}: "
+        elif field is not None and field.type_check is not None and not field.type_check(container):
+            self.fail(parent, f"Field '{name}' should be of type {field.type}")
+
+        fields = None
+        if field is not None and isinstance(container, dict):
+            target = parent.field.items_object if isinstance(parent.value, list) else field.object
+            fields = target.fields if target is not None else None
+        self.stack.append(Frame(container, field, fields, name, prefix))
+
+    def attach(self, value: Any):
+        if not self.stack:
+            self.result = value
+            return
+        frame = self.stack[-1]
+        if isinstance(frame.value, dict):
+            frame.value[frame.key] = value
+            return
+        frame.value.append(value)
+        field = frame.field
+        if field is not None and field.type == "array" and field.max_items is not None and len(frame.value) > field.max_items:
+            self.fail(frame, f"Field '{frame.name}' must have at most {field.max_items} items")
+
+    def check_scalar(self, frame: Frame, value: Any):
+        field = self.rules(frame)
+        if field is None:
+            return
+        if isinstance(frame.value, list):
+            if not field.type_check(value):
+                self.fail(frame, self.item_type_error(frame.name, len(frame.value), field))
+            return
+        try:
+            field.validate(frame.key, value)
+        except HTTPException as e:
+            self.fail(frame, e.detail)
+
+    @staticmethod
+    def item_type_error(name: str, index: int, field: CompiledField) -> str:
+        return f"Error in array '{name}' at index {index}: Item {index} in '{name}' must be of type {field.type}"
+
+    @staticmethod
+    def fail(frame: Frame, detail: str):
+        raise HTTPException(status_code=400, detail=frame.prefix + detail)
+
+
+def form_data_error(value: Any, max_depth: int = STREAM_MAX_DEPTH) -> str | None:
+    """
+    The structural checks StreamValidator makes while parsing, for form data
+    that arrived already parsed: nesting past `max_depth` (the validators
+    recurse once per level) and NaN/Infinity, which json accepts but JSONB
+    refuses. Iterative, so a deep document can't exhaust the stack here.
+    """
+    stack = [(value, 1)]
+    while stack:
+        node, depth = stack.pop()
+        if isinstance(node, float) and not math.isfinite(node):
+            return "Form data must not contain NaN or Infinity"
+        if isinstance(node, (dict, list)):
+            if depth > max_depth:
+                return f"Form data nested deeper than {max_depth} levels"
+            stack.extend((child, depth + 1) for child in (node.values() if isinstance(node, dict) else node))
+    return None
+
+
+async def validate_stream(compiled: CompiledSchema, chunks: AsyncIterator[bytes]) -> Dict[str, Any]:
+    return await StreamValidator(compiled).parse(BodyReader(chunks))
@@ -1,130 +1,280 @@
+import os
 import re
 from typing import Any, Dict, List
 from fastapi import HTTPException
+from dotenv import load_dotenv
 
+from .cache import LRUCache, MISSING
+from .hashing import content_hash
 
-def validate_json_schema(schema: Dict[str, Any], data: Dict[str, Any]):
+load_dotenv()
 
-    # Handle if/then/else logic
-    if_cond = schema.get("if")
-    then_cond = schema.get("then")
-    else_cond = schema.get("else")
+VALIDATOR_CACHE_SIZE = int(os.getenv("VALIDATOR_CACHE_SIZE", "512"))
 
-    conditional_schema = {}
-    if if_cond and condition_matches(if_cond, data):
-        conditional_schema = then_cond or {}
-    elif else_cond:
-        conditional_schema = else_cond
+EMAIL_RE = re.compile(r"[^@]+@[^@]+\.[^@]+")
+PRIMITIVE_TYPES = ("string", "number", "boolean", "integer")
 
-    merged_properties = {
-        **schema.get("properties", {}),
-        **conditional_schema.get("properties", {})
-    }
+_validators = LRUCache(maxsize=VALIDATOR_CACHE_SIZE)
 
-    merged_required = list(set(
-        schema.get("required", []) +
-        conditional_schema.get("required", [])
-    ))
 
-    # Validate required fields
-    for field in merged_required:
-        if field not in data:
-            raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+def validate_json_schema(schema: Dict[str, Any], data: Dict[str, Any], key: Any = None):
+    get_validator(schema, key).validate(data)
 
-    # Validate each field
-    for key, value in data.items():
-        if key not in merged_properties:
-            raise HTTPException(status_code=400, detail=f"Unexpected field: {key}")
 
-        prop = merged_properties[key]
+def get_validator(schema: Dict[str, Any], key: Any = None) -> "CompiledSchema":
+    """
+    Return the compiled validator for a schema, compiling it on first use.
+    Stored schemas are keyed by their id, ad-hoc schemas by content hash.
+    """
+    if key is None:
+        key = content_hash(schema)
+    compiled = _validators.get(key)
+    if compiled is MISSING:
+        compiled = compile_schema(schema)
+        _validators.set(key, compiled)
+    return compiled
+
+
+def validator_cache_stats() -> dict:
+    return _validators.stats()
+
+
+def compile_schema(schema: Dict[str, Any]) -> "CompiledSchema":
+    return CompiledSchema(schema)
+
+
+class CompiledSchema:
+    """
+    Top-level schema with its if/then/else branches resolved up front:
+    `then_branch` and `else_branch` are the base properties/required
+    already merged with the conditional ones.
+    """
+    __slots__ = ("base", "condition", "then_branch", "else_branch")
+
+    def __init__(self, schema: Dict[str, Any]):
+        properties = schema.get("properties", {})
+        required = schema.get("required", [])
+        fields = {key: CompiledField(prop) for key, prop in properties.items()}
+        self.base = CompiledObject(fields, required)
+
+        if_cond = schema.get("if")
+        then_cond = schema.get("then")
+        else_cond = schema.get("else")
+
+        self.condition = compile_condition(if_cond) if if_cond else None
+        self.then_branch = self._merge(fields, properties, required, then_cond or {})
+        self.else_branch = self._merge(fields, properties, required, else_cond) if else_cond else None
+
+    @staticmethod
+    def _merge(fields, properties, required, conditional_schema) -> "CompiledObject":
+        if not isinstance(conditional_schema, dict):
+            conditional_schema = {}
+        extra_properties = conditional_schema.get("properties", {})
+        extra_required = conditional_schema.get("required", [])
+        if not extra_properties and not extra_required:
+            return CompiledObject(fields, required)
+
+        merged = dict(fields)
+        for key, prop in extra_properties.items():
+            merged[key] = fields[key] if properties.get(key) is prop else CompiledField(prop)
+        return CompiledObject(merged, list(required) + list(extra_required))
+
+    def branch_for(self, data: Dict[str, Any]) -> "CompiledObject":
+        if self.condition is not None and all(
+            field in data and data[field] == const_val for field, const_val in self.condition
+        ):
+            return self.then_branch
+        if self.else_branch is not None:
+            return self.else_branch
+        return self.base
+
+    def validate(self, data: Dict[str, Any]):
+        self.branch_for(data).validate(data)
+
+
+class CompiledObject:
+    __slots__ = ("fields", "required")
+
+    def __init__(self, fields: Dict[str, "CompiledField"], required: List[str]):
+        self.fields = fields
+        # dict.fromkeys de-duplicates while keeping the schema's order
+        self.required = tuple(dict.fromkeys(required))
+
+    def validate(self, data: Dict[str, Any]):
+        # Validate required fields
+        for field in self.required:
+            if field not in data:
+                raise HTTPException(status_code=400, detail=f"Missing required field: {field}")
+
+        # Validate each field
+        fields = self.fields
+        for key, value in data.items():
+            field = fields.get(key)
+            if field is None:
+                raise HTTPException(status_code=400, detail=f"Unexpected field: {key}")
+            field.validate(key, value)
+
+
+class CompiledField:
+    __slots__ = (
+        "type", "type_check", "enum", "enum_values",
+        "min_length", "max_length", "pattern", "email",
+        "minimum", "maximum", "min_items", "max_items",
+        "items", "items_object", "object",
+    )
+
+    def __init__(self, prop: Dict[str, Any]):
         expected_type = prop.get("type")
+        self.type = expected_type
+        self.type_check = type_checker(expected_type) if expected_type else None
+
+        # Enum: set lookup when every member is hashable, list scan otherwise
+        self.enum = prop.get("enum") if "enum" in prop else MISSING
+        self.enum_values = self.enum
+        if isinstance(self.enum, (list, tuple)):
+            try:
+                self.enum_values = frozenset(self.enum)
+            except TypeError:
+                pass
+
+        self.min_length = prop.get("minLength")
+        self.max_length = prop.get("maxLength")
+        self.pattern = compile_pattern(prop["pattern"]) if "pattern" in prop else None
+        self.email = prop.get("format") == "email"
+
+        self.minimum = prop.get("minimum")
+        self.maximum = prop.get("maximum")
+
+        self.min_items = prop.get("minItems")
+        self.max_items = prop.get("maxItems")
+        self.items = None
+        self.items_object = None
+        items_schema = prop.get("items")
+        if expected_type == "array" and isinstance(items_schema, dict):
+            self.items = CompiledField(items_schema)
+            if items_schema.get("type") == "object":
+                self.items_object = compile_object(items_schema)
+
+        self.object = compile_object(prop) if expected_type == "object" else None
 
-        if expected_type and not is_type_valid(value, expected_type):
+    def validate(self, key: str, value: Any):
+        expected_type = self.type
+
+        if self.type_check is not None and not self.type_check(value):
             raise HTTPException(status_code=400, detail=f"Field '{key}' should be of type {expected_type}")
 
         # Enum
-        if "enum" in prop and value not in prop["enum"]:
-            raise HTTPException(status_code=400, detail=f"Field '{key}' must be one of {prop['enum']}")
+        if self.enum is not MISSING and not enum_contains(self.enum_values, self.enum, value):
+            raise HTTPException(status_code=400, detail=f"Field '{key}' must be one of {self.enum}")
 
         # String constraints
         if expected_type == "string":
-            if "minLength" in prop and len(value) < prop["minLength"]:
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must be at least {prop['minLength']} characters")
-            if "maxLength" in prop and len(value) > prop["maxLength"]:
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must be at most {prop['maxLength']} characters")
-            if "pattern" in prop and not re.fullmatch(prop["pattern"], value):
+            if self.min_length is not None and len(value) < self.min_length:
+                raise HTTPException(status_code=400, detail=f"Field '{key}' must be at least {self.min_length} characters")
+            if self.max_length is not None and len(value) > self.max_length:
+                raise HTTPException(status_code=400, detail=f"Field '{key}' must be at most {self.max_length} characters")
+            if self.pattern is not None and not self.pattern(value):
                 raise HTTPException(status_code=400, detail=f"Field '{key}' does not match required pattern")
             # Basic format validation (optional)
-            if "format" in prop:
-                if prop["format"] == "email" and not re.fullmatch(r"[^@]+@[^@]+\.[^@]+", value):
-                    raise HTTPException(status_code=400, detail=f"Field '{key}' is not a valid email")
+            if self.email and not EMAIL_RE.fullmatch(value):
+                raise HTTPException(status_code=400, detail=f"Field '{key}' is not a valid email")
 
         # Number constraints
-        if expected_type in ["number", "integer"]:
-            if "minimum" in prop and value < prop["minimum"]:
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must be ≥ {prop['minimum']}")
-            if "maximum" in prop and value > prop["maximum"]:
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must be ≤ {prop['maximum']}")
+        elif expected_type == "number" or expected_type == "integer":
+            if self.minimum is not None and value < self.minimum:
+                raise HTTPException(status_code=400, detail=f"Field '{key}' must be ≥ {self.minimum}")
+            if self.maximum is not None and value > self.maximum:
+                raise HTTPException(status_code=400, detail=f"Field '{key}' must be ≤ {self.maximum}")
 
         # Array validation
-        if expected_type == "array":
-            if not isinstance(value, list):
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must be an array")
-
-            if "minItems" in prop and len(value) < prop["minItems"]:
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must have at least {prop['minItems']} items")
-            if "maxItems" in prop and len(value) > prop["maxItems"]:
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must have at most {prop['maxItems']} items")
-
-            # Validate array items
-            items_schema = prop.get("items")
-            if isinstance(items_schema, dict):
-                for i, item in enumerate(value):
-                    try:
-                        if items_schema.get("type") in ["string", "number", "boolean", "integer"]:
-                            if not is_type_valid(item, items_schema.get("type")):
-                                raise HTTPException(status_code=400, detail=f"Item {i} in '{key}' must be of type {items_schema['type']}")
-                        elif items_schema.get("type") == "array":
-                            # Recursive for nested arrays
-                            validate_json_schema(
-                                {"type": "array", **items_schema},
-                                item
-                            )
-                        elif items_schema.get("type") == "object":
-                            validate_json_schema(
-                                {
-                                    "type": "object",
-                                    "properties": items_schema.get("properties", {}),
-                                    "required": items_schema.get("required", [])
-                                },
-                                item
-                            )
-                    except HTTPException as e:
-                        raise HTTPException(status_code=400, detail=f"Error in array '{key}' at index {i}: {e.detail}")
+        elif expected_type == "array":
+            self.validate_size(key, value)
+            if self.items is not None:
+                self.validate_items(key, value)
 
         # Object validation (nested)
-        if expected_type == "object":
-            if not isinstance(value, dict):
-                raise HTTPException(status_code=400, detail=f"Field '{key}' must be an object")
-            validate_json_schema(
-                {
-                    "type": "object",
-                    "properties": prop.get("properties", {}),
-                    "required": prop.get("required", [])
-                },
-                value
-            )
+        elif expected_type == "object":
+            self.object.validate(value)
+
+    def validate_size(self, key: str, value: List[Any]):
+        if self.min_items is not None and len(value) < self.min_items:
+            raise HTTPException(status_code=400, detail=f"Field '{key}' must have at least {self.min_items} items")
+        if self.max_items is not None and len(value) > self.max_items:
+            raise HTTPException(status_code=400, detail=f"Field '{key}' must have at most {self.max_items} items")
+
+    def validate_items(self, key: str, value: List[Any]):
+        items = self.items
+        item_type = items.type
+        if item_type in PRIMITIVE_TYPES:
+            check = items.type_check
+            for i, item in enumerate(value):
+                if not check(item):
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"Error in array '{key}' at index {i}: Item {i} in '{key}' must be of type {item_type}"
+                    )
+        elif item_type == "array" or item_type == "object":
+            nested = self.items_object or items
+            for i, item in enumerate(value):
+                try:
+                    if not items.type_check(item):
+                        raise HTTPException(status_code=400, detail=f"Item {i} in '{key}' must be of type {item_type}")
+                    if item_type == "object":
+                        nested.validate(item)
+                    else:
+                        nested.validate(key, item)
+                except HTTPException as e:
+                    raise HTTPException(status_code=400, detail=f"Error in array '{key}' at index {i}: {e.detail}")
+
+
+def compile_object(prop: Dict[str, Any]) -> CompiledObject:
+    # Nested objects only honour properties/required, not if/then/else
+    fields = {key: CompiledField(p) for key, p in prop.get("properties", {}).items()}
+    return CompiledObject(fields, prop.get("required", []))
+
+
+def compile_condition(condition: Dict[str, Any]) -> List[tuple]:
+    """
+    Flatten a basic 'if' condition into (field, const) pairs
+    e.g., { "properties": { "hasGithub": { "const": true } } }
+    """
+    return [(field, field_condition.get("const")) for field, field_condition in condition.get("properties", {}).items()]
+
+
+def compile_pattern(pattern: str):
+    try:
+        return re.compile(pattern).fullmatch
+    except (re.error, TypeError):
+        # Keep the old behaviour of failing only when a value is actually checked
+        return lambda value: re.fullmatch(pattern, value)
+
+
+def enum_contains(values: Any, enum: Any, value: Any) -> bool:
+    try:
+        return value in values
+    except TypeError:
+        # Unhashable value (list/dict) against a set of hashable members
+        return value in enum
+
+
+_TYPE_CHECKS = {
+    "string": lambda v: isinstance(v, str),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+}
+
+
+def type_checker(expected: Any):
+    if isinstance(expected, str) and expected in _TYPE_CHECKS:
+        return _TYPE_CHECKS[expected]
+    return lambda value: False
 
 
 def is_type_valid(value: Any, expected: str) -> bool:
-    match expected:
-        case "string": return isinstance(value, str)
-        case "number": return isinstance(value, (int, float)) and not isinstance(value, bool)
-        case "integer": return isinstance(value, int) and not isinstance(value, bool)
-        case "boolean": return isinstance(value, bool)
-        case "object": return isinstance(value, dict)
-        case "array": return isinstance(value, list)
-        case _: return False
+    return type_checker(expected)(value)
 
 
 def condition_matches(condition: Dict[str, Any], data: Dict[str, Any]) -> bool:
@@ -132,9 +282,4 @@ def condition_matches(condition: Dict[str, Any], data: Dict[str, Any]) -> bool:
     Evaluate a basic 'if' condition based on properties and const values
     e.g., { "properties": { "hasGithub": { "const": true } } }
     """
-    props = condition.get("properties", {})
-    for field, field_condition in props.items():
-        const_val = field_condition.get("const")
-        if field not in data or data[field] != const_val:
-            return False
-    return True
\ No newline at end of file
+    return all(field in data and data[field] == const_val for field, const_val in compile_condition(condition))
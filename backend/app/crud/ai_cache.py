@@ -0,0 +1,70 @@
+import hashlib
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+from sqlalchemy import delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from dotenv import load_dotenv
+
+from ..core.cache import LRUCache, MISSING
+from ..models.models import AIResponseCache
+
+load_dotenv()
+
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "256"))
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", str(7 * 24 * 3600)))
+
+_memory = LRUCache(maxsize=AI_CACHE_SIZE, ttl=AI_CACHE_TTL)
+_counts = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0}
+
+
+def prompt_key(prompt: str) -> str:
+    """Case- and whitespace-folded prompt hash, so trivial variations share an entry."""
+    normalized = " ".join(prompt.casefold().split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+async def lookup(db: AsyncSession, key: str) -> Dict[str, Any] | None:
+    cached = _memory.get(key)
+    if cached is not MISSING:
+        _counts["memory_hits"] += 1
+        return cached
+
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=AI_CACHE_TTL)
+    result = await db.execute(
+        select(AIResponseCache.response)
+        .where(AIResponseCache.prompt_hash == key, AIResponseCache.created_at > cutoff)
+    )
+    response = result.scalar()
+    if response is None:
+        _counts["misses"] += 1
+        return None
+
+    _counts["db_hits"] += 1
+    _memory.set(key, response)
+    return response
+
+
+async def store(db: AsyncSession, key: str, prompt: str, response: Dict[str, Any]):
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=AI_CACHE_TTL)
+    await db.execute(
+        pg_insert(AIResponseCache)
+        .values(prompt_hash=key, prompt=prompt, response=response)
+        .on_conflict_do_update(
+            index_elements=[AIResponseCache.prompt_hash],
+            set_={"prompt": prompt, "response": response, "created_at": datetime.now(timezone.utc)},
+        )
+    )
+    # Expired rows are evicted on write; the created_at index keeps this cheap
+    await db.execute(delete(AIResponseCache).where(AIResponseCache.created_at <= cutoff))
+    await db.commit()
+    _memory.set(key, response)
+    _counts["stores"] += 1
+
+
+def stats() -> dict:
+    lookups = _counts["memory_hits"] + _counts["db_hits"] + _counts["misses"]
+    hit_rate = (_counts["memory_hits"] + _counts["db_hits"]) / lookups if lookups else 0.0
+    return {**_counts, "hit_rate": round(hit_rate, 4), "memory": _memory.stats()}
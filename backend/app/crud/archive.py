@@ -0,0 +1,182 @@
+import asyncio
+import gzip
+import os
+import time
+from datetime import datetime
+from itertools import groupby, islice
+from typing import NamedTuple
+from uuid import UUID
+from pydantic_core import from_json
+from sqlalchemy import Connection, desc, func, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from ..core.cache import LRUCache, MISSING
+from ..models.models import ArchivedSubmission
+
+load_dotenv()
+
+ARCHIVE_DIR = os.getenv("ARCHIVE_DIR", "archive")
+ARCHIVE_BLOCK_ROWS = int(os.getenv("ARCHIVE_BLOCK_ROWS", "256"))
+ARCHIVE_BLOCK_CACHE = int(os.getenv("ARCHIVE_BLOCK_CACHE", "64"))  # decompressed blocks kept in memory
+INDEX_BATCH_SIZE = 5000
+
+FORM_DATA_KEY = ',"form_data":'
+
+# (segment, block offset) -> {submission id: ArchivedRow}
+_blocks = LRUCache(maxsize=ARCHIVE_BLOCK_CACHE)
+
+
+class ArchivedRow(NamedTuple):
+    """An archived submission shaped like a hot-tier row: form_data is still JSON text."""
+    id: UUID
+    schema_id: UUID
+    form_data: str
+    submitted_at: datetime
+
+    @property
+    def _mapping(self) -> dict:
+        return self._asdict()
+
+
+def segment_line(row) -> str:
+    # form_data is embedded as Postgres rendered it, so reads give back the same document
+    return (
+        f'{{"id":"{row.id}","schema_id":"{row.schema_id}",'
+        f'"submitted_at":"{row.submitted_at.isoformat()}"{FORM_DATA_KEY}{row.form_data}}}\n'
+    )
+
+
+def parse_line(line: str) -> ArchivedRow:
+    head, _, form_data = line.partition(FORM_DATA_KEY)
+    meta = from_json(head + "}")
+    return ArchivedRow(UUID(meta["id"]), UUID(meta["schema_id"]), form_data[:-1], datetime.fromisoformat(meta["submitted_at"]))
+
+
+def partition_rows(conn: Connection, partition: str, batch_size: int = ARCHIVE_BLOCK_ROWS):
+    # An explicit cursor: driver-side ones stay open until commit, and the partition is dropped before that
+    conn.execute(text(
+        f"DECLARE archive_rows NO SCROLL CURSOR FOR SELECT id, schema_id, submitted_at, form_data::text AS form_data "
+        f"FROM {partition} ORDER BY schema_id, submitted_at DESC, id DESC"
+    ))
+    while batch := conn.execute(text(f"FETCH {batch_size} FROM archive_rows")).all():
+        yield from batch
+    conn.execute(text("CLOSE archive_rows"))
+
+
+def archive_partition(conn: Connection, partition: str) -> int:
+    """
+    Write a partition's rows to a gzip JSONL segment file under ARCHIVE_DIR
+    and index them in archived_submissions. Rows are sorted by schema, newest
+    first, and cut into blocks of ARCHIVE_BLOCK_ROWS that are separate gzip
+    members: a lookup decompresses one block, and zcat still reads the whole
+    file. The caller drops the partition in the same transaction.
+    """
+    os.makedirs(ARCHIVE_DIR, exist_ok=True)
+    segment = f"{partition}-{int(time.time())}.jsonl.gz"
+    path = os.path.join(ARCHIVE_DIR, segment)
+    rows = partition_rows(conn, partition)
+
+    archived = 0
+    entries = []
+    with open(path + ".tmp", "wb") as f:
+        for _, schema_rows in groupby(rows, key=lambda row: row.schema_id):
+            while block := list(islice(schema_rows, ARCHIVE_BLOCK_ROWS)):
+                data = gzip.compress("".join(segment_line(row) for row in block).encode(), mtime=0)
+                offset = f.tell()
+                f.write(data)
+                entries.extend(
+                    {"id": row.id, "schema_id": row.schema_id, "submitted_at": row.submitted_at,
+                     "segment": segment, "block_offset": offset, "block_length": len(data)}
+                    for row in block
+                )
+                archived += len(block)
+                if len(entries) >= INDEX_BATCH_SIZE:
+                    conn.execute(insert(ArchivedSubmission), entries)
+                    entries = []
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(path + ".tmp", path)
+    if entries:
+        conn.execute(insert(ArchivedSubmission), entries)
+    return archived
+
+
+def read_block(segment: str, offset: int, length: int) -> dict:
+    key = (segment, offset)
+    block = _blocks.get(key)
+    if block is MISSING:
+        with open(os.path.join(ARCHIVE_DIR, segment), "rb") as f:
+            f.seek(offset)
+            data = f.read(length)
+        block = {}
+        for line in gzip.decompress(data).decode().splitlines():
+            row = parse_line(line)
+            block[row.id] = row
+        _blocks.set(key, block)
+    return block
+
+
+def read_entries(entries) -> list[ArchivedRow]:
+    """Rows for index entries, in the entries' order. schema_id comes from the index, which dedupe may have repointed."""
+    blocks = {}
+    for entry in entries:
+        key = (entry.segment, entry.block_offset)
+        if key not in blocks:
+            blocks[key] = read_block(entry.segment, entry.block_offset, entry.block_length)
+    return [blocks[(entry.segment, entry.block_offset)][entry.id]._replace(schema_id=entry.schema_id) for entry in entries]
+
+
+async def list_rows(db: AsyncSession, schema_id: UUID, skip: int, limit: int, after: tuple[datetime, UUID] | None) -> list[ArchivedRow]:
+    query = (
+        select(ArchivedSubmission)
+        .where(ArchivedSubmission.schema_id == schema_id)
+        .order_by(desc(ArchivedSubmission.submitted_at), desc(ArchivedSubmission.id))
+    )
+    if after is not None:
+        query = query.where(tuple_(ArchivedSubmission.submitted_at, ArchivedSubmission.id) < tuple_(*after))
+    else:
+        query = query.offset(skip)
+    entries = (await db.execute(query.limit(limit))).scalars().all()
+    return await asyncio.to_thread(read_entries, entries) if entries else []
+
+
+async def get_row(db: AsyncSession, submission_id: UUID) -> ArchivedRow | None:
+    entry = (await db.execute(select(ArchivedSubmission).where(ArchivedSubmission.id == submission_id))).scalars().first()
+    if entry is None:
+        return None
+    return (await asyncio.to_thread(read_entries, [entry]))[0]
+
+
+async def count(db: AsyncSession, schema_id: UUID) -> int:
+    result = await db.execute(select(func.count()).select_from(ArchivedSubmission).where(ArchivedSubmission.schema_id == schema_id))
+    return result.scalar()
+
+
+async def stream_rows(db: AsyncSession, schema_id: UUID, batch_size: int = 1000):
+    """Yield a schema's archived submissions oldest first, in batches, with form_data parsed."""
+    result = await db.stream(
+        select(ArchivedSubmission)
+        .where(ArchivedSubmission.schema_id == schema_id)
+        .order_by(ArchivedSubmission.submitted_at, ArchivedSubmission.id)
+        .execution_options(yield_per=batch_size)
+    )
+    async for entries in result.scalars().partitions():
+        rows = await asyncio.to_thread(read_entries, entries)
+        yield [row._replace(form_data=from_json(row.form_data)) for row in rows]
+
+
+def iter_form_data(conn: Connection, schema_id: UUID, batch_size: int = 5000):
+    """Batches of a schema's archived form_data, for rebuilds run through migrations."""
+    entries = conn.execute(
+        select(ArchivedSubmission)
+        .where(ArchivedSubmission.schema_id == schema_id)
+        .order_by(ArchivedSubmission.segment, ArchivedSubmission.block_offset)
+        .execution_options(yield_per=batch_size)
+    )
+    for batch in entries.partitions():
+        yield [from_json(row.form_data) for row in read_entries(batch)]
+
+
+def stats() -> dict:
+    return _blocks.stats()
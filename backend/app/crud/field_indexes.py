@@ -0,0 +1,69 @@
+import hashlib
+import os
+from uuid import UUID
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.cache import LRUCache, MISSING
+from ..core.query import NUMERIC_TYPES
+from ..db.session import engine
+from ..db.partitions import create_index_concurrently
+
+INDEX_PREFIX = "ix_sub_field_"
+# Every index slows each insert into the schema's partitions, so their number is capped
+MAX_FIELD_INDEXES = int(os.getenv("MAX_FIELD_INDEXES", "8"))
+
+# index name -> exists; short TTL so indexes created by other workers show up
+_known = LRUCache(maxsize=4096, ttl=60)
+
+
+def index_name(schema_id: UUID, field: str) -> str:
+    return INDEX_PREFIX + hashlib.sha1(f"{schema_id}:{field}".encode()).hexdigest()[:32]
+
+
+def path_literal(path: tuple) -> str:
+    """SQL literal of the text[] path for #>>, safe for any key."""
+    elements = ",".join('"' + part.replace("\\", "\\\\").replace('"', '\\"') + '"' for part in path)
+    return "'{" + elements.replace("'", "''") + "}'"
+
+
+def field_expression(path: tuple, field_type: str) -> str:
+    """
+    SQL expression for a form_data field. Queries must use exactly this
+    text for the planner to match it against the expression index.
+    """
+    expression = f"(form_data #>> {path_literal(path)})"
+    if field_type in NUMERIC_TYPES:
+        return f"({expression}::numeric)"
+    return expression
+
+
+async def existing_indexes(db: AsyncSession, names: list[str]) -> set[str]:
+    unknown = [name for name in names if _known.get(name) is MISSING]
+    if unknown:
+        result = await db.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = 'submission_maintenance' AND indexname = ANY(:names)"),
+            {"names": unknown},
+        )
+        found = set(result.scalars().all())
+        for name in unknown:
+            _known.set(name, name in found)
+    return {name for name in names if _known.get(name)}
+
+
+async def indexed_fields(db: AsyncSession, schema_id: UUID, fields: list[str]) -> dict[str, str]:
+    """field -> index name, for those of `fields` that have an index."""
+    names = {index_name(schema_id, field): field for field in fields}
+    existing = await existing_indexes(db, list(names))
+    return {field: name for name, field in names.items() if name in existing}
+
+
+async def create_field_index(schema_id: UUID, path: tuple, field_type: str) -> str:
+    """Partial expression index over one schema's submissions, built concurrently so inserts keep flowing."""
+    name = index_name(schema_id, ".".join(path))
+    definition = f"({field_expression(path, field_type)}) WHERE schema_id = '{schema_id}'::uuid"
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        await conn.run_sync(create_index_concurrently, name, "submission_maintenance", definition)
+    _known.set(name, True)
+    return name
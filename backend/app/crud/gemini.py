@@ -1,10 +1,19 @@
-import requests
+import asyncio
+import httpx
 import os
+import time
+from fastapi import HTTPException
 from dotenv import load_dotenv
 
+from ..core.metrics import ai_call_seconds
+
 load_dotenv()
 
 GEMINI_API_KEY = os.getenv("API_KEY")
+GEMINI_API_URL = os.getenv("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent")
+AI_TIMEOUT = float(os.getenv("AI_TIMEOUT", "30"))
+AI_MAX_CONCURRENCY = int(os.getenv("AI_MAX_CONCURRENCY", "8"))
+AI_MAX_QUEUE = int(os.getenv("AI_MAX_QUEUE", "32"))
 
 gemini_prompt = '''
 # JSON Schema Generator AI Prompt
@@ -207,8 +216,54 @@ Remember: Your response must be valid JSON that can be directly parsed and used
 User_Query : 
 '''
 
-def call_gemini(prompt: str) -> str:
-    url = f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}"
+_client: httpx.AsyncClient | None = None
+_slots = asyncio.Semaphore(AI_MAX_CONCURRENCY)
+_queued = 0
+_inflight: dict[str, asyncio.Task] = {}
+
+
+def get_client() -> httpx.AsyncClient:
+    """Shared keep-alive client, created on first use."""
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            timeout=httpx.Timeout(AI_TIMEOUT, connect=5.0),
+            limits=httpx.Limits(max_connections=AI_MAX_CONCURRENCY, max_keepalive_connections=AI_MAX_CONCURRENCY),
+            headers={"Content-Type": "application/json"},
+        )
+    return _client
+
+
+async def close_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
+async def call_gemini(prompt: str) -> str:
+    """
+    Identical prompts that are already in flight share one upstream call.
+    shield() keeps a disconnecting caller from cancelling it for the others.
+    """
+    task = _inflight.get(prompt)
+    if task is None:
+        task = asyncio.ensure_future(_call_gemini(prompt))
+        _inflight[prompt] = task
+        task.add_done_callback(lambda _: _inflight.pop(prompt, None))
+    return await asyncio.shield(task)
+
+
+async def _call_gemini(prompt: str) -> str:
+    global _queued
+    if _slots.locked() and _queued >= AI_MAX_QUEUE:
+        raise HTTPException(status_code=429, detail="AI service is busy, try again shortly", headers={"Retry-After": "1"})
+
+    _queued += 1
+    try:
+        await _slots.acquire()
+    finally:
+        _queued -= 1
 
     payload = {
         "contents": [
@@ -220,8 +275,29 @@ def call_gemini(prompt: str) -> str:
         ]
     }
 
-    response = requests.post(url, json=payload, headers={"Content-Type": "application/json"})
-    response.raise_for_status()
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        response = await get_client().post(GEMINI_API_URL, params={"key": GEMINI_API_KEY}, json=payload)
+        response.raise_for_status()
+    except httpx.TimeoutException:
+        outcome = "timeout"
+        raise HTTPException(status_code=504, detail="AI service timed out")
+    except httpx.HTTPStatusError as e:
+        outcome = str(e.response.status_code)
+        if e.response.status_code == 429:
+            raise HTTPException(status_code=429, detail="AI service is busy, try again shortly", headers={"Retry-After": "1"})
+        raise HTTPException(status_code=502, detail="AI service returned an error")
+    except httpx.HTTPError:
+        outcome = "unreachable"
+        raise HTTPException(status_code=502, detail="AI service is unreachable")
+    finally:
+        _slots.release()
+        ai_call_seconds.observe(time.perf_counter() - started, outcome)
+
     data = response.json()
+    return data["candidates"][0]["content"]["parts"][0]["text"]
+
 
-    return data["candidates"][0]["content"]["parts"][0]["text"]
\ No newline at end of file
+def stats() -> dict:
+    return {"in_flight": len(_inflight), "queued": _queued}
@@ -0,0 +1,125 @@
+import hashlib
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict
+from uuid import UUID, uuid4
+from fastapi import HTTPException
+from sqlalchemy import Connection, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from dotenv import load_dotenv
+
+from ..core.bloom import RotatingBloomFilter
+from ..core.cache import LRUCache, MISSING
+from ..models.models import IdempotencyKey
+from . import submission as crud
+
+load_dotenv()
+
+IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+IDEMPOTENCY_FILTER_CAPACITY = int(os.getenv("IDEMPOTENCY_FILTER_CAPACITY", "200000"))  # keys per filter generation
+IDEMPOTENCY_KEY_TTL = float(os.getenv("IDEMPOTENCY_KEY_TTL", str(24 * 3600)))
+MAX_KEY_LENGTH = 255
+
+# key -> (fingerprint, submission_id) of recent requests
+_recent = LRUCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl=IDEMPOTENCY_KEY_TTL)
+# Every key this worker has stored or seen; a miss means the table lookup can be skipped
+_seen = RotatingBloomFilter(IDEMPOTENCY_FILTER_CAPACITY)
+_counts = {"memory_replays": 0, "db_replays": 0, "conflict_replays": 0, "filter_skips": 0, "stored": 0}
+
+
+@dataclass
+class Claim:
+    key: str
+    fingerprint: str
+    replayed: bool = False
+
+
+def claim(key: str, body: bytes) -> Claim:
+    if not key or len(key) > MAX_KEY_LENGTH:
+        raise HTTPException(status_code=400, detail=f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+    return Claim(key, hashlib.sha256(body).hexdigest())
+
+
+async def lookup(db: AsyncSession, claim: Claim) -> UUID | None:
+    """
+    The submission an earlier request with this key created, or None.
+    Recent keys are answered from memory; the table is only read when the
+    filter says this worker may have seen the key. Keys first seen by
+    another worker are caught by the insert in create_submission instead.
+    """
+    entry = _recent.get(claim.key)
+    if entry is not MISSING:
+        _counts["memory_replays"] += 1
+        return replay(claim, *entry)
+    if claim.key not in _seen:
+        _counts["filter_skips"] += 1
+        return None
+
+    row = (await db.execute(
+        select(IdempotencyKey.fingerprint, IdempotencyKey.submission_id).where(IdempotencyKey.key == claim.key)
+    )).first()
+    if row is None:
+        return None
+    _counts["db_replays"] += 1
+    remember(claim.key, row.fingerprint, row.submission_id)
+    return replay(claim, row.fingerprint, row.submission_id)
+
+
+async def create_submission(db: AsyncSession, claim: Claim, schema_id: UUID, form_data: Dict[str, Any], schema_json: Dict[str, Any]) -> UUID:
+    """
+    Record the key and insert the submission in one transaction. If another
+    request holds the key, the insert waits for it and the submission that
+    request created is returned instead.
+    """
+    submission_id = uuid4()
+    claimed = await db.execute(
+        pg_insert(IdempotencyKey)
+        .values(key=claim.key, fingerprint=claim.fingerprint, submission_id=submission_id)
+        .on_conflict_do_nothing(index_elements=[IdempotencyKey.key])
+        .returning(IdempotencyKey.key)
+    )
+    if claimed.first() is None:
+        await db.rollback()
+        row = (await db.execute(
+            select(IdempotencyKey.fingerprint, IdempotencyKey.submission_id).where(IdempotencyKey.key == claim.key)
+        )).one()
+        _counts["conflict_replays"] += 1
+        remember(claim.key, row.fingerprint, row.submission_id)
+        return replay(claim, row.fingerprint, row.submission_id)
+
+    row = {"id": submission_id, "schema_id": schema_id, "form_data": form_data}
+    await crud.insert_submission_rows(db, [row], {schema_id: schema_json})
+    await db.commit()
+    _counts["stored"] += 1
+    remember(claim.key, claim.fingerprint, submission_id)
+    return submission_id
+
+
+def replay(claim: Claim, fingerprint: str, submission_id: UUID) -> UUID:
+    if fingerprint != claim.fingerprint:
+        raise HTTPException(status_code=422, detail="Idempotency-Key was already used with a different request body")
+    claim.replayed = True
+    return submission_id
+
+
+def remember(key: str, fingerprint: str, submission_id: UUID):
+    _recent.set(key, (fingerprint, submission_id))
+    _seen.add(key)
+
+
+def expire_keys(conn: Connection) -> dict:
+    """Delete keys older than IDEMPOTENCY_KEY_TTL; run from cron through migrations."""
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=IDEMPOTENCY_KEY_TTL)
+    result = conn.execute(delete(IdempotencyKey).where(IdempotencyKey.created_at <= cutoff))
+    return {"expired": result.rowcount}
+
+
+def stats() -> dict:
+    return {
+        **_counts,
+        **{f"memory_{k}": v for k, v in _recent.stats().items()},
+        **{f"filter_{k}": v for k, v in _seen.stats().items()},
+    }
@@ -0,0 +1,186 @@
+import asyncio
+import json
+import os
+from datetime import datetime, timezone
+from typing import Any, Dict
+from uuid import UUID, uuid4
+from fastapi import HTTPException
+from sqlalchemy.exc import InterfaceError, OperationalError, TimeoutError as PoolTimeoutError
+from dotenv import load_dotenv
+
+from ..db.session import SessionLocal
+from . import submission as crud
+
+load_dotenv()
+
+# off:     /submit-form writes synchronously (default)
+# flush:   rows are group-committed; the request waits for its batch to commit
+# enqueue: the request returns once the row is queued (faster, but queued
+#          rows are lost if the process dies before the next flush)
+INGEST_MODE = os.getenv("INGEST_MODE", "off")
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "500"))
+INGEST_FLUSH_MS = int(os.getenv("INGEST_FLUSH_MS", "20"))
+INGEST_QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", "10000"))
+INGEST_ENQUEUE_TIMEOUT = float(os.getenv("INGEST_ENQUEUE_TIMEOUT", "1"))
+# NDJSON file for enqueue-mode rows that were acknowledged but could not be stored
+INGEST_DEAD_LETTER_PATH = os.getenv("INGEST_DEAD_LETTER_PATH", "ingest-dead-letters.ndjson")
+
+_STOP = object()
+
+
+def unavailable(error: Exception) -> bool:
+    # The database rather than a row is at fault; retrying rows one by one would only wait on each
+    return (
+        isinstance(error, (OSError, asyncio.TimeoutError, PoolTimeoutError, OperationalError, InterfaceError))
+        or getattr(error, "connection_invalidated", False)
+    )
+
+
+class IngestQueue:
+    """
+    In-process write-behind buffer. Rows get their id up front, are queued,
+    and a single worker task inserts them in batches of up to `batch_size`
+    rows or whatever arrived within `flush_ms`, with one commit per batch.
+    A batch that fails on its data is retried row by row, so one bad row
+    does not take the others down with it.
+    """
+
+    def __init__(self, batch_size: int, flush_ms: int, maxsize: int, wait_for_flush: bool):
+        self.batch_size = batch_size
+        self.flush_interval = flush_ms / 1000
+        self.wait_for_flush = wait_for_flush
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=maxsize)
+        self.worker: asyncio.Task | None = None
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+        self.dead_lettered = 0
+
+    async def start(self):
+        if self.worker is None:
+            self.worker = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop accepting work and flush everything already queued."""
+        if self.worker is None:
+            return
+        await self.queue.put(_STOP)
+        await self.worker
+        self.worker = None
+
+    async def submit(self, schema_id: UUID, form_data: Dict[str, Any], schema_json: Dict[str, Any]) -> UUID:
+        if self.worker is None:
+            raise HTTPException(status_code=503, detail="Ingestion queue is not running")
+
+        submission_id = uuid4()
+        done = asyncio.get_running_loop().create_future() if self.wait_for_flush else None
+        row = {"id": submission_id, "schema_id": schema_id, "form_data": form_data}
+        try:
+            # A full queue makes callers wait, and eventually refuses them
+            await asyncio.wait_for(self.queue.put((row, schema_json, done)), INGEST_ENQUEUE_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Submission queue is full, try again shortly", headers={"Retry-After": "1"})
+        if done is not None:
+            await done
+        return submission_id
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            first = await self.queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    item = self.queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    remaining = deadline - loop.time()
+                    if remaining <= 0:
+                        break
+                    try:
+                        item = await asyncio.wait_for(self.queue.get(), remaining)
+                    except asyncio.TimeoutError:
+                        break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+    async def _flush(self, batch: list):
+        try:
+            await self._insert(batch)
+        except Exception as e:
+            if len(batch) == 1 or unavailable(e):
+                self._fail(batch, e)
+                return
+            print(f"Ingest flush of {len(batch)} rows failed, retrying one at a time: {e!r}")
+            for i, item in enumerate(batch):
+                try:
+                    await self._insert([item])
+                except Exception as e:
+                    if unavailable(e):
+                        self._fail(batch[i:], e)
+                        return
+                    self._fail([item], e)
+
+    async def _insert(self, batch: list):
+        async with SessionLocal() as session:
+            schemas = {row["schema_id"]: schema_json for row, schema_json, _ in batch}
+            await crud.insert_submission_rows(session, [row for row, _, _ in batch], schemas)
+            await session.commit()
+
+        self.flushed += len(batch)
+        self.batches += 1
+        for _, _, done in batch:
+            if done is not None and not done.done():
+                done.set_result(None)
+
+    def _fail(self, batch: list, error: Exception):
+        self.failed += len(batch)
+        print(f"Ingest of {len(batch)} rows failed: {error!r}")
+        acknowledged = []
+        for row, _, done in batch:
+            if done is None:
+                acknowledged.append(row)
+            elif not done.done():
+                done.set_exception(HTTPException(status_code=503, detail="Failed to store submission"))
+        if acknowledged:
+            self._dead_letter(acknowledged, error)
+
+    def _dead_letter(self, rows: list, error: Exception):
+        """
+        Rows already acknowledged to their clients (enqueue mode) are
+        appended to INGEST_DEAD_LETTER_PATH for recovery instead of being
+        dropped. A file, so they are kept even when the database failed.
+        """
+        failed_at = datetime.now(timezone.utc).isoformat()
+        try:
+            with open(INGEST_DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps({**row, "error": repr(error), "failed_at": failed_at}, default=str) + "\n")
+        except OSError as e:
+            print(f"Could not write {len(rows)} unstored rows to {INGEST_DEAD_LETTER_PATH}: {e!r}; rows: {rows!r}")
+            return
+        self.dead_lettered += len(rows)
+        print(f"Wrote {len(rows)} unstored rows to {INGEST_DEAD_LETTER_PATH}")
+
+    def stats(self) -> dict:
+        return {
+            "mode": INGEST_MODE,
+            "queued": self.queue.qsize(),
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "dead_lettered": self.dead_lettered,
+        }
+
+
+queue = IngestQueue(INGEST_BATCH_SIZE, INGEST_FLUSH_MS, INGEST_QUEUE_SIZE, wait_for_flush=INGEST_MODE != "enqueue")
+
+
+def enabled() -> bool:
+    return INGEST_MODE in ("flush", "enqueue")
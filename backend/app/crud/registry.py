@@ -0,0 +1,80 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict
+from uuid import UUID
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from ..core.cache import LRUCache, MISSING
+from ..db.session import is_replica
+from . import submission as crud
+
+load_dotenv()
+
+# Schemas are immutable once created, so entries only leave the cache
+# through size pressure or the (long) TTL.
+SCHEMA_CACHE_SIZE = int(os.getenv("SCHEMA_CACHE_SIZE", "1024"))
+SCHEMA_CACHE_TTL = float(os.getenv("SCHEMA_CACHE_TTL", "3600"))
+SCHEMA_NEGATIVE_TTL = float(os.getenv("SCHEMA_NEGATIVE_TTL", "30"))
+
+
+@dataclass(frozen=True)
+class CachedSchema:
+    id: UUID
+    name: str | None
+    schema_json: Dict[str, Any]
+    created_at: datetime | None
+
+
+_schemas = LRUCache(maxsize=SCHEMA_CACHE_SIZE, ttl=SCHEMA_CACHE_TTL)
+_ids_by_hash = LRUCache(maxsize=SCHEMA_CACHE_SIZE, ttl=SCHEMA_CACHE_TTL)
+_negative_hits = 0
+
+
+async def get_schema(db: AsyncSession, schema_id: UUID) -> CachedSchema | None:
+    global _negative_hits
+    cached = _schemas.get(schema_id)
+    if cached is not MISSING:
+        if cached is None:
+            _negative_hits += 1
+        return cached
+
+    schema_obj = await crud.get_schema_by_id(db, schema_id)
+    if not schema_obj:
+        # A lagging replica may not have a new schema yet; only the primary's misses are remembered
+        if not is_replica(db):
+            _schemas.set(schema_id, None, ttl=SCHEMA_NEGATIVE_TTL)
+        return None
+    return remember(schema_obj)
+
+
+async def get_or_create_schema(db: AsyncSession, name: str | None, schema_json: Dict[str, Any], digest: str) -> CachedSchema:
+    """Resolve an ad-hoc schema to its stored row, inserting it only if unseen."""
+    schema_id = _ids_by_hash.get(digest)
+    if schema_id is not MISSING:
+        cached = _schemas.get(schema_id)
+        if cached:
+            return cached
+    return remember(await crud.create_schema(db, name, schema_json, digest))
+
+
+def remember(schema_obj) -> CachedSchema:
+    cached = CachedSchema(
+        id=schema_obj.id,
+        name=schema_obj.name,
+        schema_json=schema_obj.schema_json,
+        created_at=schema_obj.created_at,
+    )
+    _schemas.set(cached.id, cached)
+    if schema_obj.content_hash:
+        _ids_by_hash.set(schema_obj.content_hash, cached.id)
+    return cached
+
+
+def forget(schema_id: UUID):
+    _schemas.pop(schema_id)
+
+
+def stats() -> dict:
+    return {**_schemas.stats(), "negative_hits": _negative_hits}
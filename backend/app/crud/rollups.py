@@ -0,0 +1,81 @@
+import random
+from typing import Any, Dict, List
+from uuid import UUID
+from sqlalchemy import BigInteger, cast, func, delete
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
+from ..core.cache import LRUCache, MISSING
+from ..core.rollups import Aggregate, rollup_plan, aggregate_rows, shape_stats
+from ..models.models import FieldRollup
+
+ROLLUP_SHARDS = 8
+
+_plans = LRUCache(maxsize=1024)
+
+
+def plan_for(schema_id: UUID, schema_json: Dict[str, Any]):
+    plan = _plans.get(schema_id)
+    if plan is MISSING:
+        plan = rollup_plan(schema_json)
+        _plans.set(schema_id, plan)
+    return plan
+
+
+async def record(db: AsyncSession, schema_id: UUID, schema_json: Dict[str, Any], rows: List[Dict[str, Any]]):
+    """Fold new submissions into the rollups inside the caller's transaction."""
+    plan = plan_for(schema_id, schema_json)
+    if plan:
+        await apply(db, schema_id, aggregate_rows(plan, rows))
+
+
+async def apply(db: AsyncSession, schema_id: UUID, aggregate: Aggregate):
+    """
+    Upsert into one random shard, so concurrent writers to a hot schema
+    rarely wait on each other's summary and bucket rows until commit.
+    """
+    if aggregate:
+        await db.execute(upsert_statement(), upsert_params(schema_id, aggregate, random.randrange(ROLLUP_SHARDS)))
+
+
+def upsert_statement():
+    statement = pg_insert(FieldRollup)
+    return statement.on_conflict_do_update(
+        index_elements=[FieldRollup.schema_id, FieldRollup.field, FieldRollup.bucket, FieldRollup.shard],
+        set_={
+            "count": FieldRollup.count + statement.excluded.count,
+            "total": FieldRollup.total + statement.excluded.total,
+            "min_value": func.least(FieldRollup.min_value, statement.excluded.min_value),
+            "max_value": func.greatest(FieldRollup.max_value, statement.excluded.max_value),
+        },
+    )
+
+
+def upsert_params(schema_id: UUID, aggregate: Aggregate, shard: int = 0) -> List[dict]:
+    # Sorted so concurrent writers lock rollup rows in the same order
+    return [
+        {"schema_id": schema_id, "field": field, "bucket": bucket, "shard": shard,
+         "count": count, "total": total, "min_value": low, "max_value": high}
+        for (field, bucket), (count, total, low, high) in sorted(aggregate.items())
+    ]
+
+
+async def get_stats(db: AsyncSession, schema_id: UUID, schema_json: Dict[str, Any]) -> Dict[str, Any]:
+    result = await db.execute(
+        select(
+            FieldRollup.field,
+            FieldRollup.bucket,
+            cast(func.sum(FieldRollup.count), BigInteger).label("count"),
+            func.sum(FieldRollup.total).label("total"),
+            func.min(FieldRollup.min_value).label("min_value"),
+            func.max(FieldRollup.max_value).label("max_value"),
+        )
+        .where(FieldRollup.schema_id == schema_id)
+        .group_by(FieldRollup.field, FieldRollup.bucket)
+    )
+    return shape_stats(plan_for(schema_id, schema_json), result.all())
+
+
+async def clear(db: AsyncSession, schema_id: UUID):
+    await db.execute(delete(FieldRollup).where(FieldRollup.schema_id == schema_id))
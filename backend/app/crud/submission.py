@@ -1,34 +1,116 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, insert, tuple_, update, text, or_, literal, literal_column, Numeric, cast, Text, BigInteger
 from sqlalchemy.future import select
-from ..models.models import SchemaMaintenance, SubmissionMaintenance
-from uuid import UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..models.models import SchemaMaintenance, SubmissionMaintenance, RecordCounter
+from uuid import UUID, uuid4
+from datetime import datetime, timedelta
+import random
+from ..core.hashing import content_hash
+from ..core.query import RANGE_OPS, containment_document
+from .field_indexes import field_expression
+from . import rollups, archive
 
-async def create_schema(db: AsyncSession, name: str | None, schema_json: dict):
-    schema = SchemaMaintenance(name=name, schema_json=schema_json)
-    db.add(schema)
+async def create_schema(db: AsyncSession, name: str | None, schema_json: dict, digest: str | None = None):
+    """
+    Store a schema by content hash. An identical schema that already exists
+    is returned instead of inserting a duplicate row.
+    """
+    digest = digest or content_hash(schema_json)
+    result = await db.execute(
+        pg_insert(SchemaMaintenance)
+        .values(id=uuid4(), name=name, schema_json=schema_json, content_hash=digest)
+        .on_conflict_do_nothing(index_elements=[SchemaMaintenance.content_hash])
+        .returning(SchemaMaintenance)
+    )
+    schema = result.scalars().first()
+    if schema is None:
+        schema = await get_schema_by_hash(db, digest)
+    else:
+        await bump_counter(db, SCHEMA_COUNTER, 1)
+        await db.execute(insert(RecordCounter), counter_rows(submission_counter(schema.id)))
     await db.commit()
-    await db.refresh(schema)
     return schema
 
+async def get_schema_by_hash(db: AsyncSession, digest: str):
+    result = await db.execute(select(SchemaMaintenance).where(SchemaMaintenance.content_hash == digest))
+    return result.scalars().first()
+
 async def get_schema_by_id(db: AsyncSession, schema_id: UUID):
     result = await db.execute(select(SchemaMaintenance).where(SchemaMaintenance.id == schema_id))
     return result.scalars().first()
 
-async def list_schemas(db: AsyncSession, skip: int = 0, limit: int = 10):
-    result = await db.execute(
-        select(SchemaMaintenance)
-        .order_by(desc(SchemaMaintenance.created_at))
-        .offset(skip)
-        .limit(limit)
-    )
+async def list_schemas(db: AsyncSession, skip: int = 0, limit: int = 10, after: tuple[datetime, UUID] | None = None):
+    result = await db.execute(schema_page(select(SchemaMaintenance), skip, limit, after))
     return result.scalars().all()
 
-async def get_schema_count(db: AsyncSession):
+async def list_schemas_json(db: AsyncSession, skip: int = 0, limit: int = 10, after: tuple[datetime, UUID] | None = None):
+    """list_schemas as plain rows, with schema_json left as JSON text."""
+    query = select(
+        SchemaMaintenance.id,
+        SchemaMaintenance.name,
+        cast(SchemaMaintenance.schema_json, Text).label("schema_json"),
+        SchemaMaintenance.created_at,
+    )
+    result = await db.execute(schema_page(query, skip, limit, after))
+    return result.all()
+
+def schema_page(query, skip: int, limit: int, after: tuple[datetime, UUID] | None):
+    query = query.order_by(desc(SchemaMaintenance.created_at), desc(SchemaMaintenance.id))
+    if after is not None:
+        # Keyset pagination: seek past the last row of the previous page
+        query = query.where(tuple_(SchemaMaintenance.created_at, SchemaMaintenance.id) < tuple_(*after))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+SCHEMA_COUNTER = "schemas"
+COUNTER_SHARDS = 8
+
+def submission_counter(schema_id: UUID) -> str:
+    return f"submissions:{schema_id}"
+
+def counter_rows(key: str, value: int = 0) -> list[dict]:
+    """Every shard of a new counter, so bump_counter always finds the row it picks."""
+    return [{"key": key, "shard": shard, "value": value if shard == 0 else 0} for shard in range(COUNTER_SHARDS)]
+
+async def bump_counter(db: AsyncSession, key: str, delta: int):
+    """
+    Add to a random shard of a counter inside the caller's transaction.
+    Counters that were never seeded have no rows, so reads keep falling
+    back to count(*).
+    """
+    await db.execute(
+        update(RecordCounter)
+        .where(RecordCounter.key == key, RecordCounter.shard == random.randrange(COUNTER_SHARDS))
+        .values(value=RecordCounter.value + delta)
+    )
+
+async def read_counter(db: AsyncSession, key: str) -> int | None:
+    result = await db.execute(select(cast(func.sum(RecordCounter.value), BigInteger)).where(RecordCounter.key == key))
+    return result.scalar()
+
+async def get_schema_count(db: AsyncSession, approximate: bool = False):
+    if approximate:
+        # Planner estimate, refreshed by (auto)vacuum/analyze; -1 until the first analyze
+        result = await db.execute(text("SELECT reltuples::bigint FROM pg_class WHERE oid = 'schema_maintenance'::regclass"))
+        estimate = result.scalar()
+        if estimate is not None and estimate >= 0:
+            return estimate
+
+    count = await read_counter(db, SCHEMA_COUNTER)
+    if count is not None:
+        return count
     result = await db.execute(select(func.count()).select_from(SchemaMaintenance))
     return result.scalar()
 
 async def get_submission_count(db: AsyncSession, schema_id: UUID):
+    count = await read_counter(db, submission_counter(schema_id))
+    if count is not None:
+        return count
+    return await get_table_submission_count(db, schema_id) + await archive.count(db, schema_id)
+
+async def get_table_submission_count(db: AsyncSession, schema_id: UUID):
     result = await db.execute(
         select(func.count())
         .select_from(SubmissionMaintenance)
@@ -36,27 +118,146 @@ async def get_submission_count(db: AsyncSession, schema_id: UUID):
     )
     return result.scalar()
 
-async def create_submission(db: AsyncSession, schema_id: UUID, form_data: dict):
+async def recent_schema_ids(db: AsyncSession, limit: int, since: timedelta = timedelta(days=1)):
+    """Schemas with submissions in the last `since`, most recently used first."""
+    result = await db.execute(
+        select(SubmissionMaintenance.schema_id)
+        .where(SubmissionMaintenance.submitted_at > func.now() - since)
+        .group_by(SubmissionMaintenance.schema_id)
+        .order_by(desc(func.max(SubmissionMaintenance.submitted_at)))
+        .limit(limit)
+    )
+    return result.scalars().all()
+
+async def create_submission(db: AsyncSession, schema_id: UUID, form_data: dict, schema_json: dict):
     sub = SubmissionMaintenance(schema_id=schema_id, form_data=form_data)
     db.add(sub)
+    await bump_counter(db, submission_counter(schema_id), 1)
+    await rollups.record(db, schema_id, schema_json, [form_data])
     await db.commit()
-    await db.refresh(sub)
     return sub
 
-async def list_submissions(db: AsyncSession, schema_id: UUID, skip: int = 0, limit: int = 10):
-    result = await db.execute(
-        select(SubmissionMaintenance)
+async def create_submissions(db: AsyncSession, schema_id: UUID, rows: list[dict], schema_json: dict) -> list[UUID]:
+    """
+    Insert many submissions in one transaction. SQLAlchemy batches the
+    parameter sets into multi-row INSERT ... VALUES statements.
+    """
+    if not rows:
+        return []
+    params = [{"id": uuid4(), "schema_id": schema_id, "form_data": form_data} for form_data in rows]
+    await insert_submission_rows(db, params, {schema_id: schema_json})
+    await db.commit()
+    return [p["id"] for p in params]
+
+async def insert_submission_rows(db: AsyncSession, params: list[dict], schemas: dict[UUID, dict]):
+    """
+    Insert prepared {id, schema_id, form_data} rows, possibly for several
+    schemas (`schemas` maps their ids to schema_json), and update their
+    counters and rollups. The caller commits.
+    """
+    await db.execute(insert(SubmissionMaintenance), params)
+    per_schema = {}
+    for p in params:
+        per_schema.setdefault(p["schema_id"], []).append(p["form_data"])
+    # Sorted so concurrent flushes lock counter and rollup rows in the same order
+    for schema_id, rows in sorted(per_schema.items()):
+        await bump_counter(db, submission_counter(schema_id), len(rows))
+        await rollups.record(db, schema_id, schemas[schema_id], rows)
+
+async def list_submissions(db: AsyncSession, schema_id: UUID, skip: int = 0, limit: int = 10, after: tuple[datetime, UUID] | None = None):
+    result = await db.execute(submission_page(select(SubmissionMaintenance), schema_id, skip, limit, after))
+    return result.scalars().all()
+
+async def list_submissions_json(db: AsyncSession, schema_id: UUID, skip: int = 0, limit: int = 10, after: tuple[datetime, UUID] | None = None):
+    """
+    list_submissions as plain rows, with form_data left as JSON text. Pages
+    that run past the table continue into the archive: whole months are
+    archived at a time, so archived rows are older than every row left.
+    """
+    result = await db.execute(submission_page(submission_json_columns(), schema_id, skip, limit, after))
+    rows = result.all()
+    if len(rows) < limit:
+        if after is None and not rows and skip:
+            # Offset pagination past the table's end: skip what the table held
+            skip -= await get_table_submission_count(db, schema_id)
+        else:
+            skip = 0
+        rows += await archive.list_rows(db, schema_id, max(skip, 0), limit - len(rows), after)
+    return rows
+
+def submission_json_columns():
+    return select(
+        SubmissionMaintenance.id,
+        SubmissionMaintenance.schema_id,
+        cast(SubmissionMaintenance.form_data, Text).label("form_data"),
+        SubmissionMaintenance.submitted_at,
+    )
+
+def submission_page(query, schema_id: UUID, skip: int, limit: int, after: tuple[datetime, UUID] | None):
+    query = (
+        query
         .where(SubmissionMaintenance.schema_id == schema_id)
-        .order_by(desc(SubmissionMaintenance.submitted_at))
-        .offset(skip)
-        .limit(limit)
+        .order_by(desc(SubmissionMaintenance.submitted_at), desc(SubmissionMaintenance.id))
+    )
+    if after is not None:
+        query = query.where(tuple_(SubmissionMaintenance.submitted_at, SubmissionMaintenance.id) < tuple_(*after))
+    else:
+        query = query.offset(skip)
+    return query.limit(limit)
+
+async def query_submissions(db: AsyncSession, schema_id: UUID, predicates: list, limit: int = 10, after: tuple[datetime, UUID] | None = None):
+    """
+    Filter a schema's submissions by field predicates: eq/in become JSONB
+    containment (GIN), ranges compare the same expression the per-field
+    indexes are built on.
+    """
+    # Inlined as a literal so the planner can match per-schema partial indexes
+    query = (
+        select(SubmissionMaintenance)
+        .where(SubmissionMaintenance.schema_id == literal_column(f"'{schema_id}'::uuid"))
+        .order_by(desc(SubmissionMaintenance.submitted_at), desc(SubmissionMaintenance.id))
     )
+    for predicate in predicates:
+        if predicate.op == "eq":
+            query = query.where(SubmissionMaintenance.form_data.contains(containment_document(predicate, predicate.value)))
+        elif predicate.op == "in":
+            query = query.where(or_(*(
+                SubmissionMaintenance.form_data.contains(containment_document(predicate, value))
+                for value in predicate.value
+            )))
+        else:
+            expression = literal_column(field_expression(predicate.path, predicate.type))
+            query = query.where(expression.op(RANGE_OPS[predicate.op])(literal(predicate.value, Numeric)))
+    if after is not None:
+        query = query.where(tuple_(SubmissionMaintenance.submitted_at, SubmissionMaintenance.id) < tuple_(*after))
+    result = await db.execute(query.limit(limit))
     return result.scalars().all()
 
-async def get_submission_detail(db: AsyncSession, submission_id: UUID):
-    result = await db.execute(
-        select(SubmissionMaintenance, SchemaMaintenance)
-        .join(SchemaMaintenance, SubmissionMaintenance.schema_id == SchemaMaintenance.id)
-        .where(SubmissionMaintenance.id == submission_id)
+async def stream_submissions(db: AsyncSession, schema_id: UUID, batch_size: int = 1000):
+    """
+    Yield submissions of a schema in batches through a server-side cursor,
+    oldest first, so memory use does not grow with the number of rows.
+    Archived submissions, the oldest, come first.
+    """
+    async for batch in archive.stream_rows(db, schema_id, batch_size):
+        yield batch
+    result = await db.stream(
+        select(SubmissionMaintenance.id, SubmissionMaintenance.submitted_at, SubmissionMaintenance.form_data)
+        .where(SubmissionMaintenance.schema_id == schema_id)
+        .order_by(SubmissionMaintenance.submitted_at, SubmissionMaintenance.id)
+        .execution_options(yield_per=batch_size)
     )
-    return result.first()
+    async for batch in result.partitions():
+        yield batch
+
+async def get_submission(db: AsyncSession, submission_id: UUID):
+    result = await db.execute(select(SubmissionMaintenance).where(SubmissionMaintenance.id == submission_id))
+    return result.scalars().first()
+
+async def get_submission_json(db: AsyncSession, submission_id: UUID):
+    """get_submission as a plain row, with form_data left as JSON text."""
+    result = await db.execute(submission_json_columns().where(SubmissionMaintenance.id == submission_id))
+    row = result.first()
+    if row is None:
+        row = await archive.get_row(db, submission_id)
+    return row
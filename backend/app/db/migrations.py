@@ -0,0 +1,292 @@
+import asyncio
+import sys
+from sqlalchemy import Connection, text
+from sqlalchemy.schema import CreateIndex
+
+from .base import Base
+from .partitions import ensure_partitions, missing_partitions, partition_submissions, archive_submissions, create_index_concurrently
+from ..core.hashing import content_hash
+from ..core.rollups import rollup_plan, aggregate_rows
+from ..crud import rollups, archive, idempotency
+from ..crud.submission import COUNTER_SHARDS
+
+# Columns added to existing tables after their first release
+ADDED_COLUMNS = [
+    ("schema_maintenance", "content_hash", "VARCHAR(64)"),
+]
+
+
+def add_missing_columns(conn: Connection):
+    for table, column, ddl_type in ADDED_COLUMNS:
+        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {ddl_type}"))
+
+
+def valid_indexes(conn: Connection) -> set[str]:
+    # An ON ONLY parent index stays invalid until every partition's index is attached
+    return set(conn.execute(text(
+        "SELECT c.relname FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid "
+        "WHERE x.indisvalid AND c.relnamespace = current_schema()::regnamespace"
+    )).scalars())
+
+
+def create_missing_indexes(conn: Connection) -> list[str]:
+    """
+    create_all only emits CREATE INDEX for tables it creates, so indexes
+    added to existing models are built here, concurrently, on an autocommit
+    connection. Only run by the migrations command, never at worker
+    startup, where a plain build would block writes to the table.
+    """
+    existing = valid_indexes(conn)
+    built = []
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            if index.name in existing:
+                continue
+            ddl = str(CreateIndex(index).compile(dialect=conn.dialect))
+            definition = ddl.split(f" ON {table.name} ", 1)[1]
+            create_index_concurrently(conn, index.name, table.name, definition, unique=index.unique)
+            built.append(index.name)
+    return built
+
+
+def add_shard_column(conn: Connection, table: str, key: str) -> bool:
+    """Give a table from before sharding its shard column, with existing rows as shard 0; False if it has one."""
+    columns = conn.execute(text(
+        "SELECT column_name FROM information_schema.columns "
+        "WHERE table_schema = current_schema() AND table_name = :table"
+    ), {"table": table}).scalars().all()
+    if not columns or "shard" in columns:
+        return False
+    conn.execute(text(
+        f"ALTER TABLE {table} ADD COLUMN shard SMALLINT NOT NULL DEFAULT 0, "
+        f"DROP CONSTRAINT {table}_pkey, ADD PRIMARY KEY ({key}, shard)"
+    ))
+    return True
+
+
+def shard_counters(conn: Connection):
+    """record_counters from before sharding, keyed by key alone: add the shard column and the missing shards."""
+    if not add_shard_column(conn, "record_counters", "key"):
+        return
+    conn.execute(
+        text("INSERT INTO record_counters (key, shard, value) SELECT c.key, s.n, 0 FROM record_counters c, generate_series(1, :last) s(n)"),
+        {"last": COUNTER_SHARDS - 1},
+    )
+
+
+def shard_rollups(conn: Connection):
+    """field_rollups from before sharding; the other shards are created by the upserts that use them."""
+    add_shard_column(conn, "field_rollups", "schema_id, field, bucket")
+
+
+def lock_counted_tables(conn: Connection):
+    # SHARE mode lets reads through but holds inserts until commit, so no
+    # row is added between a count(*) and the counter seeded from it
+    conn.execute(text("LOCK TABLE schema_maintenance, submission_maintenance, archived_submissions IN SHARE MODE"))
+
+
+def seed_counters(conn: Connection):
+    """
+    Seed the schemas counter when it is missing. Only run by the migrations
+    command, never at worker startup: a count taken while other workers
+    insert would miss their increments for good.
+    """
+    if conn.execute(text("SELECT 1 FROM record_counters WHERE key = 'schemas'")).first():
+        return
+    lock_counted_tables(conn)
+    conn.execute(
+        text(
+            "INSERT INTO record_counters (key, shard, value) "
+            "SELECT 'schemas', shard, CASE WHEN shard = 0 THEN (SELECT count(*) FROM schema_maintenance) ELSE 0 END "
+            "FROM generate_series(0, :last) shard "
+            "ON CONFLICT (key, shard) DO NOTHING"
+        ),
+        {"last": COUNTER_SHARDS - 1},
+    )
+
+
+def upgrade(conn: Connection):
+    Base.metadata.create_all(conn)
+    shard_counters(conn)
+    shard_rollups(conn)
+    add_missing_columns(conn)
+    ensure_partitions(conn)
+
+
+def check_schema(conn: Connection) -> list[str]:
+    """
+    What the migrations command would still have to create (tables,
+    columns, indexes, submission partitions) from catalog queries. Used
+    instead of upgrade when STARTUP_MODE=check.
+    """
+    columns = set(conn.execute(text(
+        "SELECT table_name, column_name FROM information_schema.columns WHERE table_schema = current_schema()"
+    )).all())
+    indexes = valid_indexes(conn)
+    missing = []
+    for table in Base.metadata.sorted_tables:
+        absent = [column.name for column in table.columns if (table.name, column.name) not in columns]
+        if len(absent) == len(table.columns):
+            missing.append(f"table {table.name}")
+            continue
+        missing += [f"column {table.name}.{name}" for name in absent]
+        missing += [f"index {index.name}" for index in table.indexes if index.name not in indexes]
+    missing += [f"partition {name}" for name in missing_partitions(conn)]
+    return missing
+
+
+def rebuild_counters(conn: Connection) -> dict:
+    """
+    Recompute every counter from the tables, e.g. for schemas that predate
+    counters. Inserts wait until the rebuilt counters are committed.
+    """
+    lock_counted_tables(conn)
+    conn.execute(text("DELETE FROM record_counters"))
+    conn.execute(
+        text(
+            "INSERT INTO record_counters (key, shard, value) "
+            "SELECT 'schemas', shard, CASE WHEN shard = 0 THEN (SELECT count(*) FROM schema_maintenance) ELSE 0 END "
+            "FROM generate_series(0, :last) shard"
+        ),
+        {"last": COUNTER_SHARDS - 1},
+    )
+    result = conn.execute(
+        text(
+            "INSERT INTO record_counters (key, shard, value) "
+            "SELECT 'submissions:' || s.id, shard, CASE WHEN shard = 0 THEN "
+            "(SELECT count(*) FROM submission_maintenance WHERE schema_id = s.id) + "
+            "(SELECT count(*) FROM archived_submissions WHERE schema_id = s.id) ELSE 0 END "
+            "FROM schema_maintenance s, generate_series(0, :last) shard"
+        ),
+        {"last": COUNTER_SHARDS - 1},
+    )
+    return {"schemas": result.rowcount // COUNTER_SHARDS}
+
+
+def dedupe_schemas(conn: Connection, batch_size: int = 1000) -> dict:
+    """
+    One-off merge of schema rows stored before content hashing: hash every
+    legacy row, keep one row per hash (an already-hashed row, else the
+    oldest), repoint the duplicates' submissions to it and delete them.
+    Counters, and the rollups of the schemas that received submissions,
+    are rebuilt in the same transaction.
+
+    Submission details are served as immutable, so clients and CDNs may
+    keep showing a moved submission under its old schema_id, and deleted
+    duplicates under /schemas/{id}, until their cached copies expire.
+    """
+    keepers = dict(conn.execute(text(
+        "SELECT content_hash, id FROM schema_maintenance WHERE content_hash IS NOT NULL"
+    )).all())
+    hashes, duplicates = {}, {}
+
+    legacy = conn.execute(text(
+        "SELECT id, schema_json FROM schema_maintenance "
+        "WHERE content_hash IS NULL ORDER BY created_at, id"
+    ).execution_options(yield_per=batch_size))
+    for schema_id, schema_json in legacy:
+        digest = content_hash(schema_json)
+        if digest in keepers:
+            duplicates[schema_id] = keepers[digest]
+        else:
+            keepers[digest] = schema_id
+            hashes[schema_id] = digest
+
+    for duplicate_id, keeper_id in duplicates.items():
+        conn.execute(
+            text("UPDATE submission_maintenance SET schema_id = :keeper WHERE schema_id = :duplicate"),
+            {"keeper": keeper_id, "duplicate": duplicate_id},
+        )
+        conn.execute(
+            text("UPDATE archived_submissions SET schema_id = :keeper WHERE schema_id = :duplicate"),
+            {"keeper": keeper_id, "duplicate": duplicate_id},
+        )
+    if duplicates:
+        conn.execute(
+            text("DELETE FROM schema_maintenance WHERE id = ANY(:ids)"),
+            {"ids": list(duplicates)},
+        )
+    if hashes:
+        conn.execute(
+            text("UPDATE schema_maintenance SET content_hash = :digest WHERE id = :id"),
+            [{"id": schema_id, "digest": digest} for schema_id, digest in hashes.items()],
+        )
+    rebuild_counters(conn)
+    if duplicates:
+        conn.execute(
+            text("DELETE FROM field_rollups WHERE schema_id = ANY(:ids)"),
+            {"ids": list(duplicates)},
+        )
+        rebuild_rollups(conn, schema_ids=set(duplicates.values()))
+    return {"hashed": len(hashes), "merged": len(duplicates)}
+
+
+def rebuild_rollups(conn: Connection, batch_size: int = 5000, schema_ids: set | None = None) -> dict:
+    """
+    Recompute field_rollups from every stored submission, archived ones
+    included, one schema at a time; only for `schema_ids` when given.
+    """
+    if schema_ids is None:
+        conn.execute(text("DELETE FROM field_rollups"))
+        schemas = conn.execute(text("SELECT id, schema_json FROM schema_maintenance")).all()
+    else:
+        conn.execute(text("DELETE FROM field_rollups WHERE schema_id = ANY(:ids)"), {"ids": list(schema_ids)})
+        schemas = conn.execute(
+            text("SELECT id, schema_json FROM schema_maintenance WHERE id = ANY(:ids)"),
+            {"ids": list(schema_ids)},
+        ).all()
+    rows = 0
+    for schema_id, schema_json in schemas:
+        plan = rollup_plan(schema_json)
+        if not plan:
+            continue
+        aggregate = {}
+        submissions = conn.execute(
+            text("SELECT form_data FROM submission_maintenance WHERE schema_id = :id")
+            .execution_options(yield_per=batch_size),
+            {"id": schema_id},
+        )
+        for batch in submissions.partitions():
+            aggregate_rows(plan, [form_data for form_data, in batch], aggregate)
+            rows += len(batch)
+        for batch in archive.iter_form_data(conn, schema_id, batch_size):
+            aggregate_rows(plan, batch, aggregate)
+            rows += len(batch)
+        if aggregate:
+            conn.execute(rollups.upsert_statement(), rollups.upsert_params(schema_id, aggregate))
+    return {"schemas": len(schemas), "submissions": rows}
+
+
+COMMANDS = {
+    "upgrade": check_schema,  # run() upgrades first; this reports anything still missing
+    "dedupe-schemas": dedupe_schemas,
+    "rebuild-counters": rebuild_counters,
+    "rebuild-rollups": rebuild_rollups,
+    "partition-submissions": partition_submissions,
+    "archive-submissions": archive_submissions,
+    "expire-idempotency-keys": idempotency.expire_keys,
+}
+
+
+async def run(command: str):
+    from .session import engine
+
+    async with engine.begin() as conn:
+        await conn.run_sync(upgrade)
+        await conn.run_sync(seed_counters)
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        built = await conn.run_sync(create_missing_indexes)
+    if built:
+        print(f"built indexes: {', '.join(built)}")
+    async with engine.begin() as conn:
+        result = await conn.run_sync(COMMANDS[command])
+    await engine.dispose()
+    print(f"{command}: {result}")
+
+
+if __name__ == "__main__":
+    # python -m app.db.migrations upgrade|dedupe-schemas|rebuild-counters|rebuild-rollups|partition-submissions|archive-submissions|expire-idempotency-keys
+    if len(sys.argv) != 2 or sys.argv[1] not in COMMANDS:
+        sys.exit(f"usage: python -m app.db.migrations [{'|'.join(COMMANDS)}]")
+    asyncio.run(run(sys.argv[1]))
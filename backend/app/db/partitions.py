@@ -0,0 +1,193 @@
+import os
+import re
+from datetime import datetime, timezone
+from sqlalchemy import Connection, text
+from dotenv import load_dotenv
+
+from ..models.models import SubmissionMaintenance
+from ..crud import archive
+
+load_dotenv()
+
+SUBMISSION_PARTITION_MONTHS_AHEAD = int(os.getenv("SUBMISSION_PARTITION_MONTHS_AHEAD", "2"))
+SUBMISSION_RETENTION_MONTHS = int(os.getenv("SUBMISSION_RETENTION_MONTHS", "12"))
+
+TABLE = SubmissionMaintenance.__tablename__
+DEFAULT_PARTITION = f"{TABLE}_default"
+MONTHLY_PARTITION = re.compile(rf"{TABLE}_p(\d{{4}})(\d{{2}})")
+
+
+def month_start(moment: datetime) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(month: datetime, months: int) -> datetime:
+    index = month.year * 12 + month.month - 1 + months
+    return datetime(index // 12, index % 12 + 1, 1, tzinfo=timezone.utc)
+
+
+def partition_name(month: datetime) -> str:
+    return f"{TABLE}_p{month:%Y%m}"
+
+
+def is_partitioned(conn: Connection, table: str = TABLE) -> bool:
+    # Tables created before partitioning stay plain until partition-submissions runs
+    return conn.execute(text(f"SELECT relkind::text FROM pg_class WHERE oid = to_regclass('{table}')")).scalar() == "p"
+
+
+def build_index(conn: Connection, kind: str, name: str, table: str, definition: str):
+    # A failed concurrent build leaves an invalid index that IF NOT EXISTS would keep
+    if conn.execute(text("SELECT 1 FROM pg_index WHERE indexrelid = to_regclass(:name) AND NOT indisvalid"), {"name": name}).first():
+        conn.execute(text(f"DROP INDEX CONCURRENTLY {name}"))
+    conn.execute(text(f"CREATE {kind} CONCURRENTLY IF NOT EXISTS {name} ON {table} {definition}"))
+
+
+def create_index_concurrently(conn: Connection, name: str, table: str, definition: str, unique: bool = False):
+    """
+    CREATE INDEX CONCURRENTLY, so writes keep flowing while it builds; needs
+    an autocommit connection outside any transaction. A partitioned table
+    can't be indexed concurrently as a whole: the parent index is declared
+    ON ONLY, then each partition's index is built concurrently and attached
+    to it. Partitions created later get the index with the table.
+    """
+    kind = "UNIQUE INDEX" if unique else "INDEX"
+    if not is_partitioned(conn, table):
+        build_index(conn, kind, name, table, definition)
+        return
+    conn.execute(text(f"CREATE {kind} IF NOT EXISTS {name} ON ONLY {table} {definition}"))
+    # Partitions without an index attached to this one yet
+    missing = conn.execute(text(
+        "SELECT p.relname FROM pg_inherits i JOIN pg_class p ON p.oid = i.inhrelid "
+        "WHERE i.inhparent = CAST(:table AS regclass) AND NOT EXISTS ("
+        "SELECT 1 FROM pg_inherits ii JOIN pg_index x ON x.indexrelid = ii.inhrelid "
+        "WHERE ii.inhparent = CAST(:name AS regclass) AND x.indrelid = p.oid)"
+    ), {"table": table, "name": name})
+    for partition in missing.scalars().all():
+        child = f"{name}_{partition.removeprefix(table + '_')}"
+        build_index(conn, kind, child, partition, definition)
+        conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {child}"))
+
+
+def partitions(conn: Connection) -> list[str]:
+    return conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        f"WHERE i.inhparent = '{TABLE}'::regclass ORDER BY c.relname"
+    )).scalars().all()
+
+
+def monthly_partitions(conn: Connection) -> list[tuple[str, datetime]]:
+    months = []
+    for name in partitions(conn):
+        match = MONTHLY_PARTITION.fullmatch(name)
+        if match:
+            months.append((name, datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)))
+    return months
+
+
+def create_partition(conn: Connection, month: datetime):
+    name = partition_name(month)
+    bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+    in_range = f"submitted_at >= '{month.isoformat()}' AND submitted_at < '{add_months(month, 1).isoformat()}'"
+    if conn.execute(text(f"SELECT 1 FROM {DEFAULT_PARTITION} WHERE {in_range} LIMIT 1")).first() is None:
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {TABLE} FOR VALUES {bounds}"))
+        return
+    # Rows that landed in the default partition before this month existed move into it
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS)"))
+    conn.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE {in_range} RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ))
+    conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+
+
+def ensure_partitions(conn: Connection, months_ahead: int = SUBMISSION_PARTITION_MONTHS_AHEAD) -> list[str]:
+    """
+    Create the default partition and monthly partitions from the current
+    month up to `months_ahead` months out. Run at startup and by
+    archive-submissions; rows outside every monthly partition go to the
+    default one and are moved out when their month is created.
+    """
+    if not is_partitioned(conn):
+        return []
+    conn.execute(text(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+    existing = set(partitions(conn))
+    current = month_start(datetime.now(timezone.utc))
+    created = []
+    for offset in range(months_ahead + 1):
+        month = add_months(current, offset)
+        if partition_name(month) not in existing:
+            create_partition(conn, month)
+            created.append(partition_name(month))
+    return created
+
+
+def missing_partitions(conn: Connection) -> list[str]:
+    """
+    The default partition and this and next month's, those that don't
+    exist. Checked when STARTUP_MODE=check, where ensure_partitions is
+    left to the migrations command.
+    """
+    if not is_partitioned(conn):
+        return []
+    existing = set(partitions(conn))
+    current = month_start(datetime.now(timezone.utc))
+    needed = [DEFAULT_PARTITION, partition_name(current), partition_name(add_months(current, 1))]
+    return [name for name in needed if name not in existing]
+
+
+def partition_submissions(conn: Connection) -> dict:
+    """
+    One-off move of a submission_maintenance table created before
+    partitioning into the partitioned layout: monthly partitions covering
+    its rows, the same indexes (per-field ones included), then the copy.
+    """
+    if is_partitioned(conn):
+        return {"moved": 0}
+    legacy = f"{TABLE}_unpartitioned"
+    field_indexes = conn.execute(text(
+        "SELECT indexname, indexdef FROM pg_indexes WHERE tablename = :table AND indexname LIKE 'ix\\_sub\\_field\\_%'"
+    ), {"table": TABLE}).all()
+
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {legacy}"))
+    # Index and constraint names are schema-wide; free them for the new table
+    for name in [index.name for index in SubmissionMaintenance.__table__.indexes] + [name for name, _ in field_indexes]:
+        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+    conn.execute(text(f"ALTER TABLE {legacy} DROP CONSTRAINT IF EXISTS {TABLE}_pkey, DROP CONSTRAINT IF EXISTS {TABLE}_schema_id_fkey"))
+    SubmissionMaintenance.__table__.create(conn)
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+    oldest = conn.execute(text(f"SELECT min(submitted_at) FROM {legacy}")).scalar()
+    month = month_start(oldest) if oldest else month_start(datetime.now(timezone.utc))
+    while month < month_start(datetime.now(timezone.utc)):
+        create_partition(conn, month)
+        month = add_months(month, 1)
+    ensure_partitions(conn)
+
+    moved = conn.execute(text(
+        f"INSERT INTO {TABLE} (id, schema_id, form_data, submitted_at) "
+        f"SELECT id, schema_id, form_data, coalesce(submitted_at, now()) FROM {legacy}"
+    )).rowcount
+    for _, definition in field_indexes:
+        conn.execute(text(definition))
+    conn.execute(text(f"DROP TABLE {legacy}"))
+    return {"moved": moved, "partitions": len(partitions(conn))}
+
+
+def archive_submissions(conn: Connection, retention_months: int = SUBMISSION_RETENTION_MONTHS) -> dict:
+    """
+    Retention job: monthly partitions that ended more than
+    `retention_months` ago are written to segment files, indexed in
+    archived_submissions and dropped. Every segment is written before the
+    first partition is detached, so inserts are only blocked for the
+    detach and drop at the end.
+    """
+    if not is_partitioned(conn):
+        return {"archived": [], "rows": 0}
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -retention_months)
+    expired = [name for name, month in monthly_partitions(conn) if add_months(month, 1) <= cutoff]
+    rows = sum(archive.archive_partition(conn, name) for name in expired)
+    for name in expired:
+        conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+        conn.execute(text(f"DROP TABLE {name}"))
+    ensure_partitions(conn)
+    return {"archived": expired, "rows": rows}
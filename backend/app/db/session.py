@@ -1,15 +1,137 @@
+from fastapi import Request, Response
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from dotenv import load_dotenv
+from itertools import cycle
+from uuid import uuid4
+import asyncio
+import math
 import os
+import time
+
+from ..core.metrics import db_pool_wait_seconds, db_pool_timeouts, instrument_engine, pool_stats
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
+# Comma-separated; reads are spread over these, writes always go to DATABASE_URL
+DATABASE_REPLICA_URLS = [url.strip() for url in os.getenv("DATABASE_REPLICA_URLS", "").split(",") if url.strip()]
+
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "-1"))  # seconds before a connection is replaced; -1 never
+# Prepared statements cached per connection, by SQLAlchemy and by asyncpg; 0 behind pgbouncer in transaction mode
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+
+# Set on responses to writes; until it expires the client's reads go to the primary
+STICKY_COOKIE = "read_primary_until"
+
+class TimedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waits for a connection."""
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_timeouts.inc()
+            raise
+        finally:
+            db_pool_wait_seconds.observe(time.perf_counter() - started)
 
-engine = create_async_engine(DATABASE_URL, echo=False, future=True)
+def connect_args() -> dict:
+    args = {
+        "prepared_statement_cache_size": DB_STATEMENT_CACHE_SIZE,  # SQLAlchemy's adapter cache
+        "statement_cache_size": DB_STATEMENT_CACHE_SIZE,           # asyncpg's own
+    }
+    if DB_STATEMENT_CACHE_SIZE == 0:
+        # A pooler hands each transaction any server connection, where
+        # asyncpg's numbered statement names may already be taken
+        args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid4()}__"
+    return args
+
+def make_engine(url: str):
+    engine = create_async_engine(
+        url,
+        echo=False,
+        future=True,
+        poolclass=TimedPool,
+        pool_size=DB_POOL_SIZE,
+        max_overflow=DB_MAX_OVERFLOW,
+        pool_timeout=DB_POOL_TIMEOUT,
+        pool_recycle=DB_POOL_RECYCLE,
+        connect_args=connect_args(),
+    )
+    instrument_engine(engine)
+    return engine
+
+engine = make_engine(DATABASE_URL)
 SessionLocal = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
 
-async def get_db():
+replica_engines = [make_engine(url) for url in DATABASE_REPLICA_URLS]
+ReplicaSessions = [
+    sessionmaker(bind=replica, class_=AsyncSession, expire_on_commit=False, info={"replica": True})
+    for replica in replica_engines
+]
+_next_replica = cycle(ReplicaSessions)
+
+def reads_own_writes(request: Request) -> bool:
+    try:
+        return float(request.cookies.get(STICKY_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+def read_sessionmaker(request: Request) -> sessionmaker:
+    """Round-robin replica, or the primary when there are none or the client wrote recently."""
+    if not ReplicaSessions or reads_own_writes(request):
+        return SessionLocal
+    return next(_next_replica)
+
+def is_replica(db: AsyncSession) -> bool:
+    return db.info.get("replica", False)
+
+async def get_read_db(request: Request):
+    async with read_sessionmaker(request)() as session:
+        yield session
+
+async def get_primary_db():
+    """Primary session that leaves reads where they are: the client won't read these writes back."""
     async with SessionLocal() as session:
         yield session
+
+async def get_write_db(response: Response):
+    """Primary session for writes of schemas and submissions; the client's next reads follow them to the primary."""
+    if ReplicaSessions:
+        response.set_cookie(
+            STICKY_COOKIE,
+            f"{time.time() + REPLICA_STICKY_SECONDS:.3f}",
+            max_age=math.ceil(REPLICA_STICKY_SECONDS),
+            httponly=True,
+            secure=True,
+            samesite="none",  # the frontend is served from another origin
+        )
+    async with SessionLocal() as session:
+        yield session
+
+async def open_connections(count: int):
+    """Fill each pool with up to `count` connections before the first request needs one."""
+    count = min(count, DB_POOL_SIZE)  # connections past the pool size are closed on return
+    for each in [engine, *replica_engines]:
+        connections = await asyncio.gather(*(each.connect() for _ in range(count)))
+        for conn in connections:
+            await conn.close()
+
+async def close_engines():
+    for each in [engine, *replica_engines]:
+        await each.dispose()
+
+def stats() -> dict:
+    """Pool gauges of the primary and of each replica (replica0_size, ...)."""
+    result = pool_stats(engine.sync_engine.pool)
+    for i, replica in enumerate(replica_engines):
+        result.update({f"replica{i}_{key}": value for key, value in pool_stats(replica.sync_engine.pool).items()})
+    return result
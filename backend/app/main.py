@@ -1,8 +1,19 @@
+import time
+IMPORTS_STARTED = time.perf_counter()
+
+import sys
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .api.routes import router
-from app.db.session import engine
-from app.db.base import Base
+from app.db import session
+from app.db.session import engine, SessionLocal
+from app.db.migrations import upgrade, check_schema
+from app.core.executor import executor, VALIDATION_POOL_WARM
+from app.core.validator import get_validator, validator_cache_stats
+from app.core import metrics, profiling, startup as boot
+from app.core.compression import CompressionMiddleware
+from app.crud import ingest, registry, ai_cache, archive, idempotency
+from app.crud import submission as crud
 
 
 app = FastAPI()
@@ -13,9 +24,77 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag", "Idempotent-Replayed"],
 )
+app.add_middleware(CompressionMiddleware)
+app.add_middleware(profiling.ProfilingMiddleware)
+# Outermost, so the recorded latency covers every other middleware
+app.add_middleware(metrics.MetricsMiddleware)
+
+def loaded_gemini():
+    # The AI client is imported by the first /ai-response; until then there is nothing to report or close
+    return sys.modules.get("app.crud.gemini")
+
+metrics.register(metrics.Gauges("db_pool", "Database connection pools", session.stats))
+metrics.register(metrics.Gauges("validator_cache", "Compiled validator cache", validator_cache_stats))
+metrics.register(metrics.Gauges("validation_executor", "Validation process pool", executor.stats))
+metrics.register(metrics.Gauges("schema_cache", "Schema registry cache", registry.stats))
+metrics.register(metrics.Gauges("ai_cache", "AI response cache", ai_cache.stats))
+metrics.register(metrics.Gauges("ai_calls", "Outbound AI calls", lambda: loaded_gemini().stats() if loaded_gemini() else {}))
+metrics.register(metrics.Gauges("ingest", "Write-behind ingestion queue", ingest.queue.stats))
+metrics.register(metrics.Gauges("archive_blocks", "Decompressed archive block cache", archive.stats))
+metrics.register(metrics.Gauges("idempotency", "Idempotency-Key replays and filter", idempotency.stats))
+metrics.register(metrics.Gauges("startup", "Worker startup phases", boot.stats))
+
+boot.timings["imports"] = time.perf_counter() - IMPORTS_STARTED
 
 @app.on_event("startup")
 async def startup():
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+    started = time.perf_counter()
+    if boot.STARTUP_MODE == "check":
+        with boot.phase("schema_check"):
+            async with engine.connect() as conn:
+                missing = await conn.run_sync(check_schema)
+        if missing:
+            raise RuntimeError(f"Database schema is not up to date ({', '.join(missing)}); run `python -m app.db.migrations upgrade`")
+    else:
+        with boot.phase("migrate"):
+            async with engine.begin() as conn:
+                await conn.run_sync(upgrade)
+                missing = await conn.run_sync(check_schema)
+        if missing:
+            # Indexes on existing tables are built concurrently by the migrations command, not here
+            print(f"Database is missing {', '.join(missing)}; run `python -m app.db.migrations upgrade`")
+    if boot.DB_POOL_PREWARM > 0:
+        with boot.phase("connections"):
+            await session.open_connections(boot.DB_POOL_PREWARM)
+    if boot.STARTUP_WARM_SCHEMAS > 0:
+        with boot.phase("warm_validators"):
+            await warm_validators(boot.STARTUP_WARM_SCHEMAS)
+    if ingest.enabled():
+        await ingest.queue.start()
+    if executor.size > 0:
+        # Workers compile the schemas in use before taking any work
+        executor.start(warm=[(s.id, s.schema_json) for s in await recent_schemas(VALIDATION_POOL_WARM)])
+    boot.timings["startup"] = time.perf_counter() - started
+    print(f"Worker ready: {boot.summary()}")
+
+async def recent_schemas(count: int) -> list[registry.CachedSchema]:
+    """The schemas that received submissions most recently, loaded into the registry cache."""
+    async with SessionLocal() as db:
+        schemas = [await registry.get_schema(db, schema_id) for schema_id in await crud.recent_schema_ids(db, count)]
+    return [schema for schema in schemas if schema]
+
+async def warm_validators(count: int):
+    """Cache and compile the schemas that received submissions most recently."""
+    for schema in await recent_schemas(count):
+        get_validator(schema.schema_json, schema.id)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await ingest.queue.stop()
+    executor.stop()
+    gemini = loaded_gemini()
+    if gemini:
+        await gemini.close_client()
+    await session.close_engines()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, TIMESTAMP, ForeignKey
+from sqlalchemy import Column, String, TIMESTAMP, ForeignKey, Index, BigInteger, Float, Integer, SmallInteger
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.sql import func
 import uuid
@@ -11,13 +11,120 @@ class SchemaMaintenance(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     name = Column(String, nullable=True)
     schema_json = Column(JSONB, nullable=False)
+    # sha256 of the canonical schema_json; NULL only on rows that predate it
+    content_hash = Column(String(64), nullable=True)
     created_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
 
+    # Fetch server defaults through INSERT ... RETURNING instead of a refresh SELECT
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Backs keyset pagination of /list-schemas
+        Index("ix_schema_maintenance_created_at_id", created_at.desc(), id.desc()),
+        Index("ux_schema_maintenance_content_hash", content_hash, unique=True),
+    )
+
 
 class SubmissionMaintenance(Base):
+    """
+    Range-partitioned by month on submitted_at (see db/partitions.py), so
+    the partition key is part of the primary key.
+    """
     __tablename__ = "submission_maintenance"
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     schema_id = Column(UUID(as_uuid=True), ForeignKey("schema_maintenance.id"), nullable=False)
     form_data = Column(JSONB, nullable=False)
-    submitted_at = Column(TIMESTAMP(timezone=True), server_default=func.now())
+    submitted_at = Column(TIMESTAMP(timezone=True), primary_key=True, server_default=func.now())
+
+    __mapper_args__ = {"eager_defaults": True}
+    __table_args__ = (
+        # Backs keyset pagination of /submissions/{schema_id}
+        Index("ix_submission_maintenance_schema_submitted_at_id", schema_id, submitted_at.desc(), id.desc()),
+        # Serves form_data @> {...} field queries
+        Index(
+            "ix_submission_maintenance_form_data",
+            form_data,
+            postgresql_using="gin",
+            postgresql_ops={"form_data": "jsonb_path_ops"},
+        ),
+        # Time-window scans (recently used schemas at startup); BRIN stays tiny on append-only rows
+        Index("ix_submission_maintenance_submitted_at", submitted_at, postgresql_using="brin"),
+        {"postgresql_partition_by": "RANGE (submitted_at)"},
+    )
+
+
+class ArchivedSubmission(Base):
+    """
+    Where an archived submission lives: a gzip block of a segment file
+    under ARCHIVE_DIR. Written when a month's partition is archived.
+    """
+    __tablename__ = "archived_submissions"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    schema_id = Column(UUID(as_uuid=True), nullable=False)
+    submitted_at = Column(TIMESTAMP(timezone=True), nullable=False)
+    segment = Column(String, nullable=False)
+    block_offset = Column(BigInteger, nullable=False)
+    block_length = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        Index("ix_archived_submissions_schema_submitted_at_id", schema_id, submitted_at.desc(), id.desc()),
+    )
+
+
+class RecordCounter(Base):
+    """
+    Row counts maintained in the same transaction as the inserts they count.
+    Keys are "schemas" and "submissions:<schema_id>". Each counter is spread
+    over COUNTER_SHARDS rows that writers pick at random and readers sum,
+    so concurrent inserts for one schema rarely wait on the same row lock.
+    """
+    __tablename__ = "record_counters"
+
+    key = Column(String, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    value = Column(BigInteger, nullable=False, default=0)
+
+
+class AIResponseCache(Base):
+    """Guard-railed /ai-response results keyed by the normalized prompt's hash."""
+    __tablename__ = "ai_response_cache"
+
+    prompt_hash = Column(String(64), primary_key=True)
+    prompt = Column(String, nullable=False)
+    response = Column(JSONB, nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), index=True)
+
+
+class IdempotencyKey(Base):
+    """
+    Idempotency-Key of a /submit-form request -> the submission it created.
+    fingerprint is the request body's hash, so a key reused for a different
+    body is refused instead of replayed.
+    """
+    __tablename__ = "idempotency_keys"
+
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)
+    submission_id = Column(UUID(as_uuid=True), nullable=False)
+    created_at = Column(TIMESTAMP(timezone=True), server_default=func.now(), index=True)
+
+
+class FieldRollup(Base):
+    """
+    Per-field aggregates of a schema's submissions, updated as rows are
+    inserted. bucket "*" holds count/total/min/max; "v:<json>" buckets count
+    enum/boolean values and "h:<from>:<to>" buckets form numeric histograms.
+    Like RecordCounter, each bucket is spread over up to ROLLUP_SHARDS rows
+    that writers pick at random and readers combine.
+    """
+    __tablename__ = "field_rollups"
+
+    schema_id = Column(UUID(as_uuid=True), primary_key=True)
+    field = Column(String, primary_key=True)
+    bucket = Column(String, primary_key=True)
+    shard = Column(SmallInteger, primary_key=True, default=0)
+    count = Column(BigInteger, nullable=False, default=0)
+    total = Column(Float, nullable=True)
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
@@ -1,5 +1,5 @@
-from pydantic import BaseModel
-from typing import Dict, Any
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Literal
 from uuid import UUID
 from datetime import datetime
 
@@ -12,12 +12,61 @@ class SubmissionIn(BaseModel):
     form_data: Dict[str, Any]
     schema_id: UUID | None = None
 
+class FieldValidationIn(BaseModel):
+    schema_id: UUID | None = None
+    schema_json: Dict[str, Any] | None = None  # ad-hoc schema, when there is no schema_id
+    form_data: Dict[str, Any]
+    fields: list[str] = []  # paths such as "address.city" or "jobs[0].title"; empty checks the whole form
+
+class FieldError(BaseModel):
+    field: str
+    message: str
+
+class FieldValidationOut(BaseModel):
+    valid: bool
+    errors: list[FieldError]
+
+class SubmitFormOut(BaseModel):
+    submission_id: UUID
+
+class BulkItemResult(BaseModel):
+    index: int
+    submission_id: UUID | None = None
+    error: str | None = None
+
+class BulkSubmissionOut(BaseModel):
+    inserted: int
+    failed: int
+    results: list[BulkItemResult]
+
 class SubmissionOut(BaseModel):
     id: UUID
     schema_id: UUID
     form_data: Dict[str, Any]
     submitted_at: datetime
 
+class FieldPredicate(BaseModel):
+    field: str  # dotted path for nested objects, e.g. "specifications.weight"
+    op: Literal["eq", "in", "gt", "gte", "lt", "lte"] = "eq"
+    value: Any
+
+class SubmissionQueryIn(BaseModel):
+    where: list[FieldPredicate] = Field(min_length=1)
+    limit: int = 10
+    cursor: str | None = None
+
+class FieldIndexIn(BaseModel):
+    field: str
+
+class FieldIndexOut(BaseModel):
+    field: str
+    index_name: str
+
+class SchemaStatsOut(BaseModel):
+    schema_id: UUID
+    submissions: int
+    fields: Dict[str, Dict[str, Any]]
+
 class SchemaOut(BaseModel):
     id: UUID
     name: str | None
@@ -0,0 +1,57 @@
+import random
+import time
+from typing import Any, Dict
+
+from .generator import make_payload, make_schema
+from .bench_http import SHAPE, SEED_SUBMISSIONS
+from .results import summarize
+
+PAYLOADS = 200
+BULK_ROWS = 100
+
+
+async def run(operations: int = 500, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Time the crud functions behind the endpoints one call at a time against
+    DATABASE_URL, so query cost shows without HTTP, validation and JSON
+    encoding around it.
+    """
+    from app.main import startup, shutdown
+    from app.db.session import SessionLocal
+    from app.crud import submission as crud
+
+    rng = random.Random(seed)
+    schema = make_schema(SHAPE)
+    payloads = [make_payload(schema, SHAPE, rng) for _ in range(PAYLOADS)]
+    await startup()
+    try:
+        async with SessionLocal() as db:
+            schema_id = (await crud.create_schema(db, "bench", schema)).id
+            seed_rows = [make_payload(schema, SHAPE, rng) for _ in range(SEED_SUBMISSIONS)]
+            ids = await crud.create_submissions(db, schema_id, seed_rows, schema)
+            page = await crud.list_submissions_json(db, schema_id, 0, 100)
+            after = (page[-1].submitted_at, page[-1].id)
+
+            scenarios = {
+                "create_submission": lambda i: crud.create_submission(db, schema_id, payloads[i % PAYLOADS], schema),
+                f"create_submissions/{BULK_ROWS}": lambda i: crud.create_submissions(db, schema_id, payloads[:BULK_ROWS], schema),
+                "get_submission_json": lambda i: crud.get_submission_json(db, ids[i % len(ids)]),
+                "list_submissions_json/offset": lambda i: crud.list_submissions_json(db, schema_id, 500, 10),
+                "list_submissions_json/cursor": lambda i: crud.list_submissions_json(db, schema_id, 0, 10, after),
+                "list_schemas_json": lambda i: crud.list_schemas_json(db, 0, 10),
+                "get_submission_count": lambda i: crud.get_submission_count(db, schema_id),
+                "get_schema_count": lambda i: crud.get_schema_count(db),
+            }
+            return {f"crud/{name}": await measure(call, operations) for name, call in scenarios.items()}
+    finally:
+        await shutdown()
+
+
+async def measure(call, operations: int) -> Dict[str, Any]:
+    samples = []
+    started = time.perf_counter()
+    for i in range(operations):
+        op_started = time.perf_counter()
+        await call(i)
+        samples.append(time.perf_counter() - op_started)
+    return summarize(samples, time.perf_counter() - started)
@@ -0,0 +1,78 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict
+
+import httpx
+
+from .generator import Shape, make_payload, make_schema
+from .results import summarize
+
+SHAPE = Shape(width=12, depth=2, array_size=10, enums=True, patterns=True)
+SEED_SUBMISSIONS = 1000
+
+
+async def run(url: str | None = None, requests: int = 2000, concurrency: int = 32, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the main endpoints with `concurrency` clients. Without `url` the app
+    runs in-process over ASGI (no sockets), against DATABASE_URL.
+    """
+    rng = random.Random(seed)
+    schema = make_schema(SHAPE)
+    try:
+        async with await open_client(url) as client:
+            return await run_scenarios(client, schema, rng, requests, concurrency)
+    finally:
+        if not url:
+            from app.main import shutdown
+            await shutdown()
+
+
+async def run_scenarios(client: httpx.AsyncClient, schema: Dict[str, Any], rng: random.Random, requests: int, concurrency: int) -> Dict[str, Dict[str, Any]]:
+    created = await client.post("/submit-form", json={"schema_json": schema, "form_data": make_payload(schema, SHAPE, rng)})
+    created.raise_for_status()
+    submission_id = created.json()["submission_id"]
+    detail = await client.get(f"/submission-details/{submission_id}")
+    schema_id = detail.json()["schema_id"]
+
+    seed_rows = [make_payload(schema, SHAPE, rng) for _ in range(SEED_SUBMISSIONS)]
+    (await client.post(f"/submit-forms/bulk?schema_id={schema_id}", json=seed_rows)).raise_for_status()
+    payloads = [make_payload(schema, SHAPE, rng) for _ in range(200)]
+
+    scenarios = {
+        "submit-form": lambda i: client.post("/submit-form", json={"schema_id": schema_id, "form_data": payloads[i % 200]}),
+        "submit-form/adhoc-schema": lambda i: client.post("/submit-form", json={"schema_json": schema, "form_data": payloads[i % 200]}),
+        "list-schemas": lambda i: client.get("/list-schemas"),
+        "submissions": lambda i: client.get(f"/submissions/{schema_id}"),
+        "submission-details": lambda i: client.get(f"/submission-details/{submission_id}"),
+        "schemas-count": lambda i: client.get("/schemas-count"),
+        "submissions-count": lambda i: client.get("/submissions-count", params={"schema_id": schema_id}),
+    }
+    return {f"http/{name}": await load(call, requests, concurrency) for name, call in scenarios.items()}
+
+
+async def open_client(url: str | None) -> httpx.AsyncClient:
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=30)
+
+    from app.main import app, startup
+    await startup()
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench", timeout=30)
+
+
+async def load(call, requests: int, concurrency: int) -> Dict[str, Any]:
+    samples, errors = [], 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for i in counter:
+            started = time.perf_counter()
+            response = await call(i)
+            samples.append(time.perf_counter() - started)
+            if response.status_code >= 400:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return {**summarize(samples, time.perf_counter() - started), "errors": errors}
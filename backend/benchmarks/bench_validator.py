@@ -0,0 +1,47 @@
+import random
+import statistics
+import time
+from typing import Any, Dict
+
+from app.core.validator import compile_schema, validate_json_schema
+from .generator import SHAPES, make_payload, make_schema
+from .results import summarize
+
+PAYLOADS = 200
+ROUNDS = 5
+
+
+def run(min_seconds: float = 0.5, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """validate/<shape> times cached validation, compile/<shape> compilation alone."""
+    results = {}
+    for shape in SHAPES:
+        rng = random.Random(seed)
+        schema = make_schema(shape)
+        payloads = [make_payload(schema, shape, rng) for _ in range(PAYLOADS)]
+        key = f"bench:{shape.name}"
+        for payload in payloads:
+            validate_json_schema(schema, payload, key)  # sanity check and warm-up
+
+        results[f"validate/{shape.name}"] = measure(
+            lambda i: validate_json_schema(schema, payloads[i % PAYLOADS], key), min_seconds,
+        )
+        results[f"compile/{shape.name}"] = measure(lambda i: compile_schema(schema), min_seconds / 5)
+    return results
+
+
+def measure(op, min_seconds: float) -> Dict[str, Any]:
+    """
+    Run `op` for ROUNDS rounds; throughput is the median round's, so one
+    noisy round (GC, a busy neighbour) doesn't swing the result.
+    """
+    samples, rates = [], []
+    for _ in range(ROUNDS):
+        round_samples = []
+        deadline = time.perf_counter() + min_seconds / ROUNDS
+        while time.perf_counter() < deadline or len(round_samples) < 5:
+            started = time.perf_counter()
+            op(len(samples) + len(round_samples))
+            round_samples.append(time.perf_counter() - started)
+        rates.append(len(round_samples) / sum(round_samples))
+        samples += round_samples
+    return {**summarize(samples), "ops_per_sec": round(statistics.median(rates), 1)}
@@ -0,0 +1,124 @@
+import random
+import string
+from dataclasses import dataclass
+from typing import Any, Dict
+
+ENUM_VALUES = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta"]
+PATTERN = r"[a-z]{3,8}-\d{2,4}"
+
+
+@dataclass(frozen=True)
+class Shape:
+    """Knobs for a synthetic schema; every field type cycles through them."""
+    width: int = 8            # properties per object
+    depth: int = 1            # levels of nested objects
+    array_size: int = 0       # items per array field (0: no arrays)
+    enums: bool = False
+    patterns: bool = False
+    conditional: bool = False  # top-level if/then/else
+
+    @property
+    def name(self) -> str:
+        parts = [f"w{self.width}", f"d{self.depth}"]
+        if self.array_size:
+            parts.append(f"a{self.array_size}")
+        parts += [flag for flag, on in (("enum", self.enums), ("pattern", self.patterns), ("if", self.conditional)) if on]
+        return "-".join(parts)
+
+
+SHAPES = [
+    Shape(),
+    Shape(width=32),
+    Shape(depth=3),
+    Shape(array_size=100),
+    Shape(array_size=1000, width=4),
+    Shape(enums=True, patterns=True),
+    Shape(conditional=True, enums=True),
+    Shape(width=16, depth=2, array_size=50, enums=True, patterns=True, conditional=True),
+]
+
+
+def make_schema(shape: Shape) -> Dict[str, Any]:
+    schema = {"type": "object", "title": f"Bench {shape.name}", **make_object(shape, shape.depth)}
+    if shape.conditional:
+        schema["if"] = {"properties": {"mode": {"const": "advanced"}}}
+        schema["then"] = {"properties": {"advanced_note": {"type": "string", "minLength": 1}}, "required": ["advanced_note"]}
+        schema["else"] = {"properties": {"basic_note": {"type": "string"}}}
+        schema["properties"]["mode"] = {"type": "string", "enum": ["basic", "advanced"]}
+    return schema
+
+
+def make_object(shape: Shape, depth: int) -> Dict[str, Any]:
+    properties = {}
+    for i in range(shape.width):
+        kind = i % 6
+        if kind == 0:
+            prop = {"type": "string", "minLength": 1, "maxLength": 64}
+            if shape.patterns:
+                prop["pattern"] = PATTERN
+        elif kind == 1:
+            prop = {"type": "integer", "minimum": 0, "maximum": 1_000_000}
+        elif kind == 2:
+            prop = {"type": "number", "minimum": 0}
+        elif kind == 3:
+            prop = {"type": "string", "enum": ENUM_VALUES} if shape.enums else {"type": "boolean"}
+        elif kind == 4:
+            prop = {"type": "string", "format": "email"}
+        else:
+            prop = {"type": "boolean"}
+        properties[f"f{i}"] = prop
+
+    if depth > 1:
+        properties["nested"] = {"type": "object", **make_object(shape, depth - 1)}
+    if shape.array_size:
+        properties["tags"] = {"type": "array", "items": {"type": "string"}, "maxItems": shape.array_size * 2}
+        properties["rows"] = {
+            "type": "array",
+            "items": {
+                "type": "object",
+                "properties": {
+                    "sku": {"type": "string", **({"pattern": PATTERN} if shape.patterns else {})},
+                    "qty": {"type": "integer", "minimum": 1},
+                },
+                "required": ["sku", "qty"],
+            },
+        }
+    return {"properties": properties, "required": list(properties)[: max(1, shape.width // 2)]}
+
+
+def make_payload(schema: Dict[str, Any], shape: Shape, rng: random.Random) -> Dict[str, Any]:
+    """A payload that validates against make_schema(shape)."""
+    data = make_value(schema, shape, rng)
+    if shape.conditional:
+        if rng.random() < 0.5:
+            data["mode"], data["advanced_note"] = "advanced", word(rng)
+        else:
+            data["mode"], data["basic_note"] = "basic", word(rng)
+    return data
+
+
+def make_value(prop: Dict[str, Any], shape: Shape, rng: random.Random) -> Any:
+    kind = prop.get("type")
+    if "enum" in prop:
+        return rng.choice(prop["enum"])
+    if kind == "object":
+        return {key: make_value(p, shape, rng) for key, p in prop.get("properties", {}).items()}
+    if kind == "array":
+        return [make_value(prop["items"], shape, rng) for _ in range(shape.array_size)]
+    if kind == "string":
+        if prop.get("format") == "email":
+            return f"{word(rng)}@example.com"
+        if "pattern" in prop:
+            return f"{word(rng)}-{rng.randint(10, 9999)}"
+        return word(rng)
+    if kind == "integer":
+        return rng.randint(1, 1000)
+    if kind == "number":
+        return round(rng.random() * 1000, 2)
+    if kind == "boolean":
+        return rng.random() < 0.5
+    return None
+
+
+def word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 8)))
@@ -0,0 +1,70 @@
+import json
+import platform
+import statistics
+import time
+from typing import Any, Dict, List
+
+
+def summarize(samples: List[float], wall: float | None = None) -> Dict[str, float]:
+    """Latency percentiles in microseconds plus throughput for a list of per-op seconds."""
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1e6
+
+    total = wall if wall is not None else sum(samples)
+    return {
+        "ops": len(samples),
+        "ops_per_sec": round(len(samples) / total, 1) if total else 0.0,
+        "mean_us": round(statistics.fmean(samples) * 1e6, 1),
+        "p50_us": round(pct(0.50), 1),
+        "p95_us": round(pct(0.95), 1),
+        "p99_us": round(pct(0.99), 1),
+    }
+
+
+def report(results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[Dict[str, Any]]:
+    """
+    One row per benchmark found in both runs. A benchmark regresses when its
+    throughput drops, or its p95 latency grows, by more than `tolerance`.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        before = baseline.get("results", {}).get(name)
+        if before is None:
+            continue
+        throughput = change(before["ops_per_sec"], result["ops_per_sec"])
+        p95 = change(before["p95_us"], result["p95_us"])
+        rows.append({
+            "name": name,
+            "ops_per_sec": result["ops_per_sec"],
+            "baseline_ops_per_sec": before["ops_per_sec"],
+            "throughput_change": throughput,
+            "p95_change": p95,
+            "regressed": throughput < -tolerance or p95 > tolerance,
+        })
+    return rows
+
+
+def change(before: float, after: float) -> float:
+    return round((after - before) / before, 4) if before else 0.0
+
+
+def load(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def save(path: str, data: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2, sort_keys=True)
+        f.write("\n")
@@ -0,0 +1,67 @@
+import argparse
+import asyncio
+import os
+import sys
+
+from .results import compare, load, report, save
+
+SUITES = ("validator", "crud", "http")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.run", description="Validator, CRUD and HTTP benchmarks")
+    parser.add_argument("suites", nargs="*", help=f"any of {', '.join(SUITES)} (default: validator)")
+    parser.add_argument("--output", default="benchmarks/results.json", help="where to write this run's results")
+    parser.add_argument("--baseline", default="benchmarks/baseline.json", help="results to compare against, if present")
+    parser.add_argument("--save-baseline", action="store_true", help="also store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before a benchmark counts as regressed")
+    parser.add_argument("--seconds", type=float, default=0.5, help="minimum time per validator benchmark")
+    parser.add_argument("--operations", type=int, default=500, help="calls per CRUD scenario")
+    parser.add_argument("--requests", type=int, default=2000, help="requests per HTTP scenario")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--url", help="benchmark a running server instead of the in-process app")
+    args = parser.parse_args(argv)
+    args.suites = args.suites or ["validator"]
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite(s): {', '.join(sorted(unknown))}")
+
+    results = {}
+    if "validator" in args.suites:
+        from . import bench_validator
+        results.update(bench_validator.run(args.seconds))
+    if "crud" in args.suites or ("http" in args.suites and not args.url):
+        # These suites write rows, so they never run against the app's own database
+        database_url = os.getenv("BENCH_DATABASE_URL")
+        if not database_url:
+            sys.exit("Set BENCH_DATABASE_URL to a scratch database to run the crud suite, or the http suite without --url")
+        os.environ["DATABASE_URL"] = database_url
+    if "crud" in args.suites:
+        from . import bench_crud
+        results.update(asyncio.run(bench_crud.run(args.operations)))
+    if "http" in args.suites:
+        from . import bench_http
+        results.update(asyncio.run(bench_http.run(args.url, args.requests, args.concurrency)))
+
+    current = report(results)
+    save(args.output, current)
+    if args.save_baseline:
+        save(args.baseline, current)
+
+    rows = compare(current, load(args.baseline), args.tolerance) if os.path.exists(args.baseline) and not args.save_baseline else []
+    compared = {row["name"]: row for row in rows}
+    print(f"{'benchmark':<44}{'ops/s':>12}{'p50 us':>12}{'p95 us':>12}{'vs baseline':>14}")
+    for name, result in results.items():
+        row = compared.get(name)
+        delta = f"{row['throughput_change']:+.1%}{' !' if row['regressed'] else ''}" if row else "-"
+        print(f"{name:<44}{result['ops_per_sec']:>12}{result['p50_us']:>12}{result['p95_us']:>12}{delta:>14}")
+
+    regressed = [row["name"] for row in rows if row["regressed"]]
+    if regressed:
+        print(f"\n{len(regressed)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
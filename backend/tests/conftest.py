@@ -0,0 +1,55 @@
+import os
+import tempfile
+from uuid import uuid4
+
+import httpx
+import pytest
+
+# Database tests write rows, so they only run against the scratch database in
+# TEST_DATABASE_URL (never the app's DATABASE_URL) and are skipped without it
+TEST_DATABASE_URL = os.getenv("TEST_DATABASE_URL")
+if TEST_DATABASE_URL:
+    os.environ["DATABASE_URL"] = TEST_DATABASE_URL
+    os.environ["ARCHIVE_DIR"] = tempfile.mkdtemp(prefix="test-archive-")
+
+
+@pytest.fixture(scope="session")
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(scope="session")
+async def app(anyio_backend):
+    """The app, started once (migrations included) for the whole session."""
+    if not TEST_DATABASE_URL:
+        pytest.skip("set TEST_DATABASE_URL to a scratch database to run database tests")
+    from app.main import app as fastapi_app, startup, shutdown
+    await startup()
+    yield fastapi_app
+    await shutdown()
+
+
+@pytest.fixture
+async def client(app):
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        yield client
+
+
+@pytest.fixture
+async def db(app):
+    from app.db.session import SessionLocal
+    async with SessionLocal() as session:
+        yield session
+
+
+@pytest.fixture
+def make_schema(db):
+    """Store a schema no other test uses, so its listings and counts start empty."""
+    from app.crud import submission as crud
+
+    async def make(properties: dict, required: list = ()):
+        title = f"test {uuid4()}"
+        schema_json = {"title": title, "type": "object", "properties": properties, "required": list(required)}
+        return await crud.create_schema(db, title, schema_json)
+
+    return make
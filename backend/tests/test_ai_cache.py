@@ -0,0 +1,30 @@
+from uuid import uuid4
+
+import pytest
+
+from app.crud.ai_cache import prompt_key
+
+
+def test_prompt_key_folds_case_and_whitespace():
+    assert prompt_key("Create  a Signup\nform") == prompt_key("create a signup form")
+    assert prompt_key("create a signup form") != prompt_key("create a login form")
+
+
+@pytest.mark.anyio
+async def test_ai_response_is_cached_and_holds_no_connection_upstream(client, monkeypatch):
+    from app.crud import gemini
+    from app.db.session import engine
+
+    calls = []
+
+    async def call_gemini(prompt):
+        calls.append(engine.pool.checkedout())
+        return '```json\n{"type": "object", "title": "Signup", "properties": {}}\n```'
+
+    monkeypatch.setattr(gemini, "call_gemini", call_gemini)
+    prompt = f"signup form {uuid4()}"
+    first = await client.post("/ai-response", json={"prompt": prompt})
+    again = await client.post("/ai-response", json={"prompt": prompt.upper()})
+    assert first.status_code == again.status_code == 200
+    assert first.json() == again.json() == {"response": {"type": "object", "title": "Signup", "properties": {}}}
+    assert calls == [0]
@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+# app.api.routes opens the database engine on import
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("app")]
+
+PROPERTIES = {"name": {"type": "string"}, "age": {"type": "integer"}}
+
+
+@pytest.mark.parametrize("body, content_type", [
+    (b'[{"name": "a"}, {"name": "b"}]', "application/json"),
+    (b'{"name": "a"}\n\n{"name": "b"}\n', "application/x-ndjson"),
+    (b'{"name": "a"}\r\n{"name": "b"}', "application/jsonlines"),
+])
+async def test_parse_array_and_ndjson(body, content_type):
+    from app.api.routes import parse_bulk_body
+
+    assert parse_bulk_body(body, content_type) == [{"name": "a"}, {"name": "b"}]
+
+
+async def test_bad_ndjson_lines_are_kept_in_place():
+    from app.api.routes import INVALID_JSON, parse_bulk_body
+
+    items = parse_bulk_body(b'{"name": "a"}\n{"name": \n[1]\n{"x": NaN}', "application/x-ndjson")
+    assert items == [{"name": "a"}, INVALID_JSON, [1], INVALID_JSON]
+
+
+@pytest.mark.parametrize("body", [b'{"name": "a"}', b"[1,", b"[NaN]", b'{"name": "a"}\n{"name": "b"}'])
+async def test_body_that_is_not_an_array(body):
+    from app.api.routes import parse_bulk_body
+
+    with pytest.raises(HTTPException) as raised:
+        parse_bulk_body(body, "application/json")
+    assert (raised.value.status_code, raised.value.detail) == (400, "Body must be a JSON array or NDJSON")
+
+
+async def submission_count(db, schema_id) -> int:
+    from sqlalchemy import func, select
+    from app.models.models import SubmissionMaintenance
+
+    await db.rollback()
+    result = await db.execute(select(func.count()).where(SubmissionMaintenance.schema_id == schema_id))
+    return result.scalar()
+
+
+async def test_per_item_results(client, db, make_schema):
+    schema = await make_schema(PROPERTIES, ["name"])
+    lines = [{"name": "a"}, {"age": 1}, "text", {"name": "b", "age": "x"}, {"name": "c", "age": 3}]
+    body = "\n".join(json.dumps(line) for line in lines[:2]) + "\n{oops\n" + "\n".join(json.dumps(line) for line in lines[2:])
+    response = await client.post(
+        f"/submit-forms/bulk?schema_id={schema.id}", content=body, headers={"Content-Type": "application/x-ndjson"}
+    )
+    assert response.status_code == 200
+    result = response.json()
+    assert (result["inserted"], result["failed"]) == (2, 4)
+    assert [item["index"] for item in result["results"]] == list(range(6))
+    assert [item.get("error") for item in result["results"]] == [
+        None, "Missing required field: name", "Invalid JSON", "Item must be a JSON object", "Field 'age' should be of type integer", None,
+    ]
+    assert all("submission_id" in result["results"][i] for i in (0, 5))
+    assert await submission_count(db, schema.id) == 2
+
+
+async def test_batch_size_limit(client, db, make_schema, monkeypatch):
+    from app.api import routes
+
+    monkeypatch.setattr(routes, "BULK_MAX_ITEMS", 3)
+    schema = await make_schema(PROPERTIES)
+    response = await client.post(f"/submit-forms/bulk?schema_id={schema.id}", json=[{"name": "a"}] * 3)
+    assert response.json()["inserted"] == 3
+    response = await client.post(f"/submit-forms/bulk?schema_id={schema.id}", json=[{"name": "a"}] * 4)
+    assert (response.status_code, response.json()["detail"]) == (413, "At most 3 items per request")
+    assert await submission_count(db, schema.id) == 3
+
+
+async def test_valid_items_are_inserted_all_or_nothing(client, db, make_schema):
+    schema = await make_schema(PROPERTIES)
+    # Passes validation, but JSONB refuses the NUL character, failing the whole insert
+    with pytest.raises(Exception):
+        await client.post(f"/submit-forms/bulk?schema_id={schema.id}", json=[{"name": "a"}, {"name": "b\u0000"}])
+    assert await submission_count(db, schema.id) == 0
+
+    response = await client.post(f"/submit-forms/bulk?schema_id={schema.id}", content=b"[{")
+    assert response.status_code == 400
+    assert await submission_count(db, schema.id) == 0
@@ -0,0 +1,103 @@
+import gzip
+
+import brotli
+import httpx
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.responses import StreamingResponse
+
+from app.core import compression
+from app.core.compression import CompressionMiddleware, negotiate
+
+pytestmark = pytest.mark.anyio
+
+BIG = b"x" * compression.COMPRESSION_MIN_BYTES
+SMALL = BIG[:-1]
+
+api = FastAPI()
+api.add_middleware(CompressionMiddleware)
+
+
+@api.get("/body")
+async def body(size: int):
+    return Response(b"x" * size, media_type="application/json", headers={"ETag": '"v1"'})
+
+
+@api.get("/stream")
+async def stream(media_type: str = "application/x-ndjson"):
+    async def chunks():
+        for n in range(3):
+            yield b'{"n": %d}\n' % n
+    return StreamingResponse(chunks(), media_type=media_type)
+
+
+@api.get("/not-modified")
+async def not_modified():
+    return Response(status_code=304, headers={"ETag": '"v1"'})
+
+
+async def get(path: str, encoding: str = "gzip") -> httpx.Response:
+    """The response, with `raw` holding the body as sent, before httpx decodes it."""
+    transport = httpx.ASGITransport(app=api)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        async with client.stream("GET", path, headers={"Accept-Encoding": encoding}) as response:
+            response.raw = b"".join([chunk async for chunk in response.aiter_raw()])
+    return response
+
+
+@pytest.mark.parametrize("header, coding", [
+    ("gzip, br", "br"),
+    ("gzip;q=1, br;q=0.5", "gzip"),
+    ("br;q=0", None),
+    ("*", "br"),
+    ("identity", None),
+    ("", None),
+])
+def test_negotiate(header, coding):
+    assert negotiate(header) == coding
+
+
+async def test_bodies_below_the_threshold_are_sent_as_is():
+    response = await get(f"/body?size={len(SMALL)}")
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.raw == SMALL
+
+
+@pytest.mark.parametrize("coding, decompress", [("gzip", gzip.decompress), ("br", brotli.decompress)])
+async def test_compressed_variant_has_its_own_etag(coding, decompress):
+    response = await get(f"/body?size={len(BIG)}", coding)
+    assert response.headers["content-encoding"] == coding
+    assert response.headers["etag"] == f'"v1-{coding}"'
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert int(response.headers["content-length"]) == len(response.raw) < len(BIG)
+    assert decompress(response.raw) == BIG
+
+
+async def test_identity_when_no_coding_is_accepted():
+    response = await get(f"/body?size={len(BIG)}", "identity")
+    assert "content-encoding" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+
+
+async def test_streams_are_compressed_chunk_by_chunk():
+    response = await get("/stream")
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(response.raw) == b'{"n": 0}\n{"n": 1}\n{"n": 2}\n'
+
+
+async def test_event_streams_pass_through():
+    response = await get("/stream?media_type=text/event-stream")
+    assert "content-encoding" not in response.headers
+    assert response.raw == b'{"n": 0}\n{"n": 1}\n{"n": 2}\n'
+
+
+async def test_not_modified_passes_through():
+    response = await get("/not-modified")
+    assert response.status_code == 304
+    assert "content-encoding" not in response.headers
+    assert "vary" not in response.headers
+    assert response.headers["etag"] == '"v1"'
+    assert response.raw == b""
@@ -0,0 +1,85 @@
+from uuid import uuid4
+
+import pytest
+from sqlalchemy import insert, select
+
+pytestmark = pytest.mark.anyio
+
+
+def legacy_schema() -> dict:
+    return {
+        "title": f"legacy {uuid4()}",
+        "type": "object",
+        "properties": {"color": {"type": "string", "enum": ["red", "blue"]}, "size": {"type": "integer"}},
+    }
+
+
+async def store_legacy(db, schema_json: dict, forms: list):
+    """A schema row as written before content hashing, with some submissions."""
+    from app.crud import submission as crud
+    from app.models.models import SchemaMaintenance
+
+    schema_id = uuid4()
+    await db.execute(insert(SchemaMaintenance).values(id=schema_id, name="legacy", schema_json=schema_json, content_hash=None))
+    await db.commit()
+    await crud.create_submissions(db, schema_id, forms, schema_json)
+    return schema_id
+
+
+async def dedupe() -> dict:
+    from app.db.migrations import dedupe_schemas
+    from app.db.session import engine
+
+    async with engine.begin() as conn:
+        return await conn.run_sync(dedupe_schemas)
+
+
+async def test_identical_schemas_share_a_row(db):
+    from app.crud import submission as crud
+
+    schema_json = legacy_schema()
+    first = await crud.create_schema(db, "a", schema_json)
+    reordered = dict(reversed(list(schema_json.items())))
+    assert (await crud.create_schema(db, "b", reordered)).id == first.id
+
+
+async def test_dedupe_merges_legacy_duplicates(db):
+    from app.crud import rollups, submission as crud
+    from app.models.models import SchemaMaintenance, SubmissionMaintenance
+
+    schema_json = legacy_schema()
+    keeper = await store_legacy(db, schema_json, [{"color": "red", "size": 1}] * 2)
+    duplicates = [
+        await store_legacy(db, schema_json, [{"color": "blue", "size": 10}] * 3),
+        await store_legacy(db, schema_json, [{"color": "red", "size": 100}] * 4),
+    ]
+
+    assert await dedupe() == {"hashed": 1, "merged": 2}
+
+    remaining = await db.execute(select(SchemaMaintenance.id).where(SchemaMaintenance.id.in_([keeper, *duplicates])))
+    assert remaining.scalars().all() == [keeper]
+    moved = await db.execute(select(SubmissionMaintenance.schema_id).where(SubmissionMaintenance.schema_id.in_(duplicates)))
+    assert moved.scalars().all() == []
+
+    assert await crud.read_counter(db, crud.submission_counter(keeper)) == 9
+    stats = await rollups.get_stats(db, keeper, schema_json)
+    assert stats["color"]["values"] == [{"value": "red", "count": 6}, {"value": "blue", "count": 3}]
+    assert (stats["size"]["count"], stats["size"]["min"], stats["size"]["max"]) == (9, 1, 100)
+    for duplicate in duplicates:
+        assert await rollups.get_stats(db, duplicate, schema_json) == {
+            "color": {"type": "string", "count": 0, "values": [{"value": "red", "count": 0}, {"value": "blue", "count": 0}]},
+            "size": {"type": "integer", "count": 0, "histogram": []},
+        }
+
+
+async def test_dedupe_keeps_an_already_hashed_row(db):
+    from app.crud import submission as crud
+
+    schema_json = legacy_schema()
+    legacy = await store_legacy(db, schema_json, [{"color": "red"}])
+    hashed = await crud.create_schema(db, "new", schema_json)
+    assert hashed.id != legacy
+
+    assert await dedupe() == {"hashed": 0, "merged": 1}
+    assert await crud.get_schema_by_id(db, legacy) is None
+    assert await crud.get_submission_count(db, hashed.id) == 1
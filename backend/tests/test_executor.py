@@ -0,0 +1,44 @@
+import json
+import math
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.executor import ValidationExecutor, estimated_size
+
+SCHEMA = {
+    "type": "object",
+    "properties": {"rows": {"type": "array", "items": {"type": "object", "properties": {"a": {"type": "integer"}, "b": {"type": "string"}}}}},
+}
+
+
+def rows(count: int, a=1) -> dict:
+    return {"rows": [{"a": a, "b": "some text"}] * count}
+
+
+def test_estimate_is_close_to_the_json_length():
+    data = rows(200)
+    assert 0.5 < estimated_size(data, math.inf) / len(json.dumps(data)) < 1.5
+
+
+def test_estimate_stops_past_the_limit():
+    assert estimated_size(rows(1_000_000), 4096) < 4096 + 64
+
+
+@pytest.mark.anyio
+async def test_chunked_bodies_are_offloaded_by_their_estimated_size():
+    executor = ValidationExecutor(1, 16 * 1024)
+    executor.start()
+    try:
+        await executor.validate(SCHEMA, rows(10), "k", None)
+        assert (executor.inline, executor.offloaded) == (1, 0)
+        await executor.validate(SCHEMA, rows(2000), "k", None)
+        assert (executor.inline, executor.offloaded) == (1, 1)
+        with pytest.raises(HTTPException) as raised:
+            await executor.validate(SCHEMA, rows(2000, a="x"), "k", None)
+        assert (raised.value.status_code, executor.offloaded) == (400, 2)
+        # A Content-Length still takes precedence
+        await executor.validate(SCHEMA, rows(2000), "k", 100)
+        assert executor.inline == 2
+    finally:
+        executor.stop()
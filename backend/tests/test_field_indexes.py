@@ -0,0 +1,27 @@
+import pytest
+
+pytestmark = pytest.mark.anyio
+
+PROPERTIES = {
+    "price": {"type": "number"},
+    "qty": {"type": "integer"},
+    "name": {"type": "string"},
+    "active": {"type": "boolean"},
+}
+
+
+@pytest.mark.parametrize("field", ["name", "active"])
+async def test_only_numeric_fields_can_be_indexed(client, make_schema, field):
+    schema = await make_schema(PROPERTIES)
+    response = await client.post(f"/schemas/{schema.id}/indexes", json={"field": field})
+    assert response.status_code == 400
+    assert "only number and integer fields" in response.json()["detail"]
+
+
+async def test_index_numeric_field(client, make_schema):
+    schema = await make_schema(PROPERTIES)
+    for field in ("price", "qty"):
+        response = await client.post(f"/schemas/{schema.id}/indexes", json={"field": field})
+        assert response.status_code == 200
+    listed = (await client.get(f"/schemas/{schema.id}/indexes")).json()
+    assert sorted(index["field"] for index in listed) == ["price", "qty"]
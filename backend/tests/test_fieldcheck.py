@@ -0,0 +1,106 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.fieldcheck import check_fields, parse_path
+from app.core.validator import compile_schema
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 2},
+        "email": {"type": "string", "format": "email"},
+        "age": {"type": "integer", "minimum": 18},
+        "address": {
+            "type": "object",
+            "properties": {"city": {"type": "string"}, "zip": {"type": "string", "pattern": "[0-9]{5}"}},
+            "required": ["city"],
+        },
+        "jobs": {
+            "type": "array",
+            "maxItems": 3,
+            "items": {"type": "object", "properties": {"title": {"type": "string", "minLength": 2}}, "required": ["title"]},
+        },
+        "hasGithub": {"type": "boolean"},
+    },
+    "required": ["name", "email"],
+    "if": {"properties": {"hasGithub": {"const": True}}},
+    "then": {"properties": {"github": {"type": "string", "minLength": 3}}, "required": ["github"]},
+}
+FORM = {
+    "name": "a",
+    "age": 12,
+    "address": {"zip": "12"},
+    "jobs": [{"title": "x"}, {}, 5, {"title": "ok"}],
+    "hasGithub": True,
+    "zzz": 1,
+}
+COMPILED = compile_schema(SCHEMA)
+
+
+def test_whole_form_reports_every_error():
+    assert check_fields(COMPILED, FORM) == [
+        {"field": "email", "message": "Missing required field: email"},
+        {"field": "github", "message": "Missing required field: github"},
+        {"field": "name", "message": "Field 'name' must be at least 2 characters"},
+        {"field": "age", "message": "Field 'age' must be ≥ 18"},
+        {"field": "address.city", "message": "Missing required field: city"},
+        {"field": "address.zip", "message": "Field 'zip' does not match required pattern"},
+        {"field": "jobs", "message": "Field 'jobs' must have at most 3 items"},
+        {"field": "jobs[0].title", "message": "Field 'title' must be at least 2 characters"},
+        {"field": "jobs[1].title", "message": "Missing required field: title"},
+        {"field": "jobs[2]", "message": "Item 2 in 'jobs' must be of type object"},
+        {"field": "zzz", "message": "Unexpected field: zzz"},
+    ]
+
+
+def test_submit_error_is_among_them():
+    with pytest.raises(HTTPException) as raised:
+        COMPILED.validate(FORM)
+    assert raised.value.detail in [e["message"] for e in check_fields(COMPILED, FORM)]
+
+
+def test_only_requested_paths_are_checked():
+    paths = ["age", "address.zip", "jobs[1].title", "jobs[2]", "github", "age"]
+    assert check_fields(COMPILED, FORM, paths) == [
+        {"field": "age", "message": "Field 'age' must be ≥ 18"},
+        {"field": "address.zip", "message": "Field 'zip' does not match required pattern"},
+        {"field": "jobs[1].title", "message": "Missing required field: title"},
+        {"field": "jobs[2]", "message": "Item 2 in 'jobs' must be of type object"},
+        {"field": "github", "message": "Missing required field: github"},
+    ]
+
+
+def test_inactive_branch_fields_report_nothing():
+    form = {"name": "ab", "email": "a@b.co"}
+    assert check_fields(COMPILED, form) == []
+    assert check_fields(COMPILED, form, ["github"]) == []
+
+
+def test_parse_path():
+    assert parse_path("jobs[0].title") == ["jobs", 0, "title"]
+    assert parse_path("address.city") == ["address", "city"]
+
+
+@pytest.mark.parametrize("path, data, detail", [
+    ("nope", {}, "Unknown field path: nope"),
+    ("address.nope", {"address": {}}, "Unknown field path: address.nope"),
+    ("jobs[", {}, "Invalid field path: jobs["),
+    ("a..b", {}, "Invalid field path: a..b"),
+])
+def test_bad_paths_are_a_400(path, data, detail):
+    with pytest.raises(HTTPException) as raised:
+        check_fields(COMPILED, data, [path])
+    assert (raised.value.status_code, raised.value.detail) == (400, detail)
+
+
+@pytest.mark.anyio
+async def test_validate_endpoint(client):
+    response = await client.post("/validate", json={"schema_json": SCHEMA, "form_data": FORM, "fields": ["age", "email"]})
+    assert response.status_code == 200
+    assert response.json() == {
+        "valid": False,
+        "errors": [
+            {"field": "age", "message": "Field 'age' must be ≥ 18"},
+            {"field": "email", "message": "Missing required field: email"},
+        ],
+    }
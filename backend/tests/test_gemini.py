@@ -0,0 +1,77 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from fastapi import HTTPException
+
+from app.crud import gemini
+
+pytestmark = pytest.mark.anyio
+
+
+class Upstream(BaseHTTPRequestHandler):
+    """Gemini-shaped stub; the last line of the prompt picks the reply."""
+    calls: list[str] = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["contents"][0]["parts"][0]["text"].rsplit("\n", 1)[-1]
+        self.calls.append(prompt)
+        time.sleep(1.0 if prompt == "slow" else 0.2)
+        status = {"fail": 500, "busy": 429}.get(prompt, 200)
+        data = json.dumps({"candidates": [{"content": {"parts": [{"text": f"reply to {prompt}"}]}}]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+async def upstream(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Upstream)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    Upstream.calls = []
+    monkeypatch.setattr(gemini, "GEMINI_API_URL", f"http://127.0.0.1:{server.server_port}/generate")
+    monkeypatch.setattr(gemini, "AI_TIMEOUT", 0.5)
+    monkeypatch.setattr(gemini, "_slots", asyncio.Semaphore(4))
+    await gemini.close_client()
+    yield Upstream
+    await gemini.close_client()
+    server.shutdown()
+    server.server_close()
+
+
+async def test_reply_text(upstream):
+    assert await gemini.call_gemini("a form") == "reply to a form"
+
+
+async def test_identical_prompts_in_flight_share_one_call(upstream):
+    replies = await asyncio.gather(*(gemini.call_gemini("same") for _ in range(5)), gemini.call_gemini("other"))
+    assert replies == ["reply to same"] * 5 + ["reply to other"]
+    assert sorted(upstream.calls) == ["other", "same"]
+    assert gemini.stats() == {"in_flight": 0, "queued": 0}
+
+
+async def test_busy_past_the_queue_limit(upstream, monkeypatch):
+    monkeypatch.setattr(gemini, "_slots", asyncio.Semaphore(1))
+    monkeypatch.setattr(gemini, "AI_MAX_QUEUE", 1)
+    results = await asyncio.gather(*(gemini.call_gemini(f"form {n}") for n in range(3)), return_exceptions=True)
+    assert results[:2] == ["reply to form 0", "reply to form 1"]
+    assert (results[2].status_code, results[2].headers) == (429, {"Retry-After": "1"})
+    assert upstream.calls == ["form 0", "form 1"]
+
+
+@pytest.mark.parametrize("prompt, status", [("slow", 504), ("fail", 502), ("busy", 429)])
+async def test_upstream_failures(upstream, prompt, status):
+    with pytest.raises(HTTPException) as raised:
+        await gemini.call_gemini(prompt)
+    assert raised.value.status_code == status
+    # The slot is released whatever happened
+    assert not gemini._slots.locked()
@@ -0,0 +1,103 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+
+from app.core.bloom import BloomFilter, RotatingBloomFilter
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(10000, 0.01)
+    keys = [str(uuid4()) for _ in range(10000)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(str(uuid4()) in bloom for _ in range(10000))
+    assert false_positives < 300  # 1% expected
+
+
+def test_rotating_filter_remembers_recent_keys_only():
+    bloom = RotatingBloomFilter(1000, 0.001)
+    oldest = [f"old-{n}" for n in range(1000)]
+    middle = [f"middle-{n}" for n in range(1000)]
+    newest = [f"new-{n}" for n in range(500)]
+    for key in oldest + middle:
+        bloom.add(key)
+    assert bloom.rotations == 1
+    assert all(key in bloom for key in oldest + middle)
+
+    for key in newest:
+        bloom.add(key)
+    assert bloom.rotations == 2
+    assert all(key in bloom for key in middle + newest)
+    assert sum(key in bloom for key in oldest) < 10
+    assert bloom.stats()["items"] == 1500
+
+
+def submit(client, schema, key, form):
+    return client.post(
+        "/submit-form", json={"schema_id": str(schema.id), "form_data": form}, headers={"Idempotency-Key": key},
+    )
+
+
+async def count(client, schema) -> int:
+    return (await client.get("/submissions-count", params={"schema_id": str(schema.id)})).json()["totalRecords"]
+
+
+@pytest.mark.anyio
+async def test_retry_replays_the_first_submission(client, make_schema):
+    schema = await make_schema({"n": {"type": "integer"}})
+    key = str(uuid4())
+    first = await submit(client, schema, key, {"n": 1})
+    retry = await submit(client, schema, key, {"n": 1})
+    assert first.status_code == retry.status_code == 200
+    assert "idempotent-replayed" not in first.headers
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+    assert await count(client, schema) == 1
+
+
+@pytest.mark.anyio
+async def test_reused_key_with_another_body_is_a_422(client, make_schema):
+    schema = await make_schema({"n": {"type": "integer"}})
+    key = str(uuid4())
+    assert (await submit(client, schema, key, {"n": 1})).status_code == 200
+    mismatch = await submit(client, schema, key, {"n": 2})
+    assert mismatch.status_code == 422
+    assert await count(client, schema) == 1
+
+
+@pytest.mark.anyio
+async def test_key_stored_by_another_worker_is_replayed(client, make_schema, monkeypatch):
+    from app.crud import idempotency
+
+    schema = await make_schema({"n": {"type": "integer"}})
+    key = str(uuid4())
+    first = await submit(client, schema, key, {"n": 1})
+    # A worker that never saw the key: empty cache and filter, so only the insert can catch it
+    idempotency._recent.clear()
+    monkeypatch.setattr(idempotency, "_seen", RotatingBloomFilter(1000))
+    retry = await submit(client, schema, key, {"n": 1})
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    idempotency._recent.clear()
+    assert (await submit(client, schema, key, {"n": 2})).status_code == 422
+    assert await count(client, schema) == 1
+
+
+@pytest.mark.anyio
+async def test_concurrent_retries_store_one_submission(client, make_schema):
+    schema = await make_schema({"n": {"type": "integer"}})
+    key = str(uuid4())
+    responses = await asyncio.gather(*(submit(client, schema, key, {"n": 1}) for _ in range(10)))
+    assert {response.status_code for response in responses} == {200}
+    assert len({response.json()["submission_id"] for response in responses}) == 1
+    assert await count(client, schema) == 1
+
+
+@pytest.mark.anyio
+@pytest.mark.parametrize("key", ["", "k" * 256])
+async def test_key_length_is_checked(client, make_schema, key):
+    schema = await make_schema({"n": {"type": "integer"}})
+    assert (await submit(client, schema, key, {"n": 1})).status_code == 400
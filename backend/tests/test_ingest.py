@@ -0,0 +1,76 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import HTTPException
+
+pytestmark = pytest.mark.anyio
+
+# Postgres refuses \u0000 in JSONB, so this row fails on its data alone
+BAD_FORM = {"n": 0, "note": "\u0000"}
+
+
+async def stored(db, submission_ids) -> int:
+    from app.crud import submission as crud
+
+    return sum([await crud.get_submission(db, submission_id) is not None for submission_id in submission_ids])
+
+
+async def test_bad_row_fails_alone_in_flush_mode(db, make_schema):
+    from app.crud.ingest import IngestQueue
+
+    schema = await make_schema({"n": {"type": "integer"}, "note": {"type": "string"}})
+    queue = IngestQueue(batch_size=100, flush_ms=200, maxsize=100, wait_for_flush=True)
+    await queue.start()
+    forms = [{"n": n} for n in range(5)] + [BAD_FORM]
+    results = await asyncio.gather(
+        *(queue.submit(schema.id, form, schema.schema_json) for form in forms), return_exceptions=True,
+    )
+    await queue.stop()
+
+    *good, bad = results
+    assert isinstance(bad, HTTPException) and bad.status_code == 503
+    assert await stored(db, good) == 5
+    assert (queue.batches, queue.failed, queue.dead_lettered) == (5, 1, 0)
+
+
+async def test_acknowledged_rows_that_fail_are_dead_lettered(db, make_schema, tmp_path, monkeypatch):
+    from app.crud import ingest
+
+    dead_letters = tmp_path / "dead.ndjson"
+    monkeypatch.setattr(ingest, "INGEST_DEAD_LETTER_PATH", str(dead_letters))
+    schema = await make_schema({"n": {"type": "integer"}, "note": {"type": "string"}})
+    queue = ingest.IngestQueue(batch_size=100, flush_ms=200, maxsize=100, wait_for_flush=False)
+    await queue.start()
+    good = [await queue.submit(schema.id, {"n": n}, schema.schema_json) for n in range(3)]
+    bad = await queue.submit(schema.id, BAD_FORM, schema.schema_json)
+    await queue.stop()
+
+    assert await stored(db, good) == 3
+    assert await stored(db, [bad]) == 0
+    [line] = dead_letters.read_text().splitlines()
+    row = json.loads(line)
+    assert (row["id"], row["schema_id"], row["form_data"]) == (str(bad), str(schema.id), BAD_FORM)
+    assert "error" in row and "failed_at" in row
+    assert queue.stats()["dead_lettered"] == 1
+
+
+@pytest.mark.usefixtures("app")  # the module binds to the configured database on import
+async def test_unavailable_database_is_not_retried_row_by_row(monkeypatch):
+    from app.crud import ingest
+
+    calls = []
+
+    async def insert(self, batch):
+        calls.append(len(batch))
+        raise ConnectionRefusedError("database is down")
+
+    monkeypatch.setattr(ingest.IngestQueue, "_insert", insert)
+    monkeypatch.setattr(ingest, "INGEST_DEAD_LETTER_PATH", "/nonexistent/dir/dead.ndjson")
+    queue = ingest.IngestQueue(batch_size=100, flush_ms=50, maxsize=100, wait_for_flush=True)
+    await queue.start()
+    results = await asyncio.gather(*(queue.submit(None, {"n": n}, {}) for n in range(4)), return_exceptions=True)
+    await queue.stop()
+
+    assert calls == [4]
+    assert all(isinstance(result, HTTPException) and result.status_code == 503 for result in results)
@@ -0,0 +1,44 @@
+import pytest
+
+pytestmark = [pytest.mark.anyio, pytest.mark.usefixtures("app")]
+
+INDEX = "ix_submission_maintenance_submitted_at"
+
+
+async def test_missing_indexes_are_built_concurrently_by_the_migrations_command():
+    from sqlalchemy import text
+    from app.db.migrations import check_schema, create_missing_indexes, upgrade
+    from app.db.session import engine
+
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP INDEX {INDEX}"))
+        # What workers run on startup no longer builds it
+        await conn.run_sync(upgrade)
+        assert f"index {INDEX}" in await conn.run_sync(check_schema)
+
+    async with engine.connect() as conn:
+        conn = await conn.execution_options(isolation_level="AUTOCOMMIT")
+        assert await conn.run_sync(create_missing_indexes) == [INDEX]
+        assert await conn.run_sync(check_schema) == []
+        unattached = await conn.execute(text(
+            "SELECT count(*) FROM pg_inherits i WHERE i.inhparent = 'submission_maintenance'::regclass AND NOT EXISTS ("
+            "SELECT 1 FROM pg_inherits ii JOIN pg_index x ON x.indexrelid = ii.inhrelid "
+            f"WHERE ii.inhparent = '{INDEX}'::regclass AND x.indrelid = i.inhrelid)"
+        ))
+        assert unattached.scalar() == 0
+        assert await conn.run_sync(create_missing_indexes) == []
+
+
+async def test_check_mode_requires_this_and_next_months_partitions():
+    from datetime import datetime, timezone
+    from sqlalchemy import text
+    from app.db.migrations import check_schema, upgrade
+    from app.db.partitions import add_months, month_start, partition_name
+    from app.db.session import engine
+
+    next_month = partition_name(add_months(month_start(datetime.now(timezone.utc)), 1))
+    async with engine.begin() as conn:
+        await conn.execute(text(f"DROP TABLE {next_month}"))
+        assert await conn.run_sync(check_schema) == [f"partition {next_month}"]
+        await conn.run_sync(upgrade)
+        assert await conn.run_sync(check_schema) == []
@@ -0,0 +1,63 @@
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.pagination import MAX_PAGE_SIZE, decode_cursor, encode_cursor, page_limit
+
+
+def test_cursor_round_trip():
+    timestamp = datetime(2024, 2, 29, 23, 59, 59, 999999, tzinfo=timezone.utc)
+    row_id = uuid4()
+    cursor = encode_cursor(timestamp, row_id)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (timestamp, row_id)
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", encode_cursor(datetime.now(), uuid4())[:-4]])
+def test_invalid_cursor_is_a_400(cursor):
+    with pytest.raises(HTTPException) as raised:
+        decode_cursor(cursor)
+    assert raised.value.status_code == 400
+
+
+def test_page_limit_is_clamped():
+    assert page_limit(0) == 1
+    assert page_limit(-5) == 1
+    assert page_limit(10) == 10
+    assert page_limit(10 ** 9) == MAX_PAGE_SIZE
+
+
+@pytest.mark.anyio
+async def test_cursor_pages_cover_every_submission_once(client, db, make_schema):
+    from app.crud import submission as crud
+
+    schema = await make_schema({"n": {"type": "integer"}})
+    # One transaction, so every row shares submitted_at and only the id breaks ties
+    ids = await crud.create_submissions(db, schema.id, [{"n": n} for n in range(7)], schema.schema_json)
+
+    offset_page = await client.get(f"/submissions/{schema.id}", params={"limit": 100})
+    expected = [row["id"] for row in offset_page.json()]
+    assert sorted(expected) == sorted(str(i) for i in ids)
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 3, **({"cursor": cursor} if cursor else {})}
+        response = await client.get(f"/submissions/{schema.id}", params=params)
+        assert response.status_code == 200
+        seen += [row["id"] for row in response.json()]
+        cursor = response.headers.get("x-next-cursor")
+        if cursor is None:
+            break
+    assert seen == expected
+
+
+@pytest.mark.anyio
+async def test_schema_cursor_continues_after_the_last_row(client, make_schema):
+    await make_schema({"a": {"type": "string"}})
+    await make_schema({"b": {"type": "string"}})
+    first = await client.get("/list-schemas", params={"limit": 1})
+    second = await client.get("/list-schemas", params={"limit": 1, "cursor": first.headers["x-next-cursor"]})
+    both = await client.get("/list-schemas", params={"limit": 2})
+    assert [row["id"] for row in first.json() + second.json()] == [row["id"] for row in both.json()]
@@ -0,0 +1,96 @@
+import pytest
+
+from app.core.rollups import aggregate_rows, histogram_bucket, rollup_plan
+
+PROPERTIES = {
+    "plan": {"type": "string", "enum": ["free", "pro"]},
+    "active": {"type": "boolean"},
+    "score": {"type": "number", "minimum": 0, "maximum": 10},
+    "visits": {"type": "integer"},
+    "note": {"type": "string"},
+    "address": {"type": "object", "properties": {"city": {"type": "string"}}},
+    "tags": {"type": "array", "items": {"type": "string"}},
+}
+SCHEMA = {"type": "object", "properties": PROPERTIES}
+FORMS = [
+    {"plan": "free", "active": True, "score": 2.5, "visits": 3, "note": "x", "address": {"city": "Oslo"}},
+    {"plan": "pro", "active": False, "score": 9, "visits": 250},
+    {"plan": "pro", "active": True, "score": 10, "visits": 0.5, "tags": ["a"]},
+    {"score": True, "visits": "many"},
+]
+
+
+def test_plan_covers_scalar_and_nested_fields():
+    plan = [(path, kind) for path, kind, _ in rollup_plan(SCHEMA)]
+    assert plan == [
+        (("plan",), "enum"), (("active",), "boolean"), (("score",), "number"),
+        (("visits",), "number"), (("note",), "string"), (("address", "city"), "string"),
+    ]
+
+
+def test_histogram_buckets():
+    prop = {"minimum": 0, "maximum": 10}
+    assert histogram_bucket(0, prop) == (0, 1)
+    assert histogram_bucket(10, prop) == (9, 10)
+    assert histogram_bucket(-3, prop) == (0, 1)
+    assert histogram_bucket(250, {}) == (100, 1000)
+    assert histogram_bucket(-42, {}) == (-100, -10)
+    assert histogram_bucket(0.5, {}) == (-1, 1)
+
+
+def test_batches_accumulate_like_one_pass():
+    plan = rollup_plan(SCHEMA)
+    aggregate = aggregate_rows(plan, FORMS[:2])
+    aggregate_rows(plan, FORMS[2:], aggregate)
+    assert aggregate == aggregate_rows(plan, FORMS)
+    assert aggregate[("plan", "v:\"pro\"")] == [2, None, None, None]
+    assert aggregate[("score", "*")] == [3, 21.5, 2.5, 10]  # the boolean score is skipped
+    assert aggregate[("visits", "*")] == [3, 253.5, 0.5, 250]
+    assert aggregate[("address.city", "*")][0] == 1
+
+
+@pytest.mark.anyio
+async def test_stats_follow_inserts_and_match_a_rebuild(client, db, make_schema):
+    from app.crud import submission as crud
+    from app.db.migrations import rebuild_rollups
+    from app.db.session import engine
+
+    schema = await make_schema(PROPERTIES)
+    await crud.create_submission(db, schema.id, FORMS[0], schema.schema_json)
+    await crud.create_submissions(db, schema.id, FORMS[1:], schema.schema_json)
+
+    response = await client.get(f"/schemas/{schema.id}/stats")
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["submissions"] == 4
+    fields = stats["fields"]
+    assert fields["plan"]["values"] == [{"value": "free", "count": 1}, {"value": "pro", "count": 2}]
+    assert (fields["active"]["true"], fields["active"]["false"]) == (2, 1)
+    assert fields["score"]["avg"] == pytest.approx(21.5 / 3)
+    assert [bucket["count"] for bucket in fields["score"]["histogram"]] == [1, 2]
+    assert fields["note"]["count"] == 1
+
+    async with engine.begin() as conn:
+        await conn.run_sync(rebuild_rollups, schema_ids={schema.id})
+    assert (await client.get(f"/schemas/{schema.id}/stats")).json() == stats
+
+
+@pytest.mark.anyio
+async def test_concurrent_writers_spread_over_shards(client, db, make_schema):
+    import asyncio
+    from sqlalchemy import func, select
+    from app.models.models import FieldRollup
+
+    schema = await make_schema({"score": {"type": "number"}})
+    responses = await asyncio.gather(*(
+        client.post("/submit-form", json={"schema_id": str(schema.id), "form_data": {"score": n}}) for n in range(1, 41)
+    ))
+    assert {response.status_code for response in responses} == {200}
+
+    shards = await db.execute(
+        select(func.count()).select_from(FieldRollup).where(FieldRollup.schema_id == schema.id, FieldRollup.bucket == "*")
+    )
+    assert shards.scalar() > 1
+    score = (await client.get(f"/schemas/{schema.id}/stats")).json()["fields"]["score"]
+    assert (score["count"], score["min"], score["max"], score["avg"]) == (40, 1, 40, 20.5)
+    assert sum(bucket["count"] for bucket in score["histogram"]) == 40
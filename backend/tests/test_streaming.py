@@ -0,0 +1,164 @@
+import json
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.streaming import BodyReader, StreamValidator, form_data_error
+from app.core.validator import compile_schema
+
+pytestmark = pytest.mark.anyio
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "maxLength": 5},
+        "tags": {"type": "array", "items": {"type": "string"}, "maxItems": 2},
+        "rows": {"type": "array", "items": {"type": "object", "properties": {"x": {"type": "integer"}}}},
+        "blob": {"type": "array"},
+        "kind": {"type": "string", "enum": ["a", "b"]},
+    },
+    "required": ["name"],
+}
+
+
+class Chunks:
+    """Async body that counts how many chunks the parser pulled."""
+
+    def __init__(self, *chunks: bytes, then: bytes = b"", repeat: int = 0):
+        self.chunks = list(chunks) + [then] * repeat
+        self.read = 0
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self.read == len(self.chunks):
+            raise StopAsyncIteration
+        self.read += 1
+        return self.chunks[self.read - 1]
+
+
+async def parse(body: Chunks, schema: dict = SCHEMA, max_bytes: int = 1 << 30, max_depth: int = 32):
+    return await StreamValidator(compile_schema(schema), max_depth).parse(BodyReader(body, max_bytes))
+
+
+async def stream_error(document) -> str:
+    with pytest.raises(HTTPException) as raised:
+        await parse(Chunks(json.dumps(document).encode()))
+    assert raised.value.status_code == 400
+    return raised.value.detail
+
+
+def full_error(document) -> str:
+    with pytest.raises(HTTPException) as raised:
+        compile_schema(SCHEMA).validate(document)
+    return raised.value.detail
+
+
+@pytest.mark.parametrize("field, value", [
+    ("zzz", 1),
+    ("name", 7),
+    ("name", "toolong"),
+    ("kind", "c"),
+    ("tags", ["a", "b", "c"]),
+    ("tags", ["a", 1]),
+    ("rows", [{"x": 1}, 2]),
+    ("rows", [{"x": "y"}]),
+    ("rows", [{"y": 1}]),
+])
+async def test_early_errors_match_the_full_validator(field, value):
+    document = {"name": "n", field: value}
+    assert await stream_error(document) == full_error(document)
+
+
+async def test_rejects_before_reading_the_rest_of_the_body():
+    body = Chunks(b'{"name": "n", "zzz": "', then=b"a" * 65536, repeat=1000)
+    with pytest.raises(HTTPException) as raised:
+        await parse(body)
+    assert raised.value.detail == "Unexpected field: zzz"
+    assert body.read <= 2
+
+
+async def test_array_over_max_items_is_rejected_while_streaming():
+    body = Chunks(b'{"name": "n", "tags": ["a", "b", "c"', then=b', "d"' * 10000, repeat=1000)
+    with pytest.raises(HTTPException) as raised:
+        await parse(body)
+    assert raised.value.detail == "Field 'tags' must have at most 2 items"
+    assert body.read <= 2
+
+
+@pytest.mark.parametrize("first, then", [(b"[1", b",1"), (b'"', b"a"), (b"1", b"1")])
+async def test_non_object_body_is_rejected_on_its_first_token(first, then):
+    body = Chunks(first, then=then * 32768, repeat=1000)
+    with pytest.raises(HTTPException) as raised:
+        await parse(body)
+    assert raised.value.detail == "Form data must be a JSON object"
+    assert body.read <= 2
+
+
+async def test_leading_whitespace_before_the_object():
+    assert await parse(Chunks(b"  \n", b"\t", b' {"name": "n"}')) == {"name": "n"}
+
+
+async def test_body_size_limit():
+    with pytest.raises(HTTPException) as raised:
+        await parse(Chunks(b'{"name": "', then=b"a" * 1024, repeat=10), max_bytes=4096)
+    assert raised.value.status_code == 413
+
+
+async def test_depth_limit():
+    assert await parse(Chunks(b'{"name": "n", "blob": ' + b"[" * 31 + b"]" * 31 + b"}"))
+    with pytest.raises(HTTPException) as raised:
+        await parse(Chunks(b'{"name": "n", "blob": ' + b"[" * 32 + b"]" * 32 + b"}"))
+    assert raised.value.detail == "Form data nested deeper than 32 levels"
+
+
+async def test_full_validation_runs_at_the_end():
+    with pytest.raises(HTTPException) as raised:
+        await parse(Chunks(b'{"tags": []}'))
+    assert raised.value.detail == "Missing required field: name"
+    assert await parse(Chunks(b'{"name": "n", "rows": [{"x', b'": 1}]}')) == {"name": "n", "rows": [{"x": 1}]}
+
+
+@pytest.mark.parametrize("body, detail", [
+    (b'{"name": ', "Invalid JSON"),
+    (b"", "Invalid JSON"),
+    (b'["name"]', "Form data must be a JSON object"),
+])
+async def test_malformed_bodies(body, detail):
+    with pytest.raises(HTTPException) as raised:
+        await parse(Chunks(body))
+    assert raised.value.detail == detail
+
+
+def nested(depth: int):
+    value = []
+    for _ in range(depth - 1):
+        value = [value]
+    return value
+
+
+@pytest.mark.parametrize("value, error", [
+    ({"a": [1, "x", {"b": None}]}, None),
+    (nested(32), None),
+    (nested(33), "Form data nested deeper than 32 levels"),
+    ({"a": [{"b": float("nan")}]}, "Form data must not contain NaN or Infinity"),
+    ({"a": float("-inf")}, "Form data must not contain NaN or Infinity"),
+])
+def test_form_data_error(value, error):
+    assert form_data_error(value, 32) == error
+
+
+def test_form_data_error_handles_very_deep_documents():
+    assert form_data_error(nested(100000), 32) == "Form data nested deeper than 32 levels"
+
+
+async def test_stream_endpoint(client, make_schema):
+    schema = await make_schema(SCHEMA["properties"], SCHEMA["required"])
+    response = await client.post(f"/submit-form/stream?schema_id={schema.id}", content=b'{"name": "n", "tags": ["a"]}')
+    assert response.status_code == 200
+    detail = await client.get(f"/submission-details/{response.json()['submission_id']}")
+    assert detail.json()["form_data"] == {"name": "n", "tags": ["a"]}
+
+    response = await client.post(f"/submit-form/stream?schema_id={schema.id}", content=b'{"name": "n", "zzz": 1}')
+    assert (response.status_code, response.json()["detail"]) == (400, "Unexpected field: zzz")
@@ -0,0 +1,100 @@
+import pytest
+from fastapi import HTTPException
+
+from app.core.validator import compile_schema, get_validator, validate_json_schema
+
+SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "minLength": 2, "maxLength": 5, "pattern": "[a-z]+"},
+        "email": {"type": "string", "format": "email"},
+        "age": {"type": "integer", "minimum": 1, "maximum": 100},
+        "price": {"type": "number", "minimum": 0.5},
+        "cat": {"type": "string", "enum": ["A", "B"]},
+        "ok": {"type": "boolean"},
+        "tags": {"type": "array", "items": {"type": "string"}, "minItems": 1, "maxItems": 2},
+        "rows": {"type": "array", "items": {"type": "object", "properties": {"x": {"type": "integer"}}, "required": ["x"]}},
+        "obj": {"type": "object", "properties": {"y": {"type": "string", "enum": ["p"]}}, "required": ["y"]},
+        "gh": {"type": "string", "enum": ["Yes", "No"]},
+    },
+    "required": ["name"],
+    "if": {"properties": {"gh": {"const": "Yes"}}},
+    "then": {"properties": {"url": {"type": "string", "minLength": 3}}, "required": ["url"]},
+    "else": {"properties": {"why": {"type": "string"}}},
+}
+
+# Messages of the interpreted validator the compiled one replaced; clients match on them
+GOLDEN = [
+    ({"name": "abc"}, None),
+    ({}, "Missing required field: name"),
+    ({"name": "a"}, "Field 'name' must be at least 2 characters"),
+    ({"name": "abcdef"}, "Field 'name' must be at most 5 characters"),
+    ({"name": "AB"}, "Field 'name' does not match required pattern"),
+    ({"name": 1}, "Field 'name' should be of type string"),
+    ({"name": "ab", "email": "x"}, "Field 'email' is not a valid email"),
+    ({"name": "ab", "email": "a@b.co"}, None),
+    ({"name": "ab", "age": 0}, "Field 'age' must be ≥ 1"),
+    ({"name": "ab", "age": 101}, "Field 'age' must be ≤ 100"),
+    ({"name": "ab", "age": True}, "Field 'age' should be of type integer"),
+    ({"name": "ab", "age": 2.5}, "Field 'age' should be of type integer"),
+    ({"name": "ab", "price": 0.1}, "Field 'price' must be ≥ 0.5"),
+    ({"name": "ab", "price": "x"}, "Field 'price' should be of type number"),
+    ({"name": "ab", "cat": "C"}, "Field 'cat' must be one of ['A', 'B']"),
+    ({"name": "ab", "cat": ["A"]}, "Field 'cat' should be of type string"),
+    ({"name": "ab", "ok": 1}, "Field 'ok' should be of type boolean"),
+    ({"name": "ab", "tags": []}, "Field 'tags' must have at least 1 items"),
+    ({"name": "ab", "tags": ["a", 1]}, "Error in array 'tags' at index 1: Item 1 in 'tags' must be of type string"),
+    ({"name": "ab", "tags": ["a", "b", "c"]}, "Field 'tags' must have at most 2 items"),
+    ({"name": "ab", "rows": [{}]}, "Error in array 'rows' at index 0: Missing required field: x"),
+    ({"name": "ab", "rows": [{"x": "a"}]}, "Error in array 'rows' at index 0: Field 'x' should be of type integer"),
+    ({"name": "ab", "rows": [{"x": 1, "z": 2}]}, "Error in array 'rows' at index 0: Unexpected field: z"),
+    ({"name": "ab", "obj": {}}, "Missing required field: y"),
+    ({"name": "ab", "obj": {"y": "q"}}, "Field 'y' must be one of ['p']"),
+    ({"name": "ab", "obj": []}, "Field 'obj' should be of type object"),
+    ({"name": "ab", "gh": "Yes"}, "Missing required field: url"),
+    ({"name": "ab", "gh": "Yes", "url": "a"}, "Field 'url' must be at least 3 characters"),
+    ({"name": "ab", "gh": "Yes", "url": "abcd"}, None),
+    ({"name": "ab", "gh": "No", "why": 1}, "Field 'why' should be of type string"),
+    ({"name": "ab", "gh": "No", "url": "a"}, "Unexpected field: url"),
+    ({"name": "ab", "zzz": 1}, "Unexpected field: zzz"),
+]
+
+
+def error_of(data):
+    try:
+        validate_json_schema(SCHEMA, data)
+    except HTTPException as e:
+        assert e.status_code == 400
+        return e.detail
+    return None
+
+
+@pytest.mark.parametrize("data, expected", GOLDEN)
+def test_messages_match_the_interpreted_validator(data, expected):
+    assert error_of(data) == expected
+
+
+@pytest.mark.parametrize("item", [1, "x", None, []])
+def test_non_object_array_item_is_a_400(item):
+    # Used to fail with a TypeError (500) for scalars, or check a list as if it were the object
+    assert error_of({"name": "ab", "rows": [{"x": 1}, item]}) == "Error in array 'rows' at index 1: Item 1 in 'rows' must be of type object"
+
+
+def test_validators_are_cached_by_key():
+    assert get_validator(SCHEMA) is get_validator(dict(SCHEMA))
+    assert get_validator(SCHEMA, "stored-id") is get_validator({}, "stored-id")
+    assert get_validator(SCHEMA, "other-id") is not get_validator(SCHEMA, "stored-id")
+
+
+def test_unreadable_pattern_fails_only_when_checked():
+    compiled = compile_schema({"properties": {"code": {"type": "string", "pattern": "("}}})
+    compiled.validate({})
+    with pytest.raises(Exception):
+        compiled.validate({"code": "a"})
+
+
+@pytest.mark.anyio
+async def test_submit_form_rejects_non_object_array_item(client):
+    response = await client.post("/submit-form", json={"schema_json": SCHEMA, "form_data": {"name": "ab", "rows": [7]}})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Error in array 'rows' at index 0: Item 0 in 'rows' must be of type object"
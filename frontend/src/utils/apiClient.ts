@@ -6,6 +6,7 @@ const API_BASE = import.meta.env.VITE_API_URL; // Using a real API for demo
 export const apiClient = axios.create({
   baseURL: API_BASE,
   timeout: 90000,
+  withCredentials: true, // lets the API keep reads on the primary right after a submission
 });
 
 const formatReadableDate = (isoString: string) => {